@@ -1,23 +1,35 @@
 import asyncio
-import io
+import os
 from datetime import datetime
+from typing import Literal
 
-from fastapi import APIRouter, Depends, Request, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, Request, HTTPException, Form, File, UploadFile
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, Response, FileResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from starlette.datastructures import FormData
 
 from api.v1.auth import get_current_user
 from services.admin import (
-    fetch_user_stat, generate_pdf, get_paginated_users, get_all_participants,
-    get_participants_for_event, change_user_role, delete_user_from_db,
+    fetch_user_stat, get_paginated_users, get_users_by_cursor, change_user_role, delete_user_from_db,
     invalidate_users_cache, invalidate_stat_cache
 )
+from services.analytics import get_event_analytics
+from services.bulk_import import (
+    IMPORT_MAX_BYTES, get_import_emails, import_attendees, send_import_emails, track_import_emails
+)
+from services.cache import cache_stats
+from services.capacity import remaining_seats
 from services.event import get_active_event
 from services.event import (
     get_all_events, add_event, toggle_event_status,
-    delete_event_data, update_event_data
+    delete_event_data, update_event_data, get_event_by_id, release_event_waitlist
+)
+from services.export import (
+    iter_chunks, stream_attendance, MEDIA_TYPES, export_etag, etag_matches, cache_headers,
+    build_pdf_export, build_badges_export
 )
+from services.export_jobs import EXPORT_JOBS_ENABLED, submit_export_job, get_export_job
+from services.mail import send_waitlist_closed_emails
 from services.registration import invalidate_active_events_cache
 
 router: APIRouter = APIRouter(
@@ -43,6 +55,7 @@ async def admin_dashboard(
         "request": request,
         "user": user,
         "active_event": active_event,
+        "export_jobs": EXPORT_JOBS_ENABLED,
         "stats": {
             "total_registered": total_registered,
             "total_attended": total_attended,
@@ -51,6 +64,15 @@ async def admin_dashboard(
     })
 
 
+@router.get("/analytics/{event_id}")
+async def event_analytics(event_id: str, user=Depends(get_current_user)):
+    """Arrival timeline (5-minute buckets) and affiliation split for one event."""
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return await get_event_analytics(event_id)
+
+
 @router.get("/verify", response_class=HTMLResponse)
 async def admin_verify(
         request: Request,
@@ -61,67 +83,243 @@ async def admin_verify(
 
 
 @router.get("/export-attendance")
-async def export_attendance(user=Depends(get_current_user)):
+async def export_attendance(request: Request, user=Depends(get_current_user)):
     """Full attendance PDF — all participants across all events."""
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    participants = await get_all_participants()
-    pdf_output = generate_pdf(participants, event_title="All Events", per_event=False)
+    etag = await export_etag("pdf")
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+
+    pdf_output, _ = await build_pdf_export(etag=etag)
     ts = datetime.now().strftime('%Y%m%d_%H%M%S')
     return StreamingResponse(
-        io.BytesIO(pdf_output),
+        iter_chunks(pdf_output),
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=attendance_all_{ts}.pdf"}
+        headers={"Content-Disposition": f"attachment; filename=attendance_all_{ts}.pdf", **cache_headers(etag)}
+    )
+
+
+@router.get("/export-attendance.{fmt}")
+async def export_attendance_stream(
+        request: Request,
+        fmt: Literal["csv", "ndjson"],
+        user=Depends(get_current_user)
+):
+    """Full attendance as CSV or NDJSON, streamed as pages arrive."""
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    etag = await export_etag(fmt)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+
+    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return StreamingResponse(
+        stream_attendance(fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename=attendance_all_{ts}.{fmt}", **cache_headers(etag)}
+    )
+
+
+@router.get("/export-attendance/{event_id}.{fmt}")
+async def export_attendance_event_stream(
+        request: Request,
+        event_id: str,
+        fmt: Literal["csv", "ndjson"],
+        user=Depends(get_current_user)
+):
+    """Per-event attendance as CSV or NDJSON, streamed as pages arrive."""
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    etag, event = await asyncio.gather(export_etag(fmt, event_id), get_event_by_id(event_id))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+
+    event_title = event.title if event else "Event"
+    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+    safe_title = event_title.replace(" ", "_")[:30]
+    return StreamingResponse(
+        stream_attendance(fmt, event_id),
+        media_type=MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f"attachment; filename=attendance_{safe_title}_{ts}.{fmt}",
+            **cache_headers(etag),
+        }
     )
 
 
 @router.get("/export-attendance/{event_id}")
-async def export_attendance_event(event_id: str, user=Depends(get_current_user)):
+async def export_attendance_event(request: Request, event_id: str, user=Depends(get_current_user)):
     """Per-event attendance PDF."""
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    participants, event = await get_participants_for_event(event_id)
-    event_title = event.get("title", "Event") if event else "Event"
-    pdf_output = generate_pdf(participants, event_title=event_title, per_event=True)
+    etag = await export_etag("pdf", event_id)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+
+    pdf_output, event_title = await build_pdf_export(event_id, etag=etag)
     ts = datetime.now().strftime('%Y%m%d_%H%M%S')
     safe_title = event_title.replace(" ", "_")[:30]
     return StreamingResponse(
-        io.BytesIO(pdf_output),
+        iter_chunks(pdf_output),
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=attendance_{safe_title}_{ts}.pdf"}
+        headers={
+            "Content-Disposition": f"attachment; filename=attendance_{safe_title}_{ts}.pdf",
+            **cache_headers(etag),
+        }
     )
 
 
+@router.get("/export-badges/{event_id}")
+async def export_badges_event(event_id: str, user=Depends(get_current_user)):
+    """Per-event name badges PDF, for deployments without background export jobs."""
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    pdf_output, event_title = await build_badges_export(event_id)
+    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+    safe_title = event_title.replace(" ", "_")[:30]
+    return StreamingResponse(
+        iter_chunks(pdf_output),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename=badges_{safe_title}_{ts}.pdf"}
+    )
+
+
+@router.post("/exports")
+async def create_export_job(
+        kind: Literal["pdf", "csv", "badges"] = Form(...),
+        event_id: str = Form(default=""),
+        user=Depends(get_current_user)
+):
+    """Queue a background export. Returns the job id to poll."""
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    job = submit_export_job(kind, event_id or None)
+    return JSONResponse(job.to_dict(), status_code=202)
+
+
+@router.get("/exports/{job_id}")
+async def export_job_status(job_id: str, user=Depends(get_current_user)):
+    """Progress of a background export."""
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    job = get_export_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found.")
+    return job.to_dict()
+
+
+@router.get("/exports/{job_id}/download")
+async def export_job_download(job_id: str, user=Depends(get_current_user)):
+    """Serve the finished artefact of a background export."""
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    job = get_export_job(job_id)
+    if not job or job.status != "done" or job.path is None or not job.path.exists():
+        raise HTTPException(status_code=404, detail="Export not ready.")
+    return FileResponse(job.path, media_type=job.media_type, filename=job.filename)
+
+
+async def _users_page(page: int, limit: int, search: str, after: str, before: str) -> dict:
+    """List page context shared by the full page and the fragment endpoint."""
+    page = max(1, page)
+    if after or before:
+        result = await get_users_by_cursor(after=after, before=before, limit=limit, search=search)
+        if result["at_start"]:
+            page = 1
+    else:
+        result = await get_paginated_users(page=page, limit=limit, search=search)
+
+    return {
+        "users_list": result["users"],
+        "page": page,
+        "limit": limit,
+        "search": search,
+        "total_count": result["total"],
+        "total_estimated": result["estimated"],
+        "total_pages": result["pages"],
+        "next_cursor": result["next_cursor"],
+        "prev_cursor": result["prev_cursor"],
+    }
+
+
+# What a users-list row shows; the fragment sends just these and admin_users.js renders them
+_USER_ROW_FIELDS: tuple[str, ...] = (
+    "github_id", "name", "email", "avatar_url", "role", "participant_type",
+    "student_id", "university", "study_year", "organization", "job_role",
+)
+
+
+def _user_row(u: dict, admin) -> dict:
+    """One users-list row as compact JSON: empty fields are left out."""
+    row = {f: u[f] for f in _USER_ROW_FIELDS if u.get(f)}
+    if u.get("created_at"):
+        row["joined"] = u["created_at"][:10]
+    if u.get("email") == admin.email:
+        row["self"] = True
+    return row
+
+
 @router.get("/users", response_class=HTMLResponse)
 async def admin_users(
         request: Request,
         page: int = 1,
         limit: int = 15,
         search: str = "",
+        after: str = "",
+        before: str = "",
         user=Depends(get_current_user)
 ):
-    """Admin page — lists registered users with server-side pagination."""
+    """
+    Admin page — lists registered users with server-side pagination.
+    Prev/next follow keyset cursors (`after` / `before`); plain `page`
+    numbers remain as an offset-based fallback for jumping around.
+    """
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    page = max(1, page)
-    result = await get_paginated_users(page=page, limit=limit, search=search)
+    context = await _users_page(page, limit, search, after, before)
 
-    total_pages = result["pages"]
-    if page > total_pages and total_pages > 0:
+    total_pages = context["total_pages"]
+    if context["page"] > total_pages and total_pages > 0 and not context["users_list"]:
         return RedirectResponse(url=f"/admin/users?page={total_pages}&search={search}", status_code=302)
 
-    return templates.TemplateResponse("admin_users.html", {
-        "request": request,
-        "user": user,
-        "users_list": result["users"],
-        "page": result["page"],
-        "limit": limit,
+    return templates.TemplateResponse("admin_users.html", {"request": request, "user": user, **context})
+
+
+@router.get("/users/fragment")
+async def admin_users_fragment(
+        page: int = 1,
+        limit: int = 15,
+        search: str = "",
+        after: str = "",
+        before: str = "",
+        user=Depends(get_current_user)
+):
+    """
+    The rows (as data, rendered by admin_users.js) and the rendered
+    pagination of /admin/users, for swapping in place.
+    """
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    context = {"user": user, **await _users_page(page, limit, search, after, before)}
+    return JSONResponse({
+        "users": [_user_row(u, user) for u in context["users_list"]],
         "search": search,
-        "total_count": result["total"],
-        "total_pages": result["pages"],
+        "pagination": templates.get_template("partials/admin_users_pagination.html").render(context),
+        "total": context["total_count"],
+        "estimated": context["total_estimated"],
+        "page": context["page"],
+        "pages": context["total_pages"],
     })
 
 
@@ -186,11 +384,14 @@ async def admin_events(
         raise HTTPException(status_code=403, detail="Admin access required")
 
     events_list = await get_all_events()
+    seats = await remaining_seats(events_list)
 
     return templates.TemplateResponse("admin_events.html", {
         "request": request,
         "user": user,
         "events_list": events_list,
+        "seats": seats,
+        "export_jobs": EXPORT_JOBS_ENABLED,
     })
 
 
@@ -216,9 +417,13 @@ async def create_event(
 async def edit_event(
         event_id: str,
         request: Request,
+        background_tasks: BackgroundTasks,
         user=Depends(get_current_user)
 ):
-    """Update an existing event from form data."""
+    """
+    Update an existing event from form data. Lifting the cap or switching the
+    waitlist off releases the waitlist; anyone dropped from it is emailed.
+    """
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
@@ -228,7 +433,65 @@ async def edit_event(
     if not status:
         raise HTTPException(status_code=code, detail=err)
     invalidate_active_events_cache()
-    return RedirectResponse(url="/admin/events?success=updated", status_code=303)
+
+    promoted, dropped = await release_event_waitlist(event_id)
+    if not promoted and not dropped:
+        return RedirectResponse(url="/admin/events?success=updated", status_code=303)
+    if promoted:
+        invalidate_stat_cache()
+    recipients = [(e["user"]["email"], e["user"]["name"]) for e in dropped if e.get("user") and e["user"].get("email")]
+    if recipients:
+        background_tasks.add_task(
+            send_waitlist_closed_emails, recipients, form.get("title"), request.app.state.http_client)
+    return RedirectResponse(
+        url=f"/admin/events?success=updated&promoted={promoted}&dropped={len(dropped)}", status_code=303)
+
+
+@router.post("/events/{event_id}/import")
+async def import_event_attendees(
+        event_id: str,
+        request: Request,
+        background_tasks: BackgroundTasks,
+        file: UploadFile = File(...),
+        send_emails: bool = Form(default=True),
+        user=Depends(get_current_user)
+):
+    """
+    Register everyone in an uploaded CSV for an event and queue their QR
+    emails. Returns a per-row report; `emails` tracks the delivery, polled at
+    /admin/imports/emails/{id}.
+    """
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    data = await file.read(IMPORT_MAX_BYTES + 1)
+    if len(data) > IMPORT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"The file is over {IMPORT_MAX_BYTES // (1024 * 1024)} MB.")
+
+    report, registrations = await import_attendees(event_id, data)
+    if report["users_created"] or registrations:
+        invalidate_users_cache()
+        invalidate_stat_cache()
+    report["emails_queued"] = len(registrations) if send_emails else 0
+    report["emails"] = None
+    if send_emails and registrations:
+        emails = track_import_emails(len(registrations))
+        background_tasks.add_task(
+            send_import_emails, event_id, report["event_title"], registrations, request.app.state.http_client, emails)
+        report["emails"] = emails.to_dict()
+    return report
+
+
+@router.get("/imports/emails/{emails_id}")
+async def import_emails_status(emails_id: str, user=Depends(get_current_user)):
+    """How an import's QR emails are getting on: sent so far and the addresses that failed."""
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    emails = get_import_emails(emails_id)
+    if emails is None:
+        raise HTTPException(status_code=404, detail="Import not found.")
+    return emails.to_dict()
 
 
 @router.post("/events/{event_id}/toggle")
@@ -261,3 +524,26 @@ async def delete_event(
         raise HTTPException(status_code=500, detail=f"Failed to delete event: {str(err)}")
     invalidate_active_events_cache()
     return RedirectResponse(url="/admin/events?success=event_deleted", status_code=303)
+
+
+@router.get("/debug/caches", response_class=HTMLResponse)
+async def debug_caches(request: Request, user=Depends(get_current_user)):
+    """Per-cache hit rates, load latency and fallbacks for this worker."""
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return templates.TemplateResponse("admin_caches.html", {
+        "request": request,
+        "user": user,
+        "pid": os.getpid(),
+        "caches": cache_stats(),
+    })
+
+
+@router.get("/debug/caches.json")
+async def debug_caches_json(user=Depends(get_current_user)):
+    """Machine-readable variant of /admin/debug/caches."""
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return {"pid": os.getpid(), "caches": cache_stats()}
@@ -1,8 +1,10 @@
 import asyncio
 import base64
 import io
+import uuid
+from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, Request, HTTPException, Depends, Form
+from fastapi import APIRouter, BackgroundTasks, Request, HTTPException, Depends, Form, Header
 from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import ValidationError
@@ -10,10 +12,13 @@ from pydantic import ValidationError
 from api.v1.auth import get_current_user
 from schema.user import CompleteProfileRequest
 from services import get_qr_image
+from services.capacity import remaining_seats
 from services.mail import send_qr_email
 from services.registration import (
     get_user_registrations,
     get_all_active_events,
+    get_user_waitlist,
+    leave_waitlist,
     register_for_event as _register_for_event,
     get_registration_qr_payload,
     _generate_qr_data_url,
@@ -99,24 +104,23 @@ async def user_events_page(request: Request, user=Depends(get_current_user)):
     if not profile or not profile.get("participant_type"):
         return RedirectResponse(url="/user/complete-profile", status_code=302)
 
-    registrations, active_events = await asyncio.gather(
+    registrations, waitlist, active_events = await asyncio.gather(
         get_user_registrations(user.user_id),
+        get_user_waitlist(user.user_id),
         get_all_active_events(),
     )
 
-    # Merge event details into registrations in the router
-    events_by_id = {str(e["id"]): e for e in active_events}
-    for reg in registrations:
-        reg["event"] = events_by_id.get(str(reg["event_id"]), {})
-
-    registered_ids = {str(r["event_id"]) for r in registrations}
-    available = [e for e in active_events if str(e["id"]) not in registered_ids]
+    joined_ids = {str(r["event_id"]) for r in registrations} | {str(w["event_id"]) for w in waitlist}
+    available = [e for e in active_events if str(e["id"]) not in joined_ids]
 
     return templates.TemplateResponse("user_events.html", {
         "request": request,
         "user": user,
         "registrations": registrations,
+        "waitlist": waitlist,
         "available_events": available,
+        "seats": await remaining_seats(available),
+        "idempotency_key": uuid.uuid4().hex,  # one per render: resubmitting this page's forms replays
     })
 
 
@@ -125,10 +129,22 @@ async def register_for_event(
         event_id: str,
         request: Request,
         background_tasks: BackgroundTasks,
+        idempotency_key: str = Form(default=""),
+        idempotency_key_header: Optional[str] = Header(default=None, alias="Idempotency-Key"),
         user=Depends(get_current_user),
 ):
-    """Register the current user for an event, generate per-event QR, queue email."""
-    result = await _register_for_event(user.user_id, event_id, user.name, user.email)
+    """
+    Register the current user for an event (or its waitlist, once full), generate per-event QR, queue email.
+    A repeat with the same Idempotency-Key (header or form field) replays the first outcome without a second email.
+    """
+    result = await _register_for_event(
+        user.user_id, event_id, user.name, user.email, idempotency_key=idempotency_key_header or idempotency_key)
+    if result.get("waitlisted"):
+        return RedirectResponse(url=f"/user/events?waitlisted={result['position']}", status_code=302)
+    if result.get("already_registered"):
+        return RedirectResponse(url="/user/events?already_registered=1", status_code=302)
+    if result.get("replayed"):
+        return RedirectResponse(url="/user/events?registered=1", status_code=302)
 
     background_tasks.add_task(
         send_qr_email,
@@ -141,6 +157,13 @@ async def register_for_event(
     return RedirectResponse(url="/user/events?registered=1", status_code=302)
 
 
+@router.post("/events/{event_id}/waitlist/leave")
+async def leave_event_waitlist(event_id: str, user=Depends(get_current_user)):
+    """Take the current user off an event's waitlist, which also lets them register again later."""
+    await leave_waitlist(user.user_id, event_id)
+    return RedirectResponse(url="/user/events?left_waitlist=1", status_code=302)
+
+
 # ── Per-registration QR download ────────────────────────────────────────────
 
 @router.get("/registrations/{registration_id}/qr")
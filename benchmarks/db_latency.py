@@ -0,0 +1,115 @@
+"""
+Latency of the hot repository reads over PostgREST and over the asyncpg
+backend (config/postgres.py), against a real database.
+
+Reads only. It samples existing registrations for keys, so point it at a
+database with some data: PostgREST needs the usual SUPABASE_* variables,
+asyncpg needs POSTGRES_URL (both read from .env). Backends whose settings
+are missing are skipped.
+
+    python benchmarks/db_latency.py [--requests 500] [--concurrency 1]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.postgres import POSTGRES_STATEMENT_CACHE_SIZE, POSTGRES_URL, postgres  # noqa: E402
+from config.supabase import supabase_admin  # noqa: E402
+from repository.event_repo import get_active_event_dict  # noqa: E402
+from repository.registration_repo import (  # noqa: E402
+    count_event_registrations, get_attended_count, get_user_registrations, load_registration_by_id,
+)
+from repository.user_repo import get_user_by_qr_code, load_user_by_qr_code  # noqa: E402
+
+Sample = list[dict]  # registrations: id, user_qr_code, event_id
+
+OPERATIONS: dict[str, Callable[[dict], Awaitable]] = {
+    "get_user_by_qr_code": lambda r: get_user_by_qr_code(r["user_qr_code"], "qr_code_data, name, email, attended_at"),
+    "load_user_by_qr_code": lambda r: load_user_by_qr_code(r["user_qr_code"]),
+    "load_registration_by_id": lambda r: load_registration_by_id(r["id"]),
+    "get_user_registrations": lambda r: get_user_registrations(r["user_qr_code"]),
+    "get_active_event_dict": lambda r: get_active_event_dict(),
+    "count_event_registrations": lambda r: count_event_registrations(r["event_id"]),
+    "get_attended_count": lambda r: get_attended_count(),
+}
+
+
+async def _sample(size: int) -> Sample:
+    if postgres.enabled:
+        rows = await postgres.fetch("SELECT id, user_qr_code, event_id FROM registrations LIMIT $1", size)
+    else:
+        res = await supabase_admin.table("registrations").select("id, user_qr_code, event_id").limit(size).execute()
+        rows = res.data or []
+    if not rows:
+        raise SystemExit("No registrations to sample; the benchmark needs some data.")
+    return rows
+
+
+async def _time(operation: Callable[[dict], Awaitable], sample: Sample, requests: int, concurrency: int) -> list[float]:
+    latencies: list[float] = []
+    queue = [random.choice(sample) for _ in range(requests)]
+
+    async def worker() -> None:
+        while queue:
+            row = queue.pop()
+            started = time.perf_counter()
+            await operation(row)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sorted(latencies)
+
+
+def _percentile(sorted_ms: list[float], p: float) -> float:
+    return sorted_ms[min(len(sorted_ms) - 1, int(len(sorted_ms) * p))]
+
+
+async def _run_backend(name: str, requests: int, concurrency: int) -> None:
+    sample = await _sample(200)
+    print(f"{name}: {requests} requests per operation, concurrency {concurrency}")
+    for label, operation in OPERATIONS.items():
+        await _time(operation, sample, min(requests, 20), 1)  # warm connections and prepared statements
+        latencies = await _time(operation, sample, requests, concurrency)
+        print(f"  {label:<26} p50 {_percentile(latencies, 0.5):7.2f} ms  p99 {_percentile(latencies, 0.99):7.2f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(0)
+
+    try:
+        await supabase_admin.init()
+        await supabase_admin.ping()
+    except Exception as e:
+        print(f"postgrest: skipped ({type(e).__name__}: {e})")
+    else:
+        await _run_backend("postgrest", args.requests, args.concurrency)
+    finally:
+        await supabase_admin.aclose()
+
+    if not POSTGRES_URL:
+        print("asyncpg: skipped (POSTGRES_URL is not set)")
+        return
+    import asyncpg  # optional dependency: pip install .[postgres]
+
+    postgres.pool = await asyncpg.create_pool(
+        POSTGRES_URL, min_size=1, max_size=max(2, args.concurrency),
+        statement_cache_size=POSTGRES_STATEMENT_CACHE_SIZE,
+    )
+    try:
+        await _run_backend("asyncpg", args.requests, args.concurrency)
+    finally:
+        await postgres.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""
+Memory held by 50k export rows: merged dicts vs the slotted records in
+schema/rows.py.
+
+Rows are decoded from JSON first, as they arrive from PostgREST, so every
+row owns fresh strings the way it does in production. Each variant builds
+its rows under tracemalloc and reports what is still allocated.
+
+    python benchmarks/rows_memory.py [--users 50000]
+"""
+import argparse
+import gc
+import json
+import pickle
+import random
+import sys
+import tracemalloc
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from schema.rows import ParticipantRow, RegistrationRow  # noqa: E402
+
+EVENT_ID = "3f1c0e1a-0000-4000-8000-000000000001"
+
+
+def _user(i: int, rng: random.Random) -> dict:
+    ptype = rng.choice(["uok_student", "other_university", "industry"])
+    return {
+        "qr_code_data": str(uuid.UUID(int=rng.getrandbits(128))),
+        "name": f"User {i}",
+        "email": f"user{i}@example.com",
+        "role": "participant",
+        "participant_type": ptype,
+        "student_id": f"SE/2023/{i:05d}" if ptype == "uok_student" else None,
+        "university": rng.choice(["University of Colombo", "University of Moratuwa"])
+        if ptype == "other_university" else None,
+        "organization": rng.choice(["WSO2", "IFS", "99x"]) if ptype == "industry" else None,
+        "job_role": rng.choice(["Engineer", "Intern"]) if ptype == "industry" else None,
+    }
+
+
+def _registration(user: dict, rng: random.Random) -> dict:
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "user_qr_code": user["qr_code_data"],
+        "event_id": EVENT_ID,
+        "registered_at": "2026-01-01T10:00:00+00:00",
+        "attended_at": None,
+    }
+
+
+def _measure(build: Callable[[], list]) -> tuple[float, list]:
+    gc.collect()
+    tracemalloc.start()
+    rows = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / 1e6, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    users = [_user(i, rng) for i in range(args.users)]
+    users_json = json.dumps(users)
+    registrations_json = json.dumps([_registration(u, rng) for u in users])
+
+    def all_events_dicts() -> list:
+        return [{**u, "events_registered": 1, "events_attended": 1} for u in json.loads(users_json)]
+
+    def all_events_rows() -> list:
+        rows = [ParticipantRow.from_record(u) for u in json.loads(users_json)]
+        for row in rows:
+            row.events_registered = row.events_attended = 1
+        return rows
+
+    def per_event_dicts() -> list:
+        return [
+            {**u, "registration_id": r["id"], "event_id": r["event_id"],
+             "registered_at": r["registered_at"], "attended_at": r["attended_at"]}
+            for u, r in zip(json.loads(users_json), json.loads(registrations_json))
+        ]
+
+    def per_event_rows() -> list:
+        rows = [RegistrationRow.from_record(r) for r in json.loads(registrations_json)]
+        for u, row in zip(json.loads(users_json), rows):
+            row.set_user(u)
+        return rows
+
+    print(f"{args.users} users, Python {sys.version.split()[0]}")
+    for report, dicts, records in (("all-events report", all_events_dicts, all_events_rows),
+                                   ("per-event report", per_event_dicts, per_event_rows)):
+        dict_mb, dict_rows = _measure(dicts)
+        row_mb, row_rows = _measure(records)
+        print(f"  {report:<18} dicts {dict_mb:6.1f} MB -> records {row_mb:6.1f} MB")
+        if report == "per-event report":
+            # What generate_pdf ships to the export worker pool
+            print(f"  {'pickled for pool':<18} dicts {len(pickle.dumps(dict_rows)) / 1e6:6.1f} MB"
+                  f" -> records {len(pickle.dumps(row_rows)) / 1e6:6.1f} MB")
+        del dict_rows, row_rows
+
+
+if __name__ == "__main__":
+    main()
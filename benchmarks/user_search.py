@@ -0,0 +1,99 @@
+"""
+Query latency of the in-process admin user search (services/user_search.py)
+over 50k synthetic users.
+
+The query mix matches what the admin list sees: one- to eight-letter name
+prefixes, whole emails, and common substrings such as a mail domain. Each
+query asks for the first page of 15.
+
+    python benchmarks/user_search.py [--users 50000] [--queries 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Importing services loads the Supabase config, which wants credentials; the index never uses them
+for _name in ("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_SECRET", "SUPABASE_ANON_PUBLIC"):
+    os.environ.setdefault(_name, "http://127.0.0.1:54321" if _name == "SUPABASE_URL" else "unused")
+
+from services.user_search import UserSearchIndex  # noqa: E402
+
+FIRST = ["Kasun", "Nimal", "Amara", "Dilini", "Sahan", "Tharindu", "Ishara", "Chamodi", "Ravindu", "Nethmi",
+         "John", "Ayesha", "Pasindu", "Hiruni"]
+LAST = ["Perera", "Silva", "Fernando", "Jayasinghe", "Wickramasinghe", "Bandara", "Dissanayake", "Gunawardena",
+        "Rathnayake", "Kumara"]
+ORGS = ["WSO2", "IFS", "99x", "Sysco LABS", "Virtusa", "CodeGen", None]
+DOMAINS = ["gmail.com", "kln.ac.lk", "yahoo.com"]
+
+
+def _users(n: int, rng: random.Random) -> list[dict]:
+    return [{
+        "github_id": str(i),
+        "qr_code_data": f"qr-{i}",
+        "name": f"{rng.choice(FIRST)} {rng.choice(LAST)}",
+        "email": f"user{i}@{rng.choice(DOMAINS)}",
+        "student_id": f"CT/2021/{i:05d}" if i % 3 == 0 else None,
+        "organization": rng.choice(ORGS) if i % 3 == 1 else None,
+    } for i in range(n)]
+
+
+def _queries(n: int, users: int, rng: random.Random) -> list[str]:
+    names = [rng.choice(FIRST + LAST).lower()[:rng.randint(1, 8)] for _ in range(n * 6 // 10)]
+    emails = [f"user{rng.randrange(users)}" for _ in range(n * 3 // 10)]
+    common = [rng.choice(["gmail", "kln.ac", "co", "sil", "wso2"]) for _ in range(n - len(names) - len(emails))]
+    queries = names + emails + common
+    rng.shuffle(queries)
+    return queries
+
+
+def _percentile(sorted_ms: list[float], p: float) -> float:
+    return sorted_ms[min(len(sorted_ms) - 1, int(len(sorted_ms) * p))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=5_000)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    users = _users(args.users, rng)
+
+    def build_index() -> UserSearchIndex:
+        built = UserSearchIndex()
+        for user in users:
+            built.add(user)
+        return built
+
+    started = time.perf_counter()
+    index = build_index()
+    build = time.perf_counter() - started
+    # A second build under tracemalloc, which would skew the timing above
+    tracemalloc.start()
+    traced = build_index()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced
+
+    queries = _queries(args.queries, args.users, rng)
+    index.search("warm up")
+    latencies = []
+    for q in queries:
+        started = time.perf_counter()
+        index.search(q, 0, 15)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+
+    print(f"{args.users} users, Python {sys.version.split()[0]}")
+    print(f"  build   {build:.2f} s, {memory / 1e6:.0f} MB")
+    print(f"  {len(queries)} queries  p50 {_percentile(latencies, 0.5):.3f} ms  p99 {_percentile(latencies, 0.99):.3f} ms"
+          f"  max {latencies[-1]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Optional direct Postgres backend.
+
+With DB_BACKEND=asyncpg the hot repository queries (verify lookups, the
+registration insert and attendance marking, counts) go straight to
+POSTGRES_URL over a connection pool instead of through PostgREST. asyncpg
+prepares each statement once per connection and reuses it, so repeated
+lookups skip parsing and planning. Everything else keeps using PostgREST.
+
+Rows are returned as dicts shaped like PostgREST's JSON (uuids as str,
+timestamps as ISO strings), so callers cannot tell the backends apart.
+"""
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional
+
+DB_BACKEND: str = os.getenv("DB_BACKEND", "postgrest").lower()
+POSTGRES_URL: str = os.getenv("POSTGRES_URL", "")
+POSTGRES_POOL_MIN: int = int(os.getenv("POSTGRES_POOL_MIN", "2"))
+POSTGRES_POOL_MAX: int = int(os.getenv("POSTGRES_POOL_MAX", "10"))
+# PgBouncer in transaction mode (Supabase's pooler port) cannot keep prepared statements; set 0 there
+POSTGRES_STATEMENT_CACHE_SIZE: int = int(os.getenv("POSTGRES_STATEMENT_CACHE_SIZE", "100"))
+
+_COLUMNS = re.compile(r"\*|\w+(\s*,\s*\w+)*")
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime) and value.microsecond:
+        # PostgreSQL's JSON (so PostgREST's) drops trailing zeros: .500000 -> .5
+        head, _, fraction = value.isoformat().partition(".")
+        return f"{head}.{fraction[:6].rstrip('0')}{fraction[6:]}"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def columns(select: str) -> str:
+    """A PostgREST select list as SQL; only plain column lists are accepted."""
+    select = select.strip()
+    if not _COLUMNS.fullmatch(select):
+        raise ValueError(f"Unsupported select for the asyncpg backend: {select!r}")
+    return select
+
+
+def param(column: str, value: Any) -> Any:
+    """Timestamps travel as ISO strings through the app; asyncpg wants datetimes."""
+    if column.endswith("_at") and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+@dataclass
+class _Postgres:
+    pool: Optional[Any] = field(default=None)  # asyncpg.Pool
+
+    @property
+    def enabled(self) -> bool:
+        return self.pool is not None
+
+    async def init(self) -> None:
+        if DB_BACKEND != "asyncpg":
+            return
+        if not POSTGRES_URL:
+            raise ValueError("DB_BACKEND=asyncpg needs POSTGRES_URL")
+        import asyncpg  # optional dependency: pip install .[postgres]
+
+        self.pool = await asyncpg.create_pool(
+            POSTGRES_URL,
+            min_size=POSTGRES_POOL_MIN,
+            max_size=POSTGRES_POOL_MAX,
+            statement_cache_size=POSTGRES_STATEMENT_CACHE_SIZE,
+        )
+
+    async def aclose(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def ping(self) -> float:
+        """Seconds for a trivial query over the pool."""
+        started = time.perf_counter()
+        await self.pool.fetchval("SELECT 1")
+        return time.perf_counter() - started
+
+    def pool_stats(self) -> dict:
+        if self.pool is None:
+            return {}
+        size, idle, max_size = self.pool.get_size(), self.pool.get_idle_size(), self.pool.get_max_size()
+        return {
+            "max_connections": max_size,
+            "connections": size,
+            "active": size - idle,
+            "idle": idle,
+            "utilisation": (size - idle) / max_size,
+        }
+
+    async def fetch(self, sql: str, *args) -> list[dict]:
+        rows = await self.pool.fetch(sql, *args)
+        return [{k: _json_value(v) for k, v in r.items()} for r in rows]
+
+    async def fetchrow(self, sql: str, *args) -> Optional[dict]:
+        row = await self.pool.fetchrow(sql, *args)
+        return {k: _json_value(v) for k, v in row.items()} if row is not None else None
+
+    async def fetchval(self, sql: str, *args) -> Any:
+        return _json_value(await self.pool.fetchval(sql, *args))
+
+    async def execute(self, sql: str, *args) -> str:
+        return await self.pool.execute(sql, *args)
+
+
+postgres = _Postgres()
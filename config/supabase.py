@@ -1,9 +1,12 @@
+import asyncio
 import os
+import time
 from dataclasses import dataclass, field
 from typing import Optional
 
+import httpx
 from dotenv import load_dotenv
-from supabase import create_client, acreate_client, Client, AsyncClient
+from supabase import create_client, acreate_client, AClientOptions, Client, AsyncClient
 
 load_dotenv()
 
@@ -11,6 +14,16 @@ SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
 SERVICE_ROLE_KEY: str = os.getenv("SUPABASE_SERVICE_ROLE_SECRET", "")
 ANON_KEY: str = os.getenv("SUPABASE_ANON_PUBLIC", "")
 
+# Connection pool of the async admin client
+SUPABASE_POOL_SIZE: int = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+SUPABASE_POOL_KEEPALIVE: int = int(os.getenv("SUPABASE_POOL_KEEPALIVE", "10"))  # idle connections kept open
+SUPABASE_KEEPALIVE_EXPIRY: float = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "60"))
+SUPABASE_HTTP2: bool = os.getenv("SUPABASE_HTTP2", "true").lower() in ("1", "true", "yes")
+SUPABASE_TIMEOUT: float = float(os.getenv("SUPABASE_TIMEOUT", "15"))
+SUPABASE_CONNECT_TIMEOUT: float = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+SUPABASE_POOL_TIMEOUT: float = float(os.getenv("SUPABASE_POOL_TIMEOUT", "5"))  # wait for a free connection
+SUPABASE_POOL_WARM: int = int(os.getenv("SUPABASE_POOL_WARM", "4"))
+
 if not SUPABASE_URL or not SERVICE_ROLE_KEY or not ANON_KEY:
     raise ValueError("Missing required Supabase environment variables")
 
@@ -20,9 +33,22 @@ supabase: Client = create_client(SUPABASE_URL, ANON_KEY)
 @dataclass
 class _AsyncAdmin:
     client: Optional[AsyncClient] = field(default=None)
+    http: Optional[httpx.AsyncClient] = field(default=None)
 
     async def init(self) -> None:
-        self.client = await acreate_client(SUPABASE_URL, SERVICE_ROLE_KEY)
+        self.http = httpx.AsyncClient(
+            http2=SUPABASE_HTTP2,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=SUPABASE_POOL_SIZE,
+                max_keepalive_connections=SUPABASE_POOL_KEEPALIVE,
+                keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(SUPABASE_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT, pool=SUPABASE_POOL_TIMEOUT),
+        )
+        self.client = await acreate_client(
+            SUPABASE_URL, SERVICE_ROLE_KEY, options=AClientOptions(httpx_client=self.http)
+        )
 
     async def aclose(self) -> None:
         if self.client is not None:
@@ -30,6 +56,44 @@ class _AsyncAdmin:
                 await self.client.aclose()
             except Exception:
                 pass
+        if self.http is not None:
+            await self.http.aclose()
+
+    async def ping(self) -> float:
+        """Seconds for a one-row query: an HTTP and a database round trip."""
+        started = time.perf_counter()
+        await self.table("events").select("id").limit(1).execute()
+        return time.perf_counter() - started
+
+    async def warm(self, connections: int = SUPABASE_POOL_WARM) -> None:
+        """
+        Open connections (TLS included) before traffic arrives by running
+        `connections` pings at once. Over HTTP/2 they share one connection.
+        """
+        await asyncio.gather(*(self.ping() for _ in range(connections)))
+
+    def pool_stats(self) -> dict:
+        """
+        Connections in the httpx pool and how many are busy. httpx has no
+        public pool API, so this reads httpcore's pool behind the transport;
+        if an upgrade moves those internals the stats go empty rather than
+        fail the health check (tests/test_supabase_pool.py catches it).
+        """
+        try:
+            pool = self.http._transport._pool
+            connections = list(pool.connections)
+            active = sum(1 for c in connections if not c.is_idle())
+            return {
+                "max_connections": SUPABASE_POOL_SIZE,
+                "connections": len(connections),
+                "active": active,
+                "idle": len(connections) - active,
+                "http2": sum(1 for c in connections if "HTTP/2" in c.info()),
+                "requests": len(pool._requests),  # in flight or waiting for a connection
+                "utilisation": active / SUPABASE_POOL_SIZE,
+            }
+        except (AttributeError, TypeError):
+            return {}
 
     def table(self, name: str):
         if self.client is None:
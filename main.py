@@ -1,16 +1,28 @@
+import asyncio
+import math
 from contextlib import asynccontextmanager
 
 import httpx
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 from api.v1 import users, auth, admin, api
 # from config.supabase import supabase as sync_supabase
+from config.postgres import postgres
 from config.supabase import supabase_admin
+from repository.guard import BackendUnavailable, breaker_stats
+from repository.schema_check import check_schema
 # from middleware.perf_logger import PerfMiddleware, patch_supabase_admin, patch_sync_auth
+from services.cache import start_cache_bus, stop_cache_bus
 from services.event import get_active_event
+from services.export import shutdown_export_pool
+from services.export_jobs import start_export_workers, stop_export_workers
+from services.registration import get_all_active_events
+from services.user_search import start_user_search_index, stop_user_search_index
+
+READY_PROBE_TIMEOUT: float = 5.0  # seconds before /health/ready reports the database unavailable
 
 
 @asynccontextmanager
@@ -20,29 +32,57 @@ async def lifespan(app: FastAPI):
 
     On startup:
     - A persistent async Supabase admin client is initialized.  Its httpx
-      connection pool is reused for every DB query, avoiding the ~1 s
-      cold-connect per call that the old sync client had.
+      connection pool (sized and timed by the SUPABASE_POOL_* settings,
+      HTTP/2 by default) is reused for every DB query, avoiding the ~1 s
+      cold-connect per call that the old sync client had, and is warmed
+      with SUPABASE_POOL_WARM connections so the first requests after a
+      deploy skip the TLS handshakes.
+    - The schema is checked for the columns and tables the queries need;
+      startup fails if the README migration has not been run.
+    - With DB_BACKEND=asyncpg, a Postgres connection pool is opened for the
+      hot repository queries.
     - A shared httpx.AsyncClient is created for outgoing HTTP (e.g. email).
-    - The active-event cache is pre-warmed.
+    - The cache invalidation bus is joined, so admin changes made through
+      any worker clear the caches of all of them.
+    - The event caches are pre-warmed; from then on they refresh in the
+      background and requests never wait on them.
+    - Background export job workers are started.
+    - The admin user search index starts building in the background.
+
+    On shutdown those background tasks, the bus and the PDF worker pool are torn down.
     """
     # Start persistent async Supabase DB client
     await supabase_admin.init()
+    try:
+        await supabase_admin.warm()
+    except Exception:
+        pass
+    await check_schema()
+    await postgres.init()
     # patch_supabase_admin(supabase_admin)  # instrument DB calls -> logs/perf.log
+    await start_cache_bus()
 
     # Shared HTTP client for email sends
     async with httpx.AsyncClient(timeout=15.0) as http_client:
         app.state.http_client = http_client
 
-        # Pre-warm the event cache (best-effort)
+        # Pre-warm the event caches (best-effort)
         try:
-            await get_active_event()
+            await asyncio.gather(get_active_event(), get_all_active_events())
         except Exception:
             pass
 
+        start_export_workers()
+        start_user_search_index()
         yield
+        await stop_user_search_index()
+        await stop_export_workers()
 
     # Gracefully close the async admin client on shutdown
+    await stop_cache_bus()
+    await postgres.aclose()
     await supabase_admin.aclose()
+    shutdown_export_pool()
 
 
 # patch_sync_auth(sync_supabase)
@@ -61,6 +101,16 @@ app.include_router(users.router)
 app.include_router(api.router)
 
 
+@app.exception_handler(BackendUnavailable)
+async def backend_unavailable(request: Request, exc: BackendUnavailable) -> JSONResponse:
+    """The database is down or its breaker is open: a retryable 503, not a 404 or 500."""
+    return JSONResponse(
+        {"detail": "The database is temporarily unavailable. Please try again shortly."},
+        status_code=503,
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
 @app.get("/", response_class=HTMLResponse)
 async def homepage(request: Request):
     """Login page — entry point for everyone."""
@@ -72,6 +122,26 @@ async def health() -> dict[str, str]:
     return {"status": "ok", "message": "Server is running"}
 
 
+@app.get("/health/ready")
+async def health_ready() -> JSONResponse:
+    """Readiness: a live database round trip, with connection pool utilisation and any open breakers."""
+    body: dict = {"status": "ok", "pools": {"supabase": supabase_admin.pool_stats()}}
+    body["open_breakers"] = [b for b in breaker_stats() if b["state"] != "closed"]
+    probes = {"supabase": supabase_admin.ping}
+    if postgres.enabled:
+        body["pools"]["postgres"] = postgres.pool_stats()
+        probes["postgres"] = postgres.ping
+
+    body["latency_ms"] = {}
+    for name, ping in probes.items():
+        try:
+            body["latency_ms"][name] = round(await asyncio.wait_for(ping(), READY_PROBE_TIMEOUT) * 1000, 1)
+        except Exception as e:
+            body["status"] = "unavailable"
+            body.setdefault("errors", {})[name] = str(e) or type(e).__name__
+    return JSONResponse(body, status_code=200 if body["status"] == "ok" else 503)
+
+
 if __name__ == "__main__":
     import uvicorn
 
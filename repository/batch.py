@@ -0,0 +1,75 @@
+"""
+Batched point lookups.
+
+Concurrent requests tend to look up the same kinds of rows one key at a time
+(a registration, then its user and event). A BatchLoader collects the keys
+asked for during one event-loop tick and fetches them with a single in_()
+query per table, then hands each caller its row. Nothing is cached past
+the batch, so results are as fresh as a direct query.
+"""
+import asyncio
+import re
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Optional
+
+MAX_BATCH: int = 200  # keeps the in_() list well inside URL length limits
+
+_UUID = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+
+
+def is_uuid(key) -> bool:
+    return isinstance(key, str) and _UUID.fullmatch(key) is not None
+
+
+class BatchLoader:
+    """
+    `fetch(keys)` returns the rows for a list of keys, matched back by their
+    `key` column. Keys failing `valid` resolve to None without a query, so
+    one malformed key cannot fail the whole batch. A failed fetch raises in
+    every caller of that batch.
+    """
+
+    def __init__(
+            self,
+            fetch: Callable[[list], Awaitable[list[dict]]],
+            key: str,
+            valid: Callable[[Hashable], bool] = is_uuid,
+    ):
+        self._fetch = fetch
+        self._key = key
+        self._valid = valid
+        self._pending: dict[Hashable, asyncio.Future] = {}
+        self.batches = self.keys = 0
+
+    async def load(self, key: Hashable) -> Optional[dict]:
+        if not self._valid(key):
+            return None
+        future = self._pending.get(key)
+        if future is None:
+            if not self._pending:
+                asyncio.get_running_loop().call_soon(self._dispatch)
+            future = self._pending[key] = asyncio.get_running_loop().create_future()
+        # Shared by every caller of this key; one giving up must not cancel it for the rest
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+        keys = list(pending)
+        for i in range(0, len(keys), MAX_BATCH):
+            asyncio.create_task(self._run({k: pending[k] for k in keys[i:i + MAX_BATCH]}))
+
+    async def _run(self, batch: dict[Hashable, asyncio.Future]) -> None:
+        self.batches += 1
+        self.keys += len(batch)
+        try:
+            rows = await self._fetch(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        # Postgres compares uuids case-insensitively, so match the same way
+        by_key = {str(r[self._key]).lower(): r for r in rows}
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(by_key.get(str(key).lower()))
@@ -1,63 +1,83 @@
 from typing import Optional
 
+from config.postgres import postgres
 from config.supabase import supabase_admin
+from repository.batch import BatchLoader
+from repository.guard import guarded
 
 
+_ACTIVE_EVENT_COLUMNS = (
+    "id, title, description, location, start_time, end_time, image_url, whatsapp_link, is_active, capacity, waitlist"
+)
+_EVENT_COLUMNS = _ACTIVE_EVENT_COLUMNS + ", created_at"
+
+
+@guarded("events.select")
 async def get_active_event_dict() -> Optional[dict]:
-    try:
-        res = await (
-            supabase_admin.table("events")
-            .select("id, title, description, location, start_time, end_time, image_url, whatsapp_link, is_active")
-            .eq("is_active", True)
-            .limit(1)
-            .execute()
-        )
-        return res.data[0] if res.data else None
-    except Exception:
-        return None
+    if postgres.enabled:
+        return await postgres.fetchrow(f"SELECT {_ACTIVE_EVENT_COLUMNS} FROM events WHERE is_active LIMIT 1")
+    res = await (
+        supabase_admin.table("events")
+        .select(_ACTIVE_EVENT_COLUMNS)
+        .eq("is_active", True)
+        .limit(1)
+        .execute()
+    )
+    return res.data[0] if res.data else None
 
 
+@guarded("events.select", default=None)
 async def get_event_by_id(event_id: str, select: str = "*") -> Optional[dict]:
-    try:
-        res = await (
-            supabase_admin.table("events")
-            .select(select)
-            .eq("id", event_id)
-            .single()
-            .execute()
-        )
-        return res.data
-    except Exception:
-        return None
+    res = await (
+        supabase_admin.table("events")
+        .select(select)
+        .eq("id", event_id)
+        .single()
+        .execute()
+    )
+    return res.data
+
+
+@guarded("events.select")
+async def _fetch_events_by_ids(event_ids: list[str]) -> list[dict]:
+    if postgres.enabled:
+        return await postgres.fetch(f"SELECT {_EVENT_COLUMNS} FROM events WHERE id = ANY($1)", event_ids)
+    res = await supabase_admin.table("events").select(_EVENT_COLUMNS).in_("id", event_ids).execute()
+    return res.data or []
 
 
+_events_by_id = BatchLoader(_fetch_events_by_ids, "id")
+
+
+async def load_event_by_id(event_id: str) -> Optional[dict]:
+    """An event's row, batched with concurrent lookups."""
+    return await _events_by_id.load(event_id)
+
+
+@guarded("events.select")
 async def get_all_events() -> list[dict]:
-    try:
-        res = await (
-            supabase_admin.table("events")
-            .select(
-                "id, title, description, location, start_time, end_time, image_url, whatsapp_link, is_active, created_at")
-            .order("is_active", desc=True)
-            .order("created_at", desc=False)
-            .execute()
-        )
-        return res.data or []
-    except Exception:
-        return []
+    res = await (
+        supabase_admin.table("events")
+        .select(
+            "id, title, description, location, start_time, end_time, image_url, whatsapp_link, is_active, created_at, "
+            "capacity, waitlist")
+        .order("is_active", desc=True)
+        .order("created_at", desc=False)
+        .execute()
+    )
+    return res.data or []
 
 
+@guarded("events.select")
 async def get_all_active_events() -> list[dict]:
-    try:
-        res = await (
-            supabase_admin.table("events")
-            .select("id, title, description, location, start_time, end_time, whatsapp_link")
-            .eq("is_active", True)
-            .order("created_at", desc=False)
-            .execute()
-        )
-        return res.data or []
-    except Exception:
-        return []
+    res = await (
+        supabase_admin.table("events")
+        .select("id, title, description, location, start_time, end_time, whatsapp_link, capacity, waitlist")
+        .eq("is_active", True)
+        .order("created_at", desc=False)
+        .execute()
+    )
+    return res.data or []
 
 
 async def deactivate_all_active_events_except(event_id: Optional[str] = None) -> None:
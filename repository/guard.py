@@ -0,0 +1,171 @@
+"""
+Deadlines and circuit breakers for database calls.
+
+A guarded repository call has to finish within its deadline. Every operation
+("users.select", "registrations.insert", ...) has a breaker that watches the
+outcomes of its calls over the last DB_BREAKER_WINDOW seconds. Once enough
+of them fail, the breaker opens and calls fail at once for
+DB_BREAKER_COOLDOWN seconds. After that a single trial call decides whether
+to close it again. A missed deadline and an open breaker both raise
+BackendUnavailable, which callers can tell apart from "not found" and answer
+with a 503 or with stale data.
+
+Only outages count against a breaker: timeouts, network errors, and the
+database reporting connection or resource trouble. A constraint violation
+or a bad filter means the database answered, so it passes through unchanged.
+"""
+import asyncio
+import functools
+import os
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Literal
+
+import httpx
+from postgrest.exceptions import APIError
+
+DB_READ_DEADLINE: float = float(os.getenv("DB_READ_DEADLINE", "3"))
+DB_WRITE_DEADLINE: float = float(os.getenv("DB_WRITE_DEADLINE", "5"))
+DB_STATS_DEADLINE: float = float(os.getenv("DB_STATS_DEADLINE", "10"))  # dashboard aggregates
+DB_BREAKER_WINDOW: float = float(os.getenv("DB_BREAKER_WINDOW", "30"))
+DB_BREAKER_MIN_CALLS: int = int(os.getenv("DB_BREAKER_MIN_CALLS", "10"))  # fewer outcomes never open it
+DB_BREAKER_FAILURE_RATE: float = float(os.getenv("DB_BREAKER_FAILURE_RATE", "0.5"))
+DB_BREAKER_COOLDOWN: float = float(os.getenv("DB_BREAKER_COOLDOWN", "15"))
+
+# SQLSTATE classes: connection exception, insufficient resources, operator intervention (statement timeouts, shutdown)
+_OUTAGE_SQLSTATES: tuple[str, ...] = ("08", "53", "57")
+# PostgREST cannot reach, or get a connection to, the database
+_OUTAGE_PGRST: frozenset[str] = frozenset({"PGRST000", "PGRST001", "PGRST002", "PGRST003"})
+
+_RAISE = object()
+
+
+class BackendUnavailable(Exception):
+    """The database is down, too slow, or its breaker is open; says nothing about whether the row exists."""
+
+    def __init__(self, operation: str, reason: str, retry_after: float = 0.0):
+        super().__init__(f"{operation}: {reason}")
+        self.operation = operation
+        self.retry_after = retry_after
+
+
+def is_outage(e: BaseException) -> bool:
+    if isinstance(e, (BackendUnavailable, TimeoutError, OSError, httpx.TransportError)):
+        return True
+    # PostgREST errors carry the SQLSTATE (or an HTTP status when the body is not JSON); asyncpg's carry sqlstate
+    code = e.code if isinstance(e, APIError) else getattr(e, "sqlstate", None)
+    if isinstance(code, int):
+        return code >= 500
+    code = str(code or "")
+    return code in _OUTAGE_PGRST or (len(code) == 5 and code.startswith(_OUTAGE_SQLSTATES))
+
+
+class CircuitBreaker:
+    """closed: calls pass. open: calls fail fast. half_open: one trial call decides."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state: Literal["closed", "open", "half_open"] = "closed"
+        self.opened_at = 0.0
+        self._outcomes: deque[tuple[float, bool]] = deque()  # (time, failed) within the window
+        self._failed = 0
+        self._trial = False
+        self.calls = self.failures = self.rejected = self.opens = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.retry_after() > 0 or self._trial:
+            self.rejected += 1
+            return False
+        self.state, self._trial = "half_open", True
+        return True
+
+    def retry_after(self) -> float:
+        return max(0.0, DB_BREAKER_COOLDOWN - (time.monotonic() - self.opened_at)) if self.state == "open" else 0.0
+
+    def record(self, failed: bool) -> None:
+        now = time.monotonic()
+        self.calls += 1
+        self.failures += failed
+        if self.state != "closed":
+            self._trial = False
+            if failed:
+                self._open(now)
+            else:
+                self.state = "closed"
+                self._outcomes.clear()
+                self._failed = 0
+            return
+
+        self._outcomes.append((now, failed))
+        self._failed += failed
+        while now - self._outcomes[0][0] > DB_BREAKER_WINDOW:
+            self._failed -= self._outcomes.popleft()[1]
+        total = len(self._outcomes)
+        if total >= DB_BREAKER_MIN_CALLS and self._failed >= DB_BREAKER_FAILURE_RATE * total:
+            self._open(now)
+
+    def release(self) -> None:
+        """The trial call was cancelled before it could decide; let the next one try."""
+        if self.state == "half_open":
+            self._trial = False
+
+    def _open(self, now: float) -> None:
+        self.state, self.opened_at = "open", now
+        self.opens += 1
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "retry_after": round(self.retry_after(), 1),
+            "calls": self.calls,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "opens": self.opens,
+        }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def breaker_stats() -> list[dict]:
+    return [b.stats() for _, b in sorted(_breakers.items())]
+
+
+def guarded(operation: str, deadline: float = DB_READ_DEADLINE, default=_RAISE):
+    """
+    Run a repository coroutine under `operation`'s breaker and `deadline`.
+    Outages raise BackendUnavailable. Any other error is re-raised, or
+    replaced by `default` when one is given: "not found" stays "not found".
+    """
+    breaker = _breakers.setdefault(operation, CircuitBreaker(operation))
+
+    def decorate(fn: Callable[..., Awaitable]):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if not breaker.allow():
+                raise BackendUnavailable(operation, "circuit open", breaker.retry_after())
+            try:
+                async with asyncio.timeout(deadline):
+                    result = await fn(*args, **kwargs)
+            except Exception as e:
+                if is_outage(e):
+                    breaker.record(True)
+                    reason = f"no answer within {deadline:g}s" if isinstance(e, TimeoutError) else repr(e)
+                    raise BackendUnavailable(operation, reason, breaker.retry_after()) from e
+                breaker.record(False)
+                if default is _RAISE:
+                    raise
+                return default
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record(False)
+            return result
+
+        return wrapper
+
+    return decorate
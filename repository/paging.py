@@ -0,0 +1,77 @@
+import asyncio
+import os
+from collections.abc import AsyncIterator, Callable, Collection
+
+# Must not exceed PostgREST's max-rows, otherwise a truncated page looks like the last one.
+DEFAULT_PAGE_SIZE: int = int(os.getenv("DB_PAGE_SIZE", "500"))
+
+
+def with_columns(select: str, columns: tuple[str, ...]) -> str:
+    """Ensure the keyset columns are part of a select list."""
+    present = {c.strip() for c in select.split(",")}
+    if "*" in present:
+        return select
+    missing = [c for c in columns if c not in present]
+    return ", ".join([select, *missing]) if missing else select
+
+
+def keyset_after(query, order_by: tuple[str, ...], last: dict, descending: Collection[str] = ()):
+    """
+    Filter to rows strictly after `last` in (col1, col2, ...) order. Columns
+    are ascending unless listed in `descending`.
+    """
+    def op(col: str) -> str:
+        return "lt" if col in descending else "gt"
+
+    if len(order_by) == 1:
+        col = order_by[0]
+        return getattr(query, op(col))(col, last[col])
+
+    branches = []
+    for i, col in enumerate(order_by):
+        terms = [f'{prev}.eq."{last[prev]}"' for prev in order_by[:i]]
+        terms.append(f'{col}.{op(col)}."{last[col]}"')
+        branches.append(terms[0] if len(terms) == 1 else f"and({','.join(terms)})")
+    return query.or_(",".join(branches))
+
+
+async def iter_keyset_pages(
+        build_query: Callable,
+        order_by: tuple[str, ...] = ("id",),
+        page_size: int = DEFAULT_PAGE_SIZE,
+) -> AsyncIterator[list[dict]]:
+    """
+    Yield successive pages of a PostgREST select, paging on `order_by` (which
+    must end in a unique column and be present in the select list).
+
+    `build_query` returns a fresh, filtered but unordered query builder. The
+    next page is fetched while the caller consumes the current one. Errors
+    propagate so a failed page is never mistaken for the end of the table.
+    """
+
+    async def fetch(last: dict | None) -> list[dict]:
+        query = build_query()
+        if last is not None:
+            query = keyset_after(query, order_by, last)
+        for col in order_by:
+            query = query.order(col)
+        res = await query.limit(page_size).execute()
+        return res.data or []
+
+    pending: asyncio.Task | None = asyncio.create_task(fetch(None))
+    try:
+        while pending is not None:
+            rows = await pending
+            pending = asyncio.create_task(fetch(rows[-1])) if len(rows) == page_size else None
+            if rows:
+                yield rows
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+async def collect_pages(pages: AsyncIterator[list[dict]]) -> list[dict]:
+    rows: list[dict] = []
+    async for page in pages:
+        rows.extend(page)
+    return rows
@@ -1,23 +1,53 @@
+import asyncio
+from collections.abc import AsyncIterator
 from typing import Optional
 
+from config.postgres import columns, param, postgres
 from config.supabase import supabase_admin
+from repository.batch import BatchLoader
+from repository.guard import DB_STATS_DEADLINE, DB_WRITE_DEADLINE, guarded
+from repository.paging import DEFAULT_PAGE_SIZE, collect_pages, iter_keyset_pages, with_columns
+from schema.rows import RegistrationRow
 
+_EVENT_ORDER: tuple[str, ...] = ("registered_at", "id")
+_PARTICIPANT_COLUMNS = "name, email, role, participant_type, student_id, university, organization, job_role"
+_USER_EVENT_COLUMNS: tuple[str, ...] = ("id", "title", "location", "start_time", "whatsapp_link", "is_active")
 
+
+@guarded("registrations.select", default=[])
 async def get_user_registrations(user_qr_code: str) -> list[dict]:
-    try:
-        res = await (
-            supabase_admin.table("registrations")
-            .select("id, event_id, registered_at, attended_at")
-            .eq("user_qr_code", user_qr_code)
-            .order("registered_at")
-            .execute()
+    """A user's registrations, each with its event (active or not) embedded under "event"."""
+    if postgres.enabled:
+        rows = await postgres.fetch(
+            "SELECT r.id, r.event_id, r.registered_at, r.attended_at, "
+            + ", ".join(f"e.{c} AS ev_{c}" for c in _USER_EVENT_COLUMNS)
+            + " FROM registrations r LEFT JOIN events e ON e.id = r.event_id"
+            " WHERE r.user_qr_code = $1 ORDER BY r.registered_at",
+            user_qr_code,
         )
-        return res.data or []
-    except Exception:
-        return []
+        for r in rows:
+            event = {c: r.pop(f"ev_{c}") for c in _USER_EVENT_COLUMNS}
+            r["event"] = event if event["id"] is not None else None
+        return rows
+    res = await (
+        supabase_admin.table("registrations")
+        .select(f"id, event_id, registered_at, attended_at, event:events({', '.join(_USER_EVENT_COLUMNS)})")
+        .eq("user_qr_code", user_qr_code)
+        .order("registered_at")
+        .execute()
+    )
+    return res.data or []
 
 
+@guarded("registrations.insert", deadline=DB_WRITE_DEADLINE)
 async def create_registration(reg_data: dict) -> dict:
+    if postgres.enabled:
+        cols = columns(", ".join(reg_data))
+        values = ", ".join(f"${i}" for i in range(1, len(reg_data) + 1))
+        return await postgres.fetchrow(
+            f"INSERT INTO registrations ({cols}) VALUES ({values}) RETURNING *",
+            *(param(k, v) for k, v in reg_data.items()),
+        )
     res = await (
         supabase_admin.table("registrations")
         .insert(reg_data)
@@ -26,19 +56,62 @@ async def create_registration(reg_data: dict) -> dict:
     return res.data[0]
 
 
+@guarded("registrations.insert", deadline=DB_WRITE_DEADLINE)
+async def insert_new_registrations(rows: list[dict]) -> list[dict]:
+    """Insert a batch of registrations, skipping users already registered for the event; returns the inserted rows."""
+    res = await (
+        supabase_admin.table("registrations")
+        .upsert(rows, on_conflict="user_qr_code,event_id", ignore_duplicates=True)
+        .execute()
+    )
+    return res.data or []
+
+
+@guarded("registrations.select", default=None)
 async def get_registration_by_id(reg_id: str, select: str = "*", user_qr_code: Optional[str] = None) -> Optional[dict]:
-    try:
-        query = supabase_admin.table("registrations").select(select).eq("id", reg_id)
-        if user_qr_code:
-            query = query.eq("user_qr_code", user_qr_code)
+    query = supabase_admin.table("registrations").select(select).eq("id", reg_id)
+    if user_qr_code:
+        query = query.eq("user_qr_code", user_qr_code)
 
-        res = await query.single().execute()
-        return res.data
-    except Exception:
-        return None
+    res = await query.single().execute()
+    return res.data
 
 
+@guarded("registrations.select")
+async def _fetch_registrations_by_ids(reg_ids: list[str]) -> list[dict]:
+    if postgres.enabled:
+        return await postgres.fetch(
+            "SELECT id, user_qr_code, event_id, attended_at FROM registrations WHERE id = ANY($1)", reg_ids)
+    res = await (
+        supabase_admin.table("registrations")
+        .select("id, user_qr_code, event_id, attended_at")
+        .in_("id", reg_ids)
+        .execute()
+    )
+    return res.data or []
+
+
+_registrations_by_id = BatchLoader(_fetch_registrations_by_ids, "id")
+
+
+async def load_registration_by_id(reg_id: str) -> Optional[dict]:
+    """
+    Id, user, event and attended_at of a registration, batched with
+    concurrent lookups. Unlike get_registration_by_id, errors propagate.
+    """
+    return await _registrations_by_id.load(reg_id)
+
+
+@guarded("registrations.update", deadline=DB_WRITE_DEADLINE)
 async def update_registration(reg_id: str, update_data: dict) -> None:
+    if postgres.enabled:
+        columns(", ".join(update_data))
+        assignments = ", ".join(f"{k} = ${i}" for i, k in enumerate(update_data, start=2))
+        await postgres.execute(
+            f"UPDATE registrations SET {assignments} WHERE id = $1",
+            reg_id, *(param(k, v) for k, v in update_data.items()),
+        )
+        return
     await (
         supabase_admin.table("registrations")
         .update(update_data)
@@ -47,31 +120,92 @@ async def update_registration(reg_id: str, update_data: dict) -> None:
     )
 
 
+async def iter_all_registrations(
+        select: str = "user_qr_code, attended_at",
+        page_size: int = DEFAULT_PAGE_SIZE,
+) -> AsyncIterator[list[dict]]:
+    """Pages of every registration, keyed on id."""
+    select = with_columns(select, ("id",))
+    async for page in iter_keyset_pages(
+            lambda: supabase_admin.table("registrations").select(select),
+            ("id",), page_size,
+    ):
+        yield page
+
+
 async def get_all_registrations(select: str = "user_qr_code, attended_at") -> list[dict]:
-    try:
-        res = await (
-            supabase_admin.table("registrations")
-            .select(select)
-            .execute()
-        )
-        return res.data or []
-    except Exception:
-        return []
+    return await collect_pages(iter_all_registrations(select))
+
+
+async def iter_registrations_for_event(
+        event_id: str,
+        select: str = "user_qr_code, registered_at, attended_at",
+        page_size: int = DEFAULT_PAGE_SIZE,
+) -> AsyncIterator[list[dict]]:
+    """Pages of an event's registrations in registration order, keyed on (registered_at, id)."""
+    select = with_columns(select, _EVENT_ORDER)
+    async for page in iter_keyset_pages(
+            lambda: supabase_admin.table("registrations").select(select).eq("event_id", event_id),
+            _EVENT_ORDER, page_size,
+    ):
+        yield page
 
 
 async def get_registrations_for_event(event_id: str, select: str = "user_qr_code, registered_at, attended_at") -> list[
     dict]:
-    try:
-        res = await (
-            supabase_admin.table("registrations")
-            .select(select)
-            .eq("event_id", event_id)
-            .order("registered_at")
-            .execute()
-        )
-        return res.data or []
-    except Exception:
-        return []
+    return await collect_pages(iter_registrations_for_event(event_id, select))
+
+
+async def iter_registration_rows(
+        event_id: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        with_user: bool = False,
+        with_event: bool = False,
+) -> AsyncIterator[list[RegistrationRow]]:
+    """
+    Pages of registrations as compact records — one event, or every event if
+    `event_id` is None. The registrant's profile and the event title can be
+    embedded, so each page is a single request however large the event.
+    """
+    select = "id, user_qr_code, event_id, registered_at, attended_at"
+    if with_user:
+        select += f", user:users({_PARTICIPANT_COLUMNS})"
+    if with_event:
+        select += ", event:events(title)"
+    if event_id is None:
+        pages = iter_all_registrations(select, page_size)
+    else:
+        pages = iter_registrations_for_event(event_id, select, page_size)
+
+    async for page in pages:
+        yield [RegistrationRow.from_record(r) for r in page]
+
+
+@guarded("registrations.count")
+async def count_event_registrations(event_id: str) -> int:
+    if postgres.enabled:
+        return await postgres.fetchval("SELECT count(*) FROM registrations WHERE event_id = $1", event_id)
+    res = await (
+        supabase_admin.table("registrations")
+        .select("id", count="exact")
+        .eq("event_id", event_id)
+        .limit(1)
+        .execute()
+    )
+    return res.count or 0
+
+
+@guarded("registrations.delete", deadline=DB_WRITE_DEADLINE)
+async def delete_registration(reg_id: str) -> None:
+    if postgres.enabled:
+        await postgres.execute("DELETE FROM registrations WHERE id = $1", reg_id)
+        return
+    await (
+        supabase_admin.table("registrations")
+        .delete()
+        .eq("id", reg_id)
+        .execute()
+    )
 
 
 async def delete_registrations_for_user(user_qr_code: str) -> None:
@@ -83,15 +217,88 @@ async def delete_registrations_for_user(user_qr_code: str) -> None:
     )
 
 
+@guarded("registrations.attended_count", deadline=DB_STATS_DEADLINE)
 async def get_attended_count() -> int:
-    try:
-        res = await (
-            supabase_admin.table("registrations")
-            .select("user_qr_code")
-            .not_.is_("attended_at", "null")
-            .execute()
-        )
-        # Returns distinct users attended
-        return len({r["user_qr_code"] for r in (res.data or [])})
-    except Exception:
-        return 0
+    """
+    Distinct users with a checked-in registration, counted in one query.
+    Stats have their own breaker: a slow dashboard count must not open the
+    one that seat admission counts under.
+    """
+    if postgres.enabled:
+        return await postgres.fetchval(
+            "SELECT count(DISTINCT user_qr_code) FROM registrations WHERE attended_at IS NOT NULL")
+    # Users joined to an attended registration: each counts once, whatever they attended
+    res = await (
+        supabase_admin.table("users")
+        .select("qr_code_data, registrations!inner(attended_at)", count="exact")
+        .not_.is_("registrations.attended_at", "null")
+        .limit(1)
+        .execute()
+    )
+    return res.count or 0
+
+
+async def get_registrations_for_event_since(
+        event_id: str,
+        since: Optional[str] = None,
+        attended_since: Optional[str] = None,
+        select: str = "user_qr_code, registered_at, attended_at",
+) -> list[dict]:
+    """
+    Registrations for an event created at or after `since`, or checked in at
+    or after `attended_since` (ISO timestamps; every check-in when it is
+    None). The bounds are inclusive so rows sharing a watermark's timestamp
+    are not lost; a row can come back from both queries, and each row
+    carries its id so callers can dedupe. Errors propagate so callers can
+    tell "nothing changed" from "lookup failed".
+    """
+    if not since:
+        return await collect_pages(iter_registrations_for_event(event_id, select))
+
+    registered_select = with_columns(select, _EVENT_ORDER)
+    attended_order = ("attended_at", "id")
+    attended_select = with_columns(select, attended_order)
+
+    def _attended():
+        query = supabase_admin.table("registrations").select(attended_select).eq("event_id", event_id)
+        return query.gte("attended_at", attended_since) if attended_since else query.not_.is_("attended_at", "null")
+
+    registered, attended = await asyncio.gather(
+        collect_pages(iter_keyset_pages(
+            lambda: supabase_admin.table("registrations").select(registered_select)
+            .eq("event_id", event_id).gte("registered_at", since),
+            _EVENT_ORDER,
+        )),
+        collect_pages(iter_keyset_pages(_attended, attended_order)),
+    )
+    return registered + attended
+
+
+async def get_registrations_for_users(
+        user_qr_codes: list[str],
+        select: str = "user_qr_code, attended_at",
+) -> list[dict]:
+    """All registrations belonging to a batch of users, keyed on id."""
+    select = with_columns(select, ("id",))
+    return await collect_pages(iter_keyset_pages(
+        lambda: supabase_admin.table("registrations").select(select).in_("user_qr_code", user_qr_codes),
+        ("id",),
+    ))
+
+
+async def get_registrations_version(event_id: Optional[str] = None) -> tuple[int, Optional[str], Optional[str]]:
+    """(row count, latest registered_at, latest attended_at) — a cheap change marker for exports."""
+
+    def _query(select: str, count: Optional[str] = None):
+        query = supabase_admin.table("registrations").select(select, count=count)
+        return query.eq("event_id", event_id) if event_id else query
+
+    latest_reg, latest_att = await asyncio.gather(
+        _query("registered_at", count="exact").order("registered_at", desc=True).limit(1).execute(),
+        _query("attended_at").not_.is_("attended_at", "null").order("attended_at", desc=True).limit(1).execute(),
+    )
+    return (
+        latest_reg.count or 0,
+        latest_reg.data[0]["registered_at"] if latest_reg.data else None,
+        latest_att.data[0]["attended_at"] if latest_att.data else None,
+    )
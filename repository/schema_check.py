@@ -0,0 +1,55 @@
+"""
+Startup check that the database has the columns and tables the repository
+queries select.
+
+Every events query asks for `capacity, waitlist`, the events pages read
+the `waitlist` table, and first logins and the bulk import match users on
+`email_lower`. Without the migration in the README each of those
+queries fails with a 400, and the guarded reads turn that into an empty
+result, so the site would quietly show no events. Failing at startup with
+the missing names makes the missing migration obvious instead.
+"""
+from postgrest.exceptions import APIError
+
+from config.supabase import supabase_admin
+from repository.guard import is_outage
+
+# table -> the columns the repository selects that a migration added
+REQUIRED_COLUMNS: dict[str, str] = {
+    "events": "capacity, waitlist",
+    "waitlist": "id, event_id, user_qr_code, joined_at",
+    "users": "email_lower",
+}
+# Undefined column / table, and PostgREST's schema-cache versions of the same
+_MISSING_CODES: frozenset[str] = frozenset({"42703", "42P01", "PGRST204", "PGRST205"})
+
+
+class SchemaMismatch(RuntimeError):
+    """The database is missing columns or tables that the code needs; run the migration in the README."""
+
+
+async def check_schema() -> None:
+    """
+    Raise SchemaMismatch naming every missing table or column set. An
+    unreachable database is not a mismatch: the check is skipped and the
+    guarded calls deal with the outage as usual.
+    """
+    missing = []
+    for table, columns in REQUIRED_COLUMNS.items():
+        try:
+            await supabase_admin.table(table).select(columns).limit(1).execute()
+        except APIError as e:
+            if str(e.code) not in _MISSING_CODES:
+                if is_outage(e):
+                    return
+                raise
+            missing.append(f"{table} ({columns}): {e.message}")
+        except Exception as e:
+            if is_outage(e):
+                return
+            raise
+    if missing:
+        raise SchemaMismatch(
+            "Database schema is out of date; run the migration in the README (Setup, step 5). Missing: "
+            + "; ".join(missing)
+        )
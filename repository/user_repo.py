@@ -1,24 +1,47 @@
+import asyncio
+import os
+import time
+from collections.abc import AsyncIterator
 from typing import Optional
 
+from config.postgres import columns, postgres
 from config.supabase import supabase_admin
+from repository.batch import BatchLoader
+from repository.guard import BackendUnavailable, DB_WRITE_DEADLINE, guarded
+from repository.paging import DEFAULT_PAGE_SIZE, collect_pages, iter_keyset_pages, keyset_after, with_columns
+from schema.rows import ParticipantRow
 
+# How the admin users list is counted:
+#   exact     - count(*) on every request
+#   planned   - the planner's row estimate (cheap, approximate)
+#   estimated - exact below PostgREST's max-rows, planner estimate above it
+#   cached    - an exact total held in process, adjusted on create/delete and
+#               re-synced every USER_COUNT_RESYNC seconds (searches count exactly)
+USER_COUNT_MODE: str = os.getenv("USER_COUNT_MODE", "cached")
+USER_COUNT_RESYNC: float = float(os.getenv("USER_COUNT_RESYNC", "300"))
+_EXACT_BELOW: int = 1000  # PostgREST max-rows; "estimated" counts are exact under it
+# Users created by a bulk import have no login yet; their github_id is this prefix plus their qr code
+IMPORTED_GITHUB_ID_PREFIX: str = "import:"
 
+_user_total: Optional[int] = None
+_user_total_at: float = 0.0
+
+
+@guarded("users.select", default=None)
 async def get_user_by_github_id(github_id: str) -> Optional[dict]:
-    try:
-        res = await (
-            supabase_admin.table("users")
-            .select("github_id, name, email, avatar_url, qr_code_data, role, registered_event_id, attended_at")
-            .eq("github_id", github_id)
-            .limit(1)
-            .execute()
-        )
-        return res.data[0] if res.data else None
-    except Exception:
-        return None
+    res = await (
+        supabase_admin.table("users")
+        .select("github_id, name, email, avatar_url, qr_code_data, role, registered_event_id, attended_at")
+        .eq("github_id", github_id)
+        .limit(1)
+        .execute()
+    )
+    return res.data[0] if res.data else None
 
 
 async def create_user(user_data: dict) -> dict:
     res = await supabase_admin.table("users").insert(user_data).execute()
+    _adjust_user_total(len(res.data))
     return res.data[0]
 
 
@@ -31,33 +54,99 @@ async def update_user_by_github_id(github_id: str, update_data: dict) -> None:
     )
 
 
+async def claim_imported_user(email: str, github_id: str, update_data: dict) -> Optional[dict]:
+    """
+    Link a user created by a bulk import (placeholder github_id) to its first
+    login with the same email, in any case; None if there is none.
+    """
+    res = await (
+        supabase_admin.table("users")
+        .update({**update_data, "github_id": github_id})
+        .eq("email_lower", email.lower())
+        .like("github_id", f"{IMPORTED_GITHUB_ID_PREFIX}%")
+        .execute()
+    )
+    return res.data[0] if res.data else None
+
+
+@guarded("users.select")
+async def get_users_by_emails(emails: list[str], select: str = "qr_code_data, email, name") -> list[dict]:
+    """Users whose email matches one of `emails`, ignoring case (email_lower is generated from email)."""
+    res = await (
+        supabase_admin.table("users")
+        .select(select)
+        .in_("email_lower", [e.lower() for e in emails])
+        .execute()
+    )
+    return res.data or []
+
+
+@guarded("users.insert", deadline=DB_WRITE_DEADLINE)
+async def insert_new_users(rows: list[dict]) -> list[dict]:
+    """Insert a batch of users, skipping emails that already exist in any case; returns the inserted rows."""
+    res = await (
+        supabase_admin.table("users")
+        .upsert(rows, on_conflict="email_lower", ignore_duplicates=True)
+        .execute()
+    )
+    _adjust_user_total(len(res.data or []))
+    return res.data or []
+
+
+@guarded("users.select", default=None)
 async def get_user_by_qr_code(qr_code_data: str, select: str = "*") -> Optional[dict]:
-    try:
-        res = await (
-            supabase_admin.table("users")
-            .select(select)
-            .eq("qr_code_data", qr_code_data)
-            .limit(1)
-            .execute()
-        )
-        return res.data[0] if res.data else None
-    except Exception:
-        return None
+    if postgres.enabled:
+        return await postgres.fetchrow(
+            f"SELECT {columns(select)} FROM users WHERE qr_code_data = $1 LIMIT 1", qr_code_data)
+    res = await (
+        supabase_admin.table("users")
+        .select(select)
+        .eq("qr_code_data", qr_code_data)
+        .limit(1)
+        .execute()
+    )
+    return res.data[0] if res.data else None
 
 
+@guarded("users.select")
 async def get_users_by_qr_codes(qr_codes: list[str], select: str = "*") -> list[dict]:
+    """Users for a batch of qr codes. Errors propagate: a failed lookup is not "no such users"."""
+    if postgres.enabled:
+        return await postgres.fetch(f"SELECT {columns(select)} FROM users WHERE qr_code_data = ANY($1)", qr_codes)
+    res = await (
+        supabase_admin.table("users")
+        .select(select)
+        .in_("qr_code_data", qr_codes)
+        .execute()
+    )
+    return res.data or []
+
+
+_USER_BATCH_SELECT = "qr_code_data, name, email, avatar_url, attended_at"
+
+
+@guarded("users.select")
+async def _fetch_users_by_qr_codes(qr_codes: list[str]) -> list[dict]:
+    if postgres.enabled:
+        return await postgres.fetch(f"SELECT {_USER_BATCH_SELECT} FROM users WHERE qr_code_data = ANY($1)", qr_codes)
+    res = await supabase_admin.table("users").select(_USER_BATCH_SELECT).in_("qr_code_data", qr_codes).execute()
+    return res.data or []
+
+
+_users_by_qr_code = BatchLoader(_fetch_users_by_qr_codes, "qr_code_data")
+
+
+async def load_user_by_qr_code(qr_code_data: str) -> Optional[dict]:
+    """Like get_user_by_qr_code, but batched with concurrent lookups; _USER_BATCH_SELECT columns only."""
     try:
-        res = await (
-            supabase_admin.table("users")
-            .select(select)
-            .in_("qr_code_data", qr_codes)
-            .execute()
-        )
-        return res.data or []
+        return await _users_by_qr_code.load(qr_code_data)
+    except BackendUnavailable:
+        raise
     except Exception:
-        return []
+        return None
 
 
+@guarded("users.update", deadline=DB_WRITE_DEADLINE)
 async def update_user_by_qr_code(qr_code_data: str, update_data: dict) -> None:
     await (
         supabase_admin.table("users")
@@ -67,52 +156,183 @@ async def update_user_by_qr_code(qr_code_data: str, update_data: dict) -> None:
     )
 
 
-async def get_paginated_users(offset: int, limit: int, search: str = "") -> tuple[list[dict], int]:
+_USER_LIST_SELECT = (
+    "id, github_id, name, email, avatar_url, role, created_at, participant_type, student_id, university, "
+    "study_year, organization, job_role"
+)
+# Admin users list order; id makes the key unique so it can be used as a cursor
+USER_LIST_ORDER: tuple[str, ...] = ("role", "created_at", "id")
+_USER_LIST_DESC: frozenset[str] = frozenset({"created_at"})
+
+
+def _user_list_query(search: str = "", **select_kwargs):
+    query = supabase_admin.table("users").select(_USER_LIST_SELECT, **select_kwargs)
+    if search:
+        query = query.or_(f"name.ilike.%{search}%,email.ilike.%{search}%")
+    return query
+
+
+def _count_method(search: str) -> Optional[str]:
+    """PostgREST count option for a users list query; None when the cached total answers instead."""
+    if USER_COUNT_MODE == "cached":
+        return "exact" if search else None
+    return USER_COUNT_MODE
+
+
+def _is_estimate(method: Optional[str], total: int) -> bool:
+    return method == "planned" or (method == "estimated" and total >= _EXACT_BELOW)
+
+
+def _adjust_user_total(delta: int) -> None:
+    global _user_total
+    if _user_total is not None:
+        _user_total = max(0, _user_total + delta)
+
+
+async def _cached_user_total() -> int:
+    global _user_total, _user_total_at
+    if _user_total is None or time.monotonic() - _user_total_at > USER_COUNT_RESYNC:
+        res = await supabase_admin.table("users").select("id", count="exact").limit(1).execute()
+        _user_total, _user_total_at = res.count or 0, time.monotonic()
+    return _user_total
+
+
+async def get_paginated_users(offset: int, limit: int, search: str = "") -> tuple[list[dict], int, bool]:
+    """One offset page of the admin users list, plus (total, whether the total is an estimate)."""
+    method = _count_method(search)
     query = (
-        supabase_admin.table("users")
-        .select(
-            "github_id, name, email, avatar_url, role, created_at, participant_type, student_id, university, study_year, organization, job_role",
-            count="exact")
+        _user_list_query(search, count=method)
         .order("role")
         .order("created_at", desc=True)
+        .order("id")
         .range(offset, offset + limit - 1)
     )
+
+    if method is None:
+        res, total = await asyncio.gather(query.execute(), _cached_user_total())
+    else:
+        res = await query.execute()
+        total = res.count or 0
+    return res.data or [], total, _is_estimate(method, total)
+
+
+async def get_users_page_after(
+        key: Optional[tuple],
+        limit: int,
+        search: str = "",
+        backwards: bool = False,
+) -> tuple[list[dict], bool]:
+    """
+    One page of the admin users list starting after `key` (a USER_LIST_ORDER
+    tuple), or before it when `backwards`. Unlike an offset, the cost does not
+    grow with depth. Returns the rows in list order and whether more rows
+    exist beyond them in the direction of travel.
+    """
+    descending = set(USER_LIST_ORDER) - _USER_LIST_DESC if backwards else _USER_LIST_DESC
+    query = _user_list_query(search)
+    if key is not None:
+        query = keyset_after(query, USER_LIST_ORDER, dict(zip(USER_LIST_ORDER, key)), descending)
+    for col in USER_LIST_ORDER:
+        query = query.order(col, desc=col in descending)
+
+    res = await query.limit(limit + 1).execute()
+    rows = res.data or []
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+    return rows, has_more
+
+
+async def get_user_list_rows(github_ids: list[str]) -> list[dict]:
+    """Admin users list rows for the given github ids, in no particular order."""
+    if not github_ids:
+        return []
+    res = await supabase_admin.table("users").select(_USER_LIST_SELECT).in_("github_id", github_ids).execute()
+    return res.data or []
+
+
+async def count_users(search: str = "") -> tuple[int, bool]:
+    """(total, whether it is an estimate) for the admin users list, per USER_COUNT_MODE."""
+    method = _count_method(search)
+    if method is None:
+        return await _cached_user_total(), False
+
+    query = supabase_admin.table("users").select("id", count=method)
     if search:
         query = query.or_(f"name.ilike.%{search}%,email.ilike.%{search}%")
+    res = await query.limit(1).execute()
+    total = res.count or 0
+    return total, _is_estimate(method, total)
+
 
-    res = await query.execute()
-    return res.data or [], res.count or 0
+async def iter_users(select: str = "github_id, name, email", page_size: int = DEFAULT_PAGE_SIZE) -> AsyncIterator[list[dict]]:
+    """Pages of every user, keyed on id."""
+    select = with_columns(select, ("id",))
+    async for page in iter_keyset_pages(lambda: supabase_admin.table("users").select(select), ("id",), page_size):
+        yield page
+
+
+async def iter_participants(
+        select: str = "qr_code_data, name, email, role",
+        page_size: int = DEFAULT_PAGE_SIZE,
+) -> AsyncIterator[list[dict]]:
+    """Pages of participant users, keyed on id."""
+    select = with_columns(select, ("id",))
+    async for page in iter_keyset_pages(
+            lambda: supabase_admin.table("users").select(select).eq("role", "participant"),
+            ("id",), page_size,
+    ):
+        yield page
+
+
+async def iter_participant_rows(
+        page_size: int = DEFAULT_PAGE_SIZE,
+        with_counts: bool = False,
+) -> AsyncIterator[list[ParticipantRow]]:
+    """Pages of participants as compact records, optionally with their registered/attended counts embedded."""
+    select = "qr_code_data, name, email, role"
+    if with_counts:
+        select += ", registrations(attended_at)"
+    async for page in iter_participants(select=select, page_size=page_size):
+        yield [ParticipantRow.from_record(u) for u in page]
 
 
 async def get_all_participants() -> list[dict]:
-    try:
-        res = await (
-            supabase_admin.table("users")
-            .select("qr_code_data, name, email, role")
-            .eq("role", "participant")
-            .order("name")
-            .execute()
-        )
-        return res.data or []
-    except Exception:
-        return []
+    users = await collect_pages(iter_participants())
+    users.sort(key=lambda u: u.get("name") or "")
+    return users
 
 
+@guarded("users.count")
 async def get_registered_participant_count() -> int:
-    try:
-        res = await supabase_admin.table("users").select("id", count="exact").eq("role", "participant").execute()
-        return res.count or 0
-    except Exception:
-        return 0
+    if postgres.enabled:
+        return await postgres.fetchval("SELECT count(*) FROM users WHERE role = 'participant'")
+    res = await supabase_admin.table("users").select("id", count="exact").eq("role", "participant").execute()
+    return res.count or 0
+
+
+async def get_participants_version() -> tuple[int, Optional[str]]:
+    """(participant count, latest updated_at) — a cheap change marker for exports."""
+    res = await (
+        supabase_admin.table("users")
+        .select("updated_at", count="exact")
+        .eq("role", "participant")
+        .order("updated_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    return res.count or 0, res.data[0]["updated_at"] if res.data else None
 
 
 async def delete_user_by_github_id(github_id: str) -> None:
-    await (
+    res = await (
         supabase_admin.table("users")
         .delete()
         .eq("github_id", github_id)
         .execute()
     )
+    _adjust_user_total(-len(res.data or []))
 
 
 async def nullify_registered_event_id(event_id: str) -> None:
@@ -0,0 +1,89 @@
+from config.supabase import supabase_admin
+from repository.guard import DB_WRITE_DEADLINE, guarded
+
+_USER_EVENT_COLUMNS = "id, title, location, start_time, whatsapp_link, is_active"
+
+
+@guarded("waitlist.insert", deadline=DB_WRITE_DEADLINE)
+async def add_to_waitlist(event_id: str, user_qr_code: str) -> dict:
+    res = await (
+        supabase_admin.table("waitlist")
+        .insert({"event_id": event_id, "user_qr_code": user_qr_code})
+        .execute()
+    )
+    return res.data[0]
+
+
+@guarded("waitlist.select")
+async def get_waitlist_position(event_id: str, joined_at: str) -> int:
+    """1-based place in the queue of the entry that joined at `joined_at`."""
+    res = await (
+        supabase_admin.table("waitlist")
+        .select("id", count="exact")
+        .eq("event_id", event_id)
+        .lte("joined_at", joined_at)
+        .limit(1)
+        .execute()
+    )
+    return res.count or 0
+
+
+@guarded("waitlist.select")
+async def get_waitlist_head(event_id: str, limit: int, select: str = "id, user_qr_code, joined_at") -> list[dict]:
+    """The `limit` longest-waiting entries for an event, first come first."""
+    res = await (
+        supabase_admin.table("waitlist")
+        .select(select)
+        .eq("event_id", event_id)
+        .order("joined_at")
+        .order("id")
+        .limit(limit)
+        .execute()
+    )
+    return res.data or []
+
+
+@guarded("waitlist.select", default=[])
+async def get_user_waitlist(user_qr_code: str) -> list[dict]:
+    """A user's waitlist entries, each with its event embedded under "event"."""
+    res = await (
+        supabase_admin.table("waitlist")
+        .select(f"id, event_id, joined_at, event:events({_USER_EVENT_COLUMNS})")
+        .eq("user_qr_code", user_qr_code)
+        .order("joined_at")
+        .execute()
+    )
+    return res.data or []
+
+
+@guarded("waitlist.delete", deadline=DB_WRITE_DEADLINE)
+async def delete_waitlist_entry(entry_id: str) -> None:
+    await (
+        supabase_admin.table("waitlist")
+        .delete()
+        .eq("id", entry_id)
+        .execute()
+    )
+
+
+@guarded("waitlist.delete", deadline=DB_WRITE_DEADLINE)
+async def delete_waitlist_entries(entry_ids: list[str]) -> None:
+    await (
+        supabase_admin.table("waitlist")
+        .delete()
+        .in_("id", entry_ids)
+        .execute()
+    )
+
+
+@guarded("waitlist.delete", deadline=DB_WRITE_DEADLINE)
+async def delete_user_waitlist_entry(event_id: str, user_qr_code: str) -> bool:
+    """Take a user off an event's waitlist; False if they were not on it."""
+    res = await (
+        supabase_admin.table("waitlist")
+        .delete()
+        .eq("event_id", event_id)
+        .eq("user_qr_code", user_qr_code)
+        .execute()
+    )
+    return bool(res.data)
@@ -1,5 +1,6 @@
 from .auth import GitHubUser, SessionUser
 from .event import Event
+from .rows import ParticipantRow, RegistrationRow
 from .user import User, CreateUser, VerifyUser
 
 __all__ = [
@@ -8,5 +9,7 @@ __all__ = [
     "CreateUser",
     "VerifyUser",
     "GitHubUser",
-    "SessionUser"
+    "SessionUser",
+    "ParticipantRow",
+    "RegistrationRow"
 ]
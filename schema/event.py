@@ -14,6 +14,8 @@ class Event(BaseModel):
     image_url: Optional[str] = None
     whatsapp_link: Optional[str] = None
     is_active: bool = True
+    capacity: Optional[int] = None  # None: unlimited
+    waitlist: bool = False  # queue registrations once full
     created_at: Optional[datetime] = None
 
     class Config:
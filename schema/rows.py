@@ -0,0 +1,94 @@
+"""
+Compact row records for bulk admin and export paths.
+
+Pydantic models and merged dicts cost several hundred bytes of overhead per
+row; these slotted dataclasses carry only the fields exports need, and
+low-cardinality strings (role, participant type, event id, affiliations) are
+interned so thousands of rows share one copy of each value.
+"""
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(slots=True)
+class ParticipantRow:
+    """A participant with their all-time registration and attendance counts."""
+    qr_code_data: str
+    name: Optional[str] = None
+    email: Optional[str] = None
+    role: Optional[str] = None
+    participant_type: Optional[str] = None
+    student_id: Optional[str] = None
+    university: Optional[str] = None
+    organization: Optional[str] = None
+    job_role: Optional[str] = None
+    events_registered: int = 0
+    events_attended: int = 0
+
+    @classmethod
+    def from_record(cls, d: dict) -> "ParticipantRow":
+        row = cls(
+            qr_code_data=d["qr_code_data"],
+            name=d.get("name"),
+            email=d.get("email"),
+            role=_intern(d.get("role")),
+            participant_type=_intern(d.get("participant_type")),
+            student_id=d.get("student_id"),
+            university=_intern(d.get("university")),
+            organization=_intern(d.get("organization")),
+            job_role=_intern(d.get("job_role")),
+        )
+        if "registrations" in d:  # embedded registrations(attended_at)
+            row.events_registered = len(d["registrations"])
+            row.events_attended = sum(1 for r in d["registrations"] if r.get("attended_at"))
+        return row
+
+
+@dataclass(slots=True)
+class RegistrationRow:
+    """A registration joined with the registrant's profile (and, for badges, the event title)."""
+    registration_id: Optional[str]
+    user_qr_code: str
+    event_id: Optional[str] = None
+    registered_at: Optional[str] = None
+    attended_at: Optional[str] = None
+    name: Optional[str] = None
+    email: Optional[str] = None
+    role: Optional[str] = None
+    participant_type: Optional[str] = None
+    student_id: Optional[str] = None
+    university: Optional[str] = None
+    organization: Optional[str] = None
+    job_role: Optional[str] = None
+    event_title: Optional[str] = None
+
+    @classmethod
+    def from_record(cls, d: dict) -> "RegistrationRow":
+        row = cls(
+            registration_id=d.get("id"),
+            user_qr_code=d["user_qr_code"],
+            event_id=_intern(d.get("event_id")),
+            registered_at=d.get("registered_at"),
+            attended_at=d.get("attended_at"),
+        )
+        # Embedded user:users(...) and event:events(title), when selected
+        if d.get("user"):
+            row.set_user(d["user"])
+        if d.get("event"):
+            row.event_title = _intern(d["event"].get("title"))
+        return row
+
+    def set_user(self, u: dict) -> None:
+        self.name = u.get("name")
+        self.email = u.get("email")
+        self.role = _intern(u.get("role"))
+        self.participant_type = _intern(u.get("participant_type"))
+        self.student_id = u.get("student_id")
+        self.university = _intern(u.get("university"))
+        self.organization = _intern(u.get("organization"))
+        self.job_role = _intern(u.get("job_role"))
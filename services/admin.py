@@ -1,121 +1,207 @@
 import asyncio
+import base64
+import json
+import re
 from collections import defaultdict
+from collections.abc import AsyncIterator
 from datetime import datetime, timezone
+from functools import partial
+from typing import Optional
 
-from cachetools import TTLCache
+import qrcode
+from fastapi import HTTPException
 from fpdf import FPDF
 
-from repository.event_repo import get_event_by_id
+from repository.paging import collect_pages
 from repository.registration_repo import (
-    get_attended_count, get_all_registrations, get_registrations_for_event,
-    delete_registrations_for_user
+    get_attended_count, delete_registrations_for_user, iter_all_registrations,
+    iter_registration_rows
 )
 from repository.user_repo import (
-    get_registered_participant_count, get_all_participants as get_all_participants_repo,
-    get_users_by_qr_codes, get_paginated_users as get_paginated_users_repo,
-    update_user_by_github_id, delete_user_by_github_id, get_user_by_github_id
+    get_registered_participant_count, get_paginated_users as get_paginated_users_repo,
+    update_user_by_github_id, delete_user_by_github_id, get_user_by_github_id,
+    iter_participant_rows, get_users_page_after, count_users, get_user_list_rows, USER_LIST_ORDER
 )
+from schema.rows import ParticipantRow, RegistrationRow
+from services.cache import cache
+from services.event import get_event_dict
+from services.registration import qr_payload
+from services.user_search import remove_indexed_user, search_users
 
-_stat_cache = TTLCache(maxsize=1, ttl=60)  # 1 minute
-_paginated_users_cache = TTLCache(maxsize=50, ttl=30)  # 30 seconds only
+EXPORT_PAGE_SIZE: int = 200
 
+_stat_cache = cache("admin.stats", maxsize=1, ttl=60)  # 1 minute
+_paginated_users_cache = cache("admin.user_pages", maxsize=50, ttl=30)  # 30 seconds only
+_user_count_cache = cache("admin.user_counts", maxsize=50, ttl=30)  # search -> total, for cursor pages
+_CURSOR_VALUE = re.compile(r"[\w:.+-]+")
 
-async def fetch_user_stat():
-    if "data" in _stat_cache:
-        return _stat_cache["data"]
 
-    try:
-        reg_task = get_registered_participant_count()
-        att_task = get_attended_count()
-        total_registered, total_attended = await asyncio.gather(reg_task, att_task)
-    except Exception:
-        return _stat_cache.get("data", (0, 0))
+async def _load_user_stat() -> tuple[int, int]:
+    total_registered, total_attended = await asyncio.gather(get_registered_participant_count(), get_attended_count())
+    return total_registered, total_attended
+
 
-    result = (total_registered, total_attended)
-    _stat_cache["data"] = result
-    return result
+async def fetch_user_stat():
+    return await _stat_cache.get_or_load("data", _load_user_stat, default=(0, 0))
 
 
 def invalidate_stat_cache() -> None:
-    _stat_cache.clear()
-
+    _stat_cache.invalidate()
 
-async def get_all_participants():
-    try:
-        users_task = get_all_participants_repo()
-        reg_task = get_all_registrations(select="user_qr_code, attended_at")
-        users, registrations = await asyncio.gather(users_task, reg_task)
-    except Exception:
-        return []
 
-    reg_count: dict = defaultdict(int)
-    att_count: dict = defaultdict(int)
+def _count_attendance(registrations: list[dict], reg_count: dict, att_count: dict) -> None:
     for r in registrations:
         reg_count[r["user_qr_code"]] += 1
         if r["attended_at"]:
             att_count[r["user_qr_code"]] += 1
 
-    return [
-        {
-            **u,
-            "events_registered": reg_count[u["qr_code_data"]],
-            "events_attended": att_count[u["qr_code_data"]],
-            "attended_at": att_count[u["qr_code_data"]] > 0,
-        }
-        for u in users
-    ]
+
+def _with_attendance_counts(users: list[ParticipantRow], reg_count: dict, att_count: dict) -> list[ParticipantRow]:
+    for u in users:
+        u.events_registered = reg_count[u.qr_code_data]
+        u.events_attended = att_count[u.qr_code_data]
+    return users
+
+
+async def get_all_participants() -> list[ParticipantRow]:
+    reg_count: dict = defaultdict(int)
+    att_count: dict = defaultdict(int)
+
+    async def _count_all():
+        # Registration pages are folded into counters as they arrive, never held in full
+        async for page in iter_all_registrations(select="user_qr_code, attended_at"):
+            _count_attendance(page, reg_count, att_count)
+
+    users, _ = await asyncio.gather(collect_pages(iter_participant_rows()), _count_all())
+
+    users.sort(key=lambda u: u.name or "")
+    return _with_attendance_counts(users, reg_count, att_count)
 
 
 async def get_participants_for_event(event_id: str):
-    try:
-        event_task = get_event_by_id(event_id, select="id, title")
-        reg_task = get_registrations_for_event(event_id)
-        event, registrations = await asyncio.gather(event_task, reg_task)
-    except Exception:
-        return [], None
+    async def _collect():
+        participants = []
+        async for page in iter_participants_for_event(event_id):
+            participants.extend(page)
+        return participants
+
+    event, participants = await asyncio.gather(get_event_dict(event_id), _collect())
+    return participants, event
+
+
+async def iter_all_participants(page_size: int = EXPORT_PAGE_SIZE) -> AsyncIterator[list[ParticipantRow]]:
+    """Pages of participants with their all-time registered/attended counts."""
+    async for users in iter_participant_rows(page_size=page_size, with_counts=True):
+        yield users
+
 
-    if not registrations:
-        return [], event
+async def iter_participants_for_event(
+        event_id: Optional[str] = None,
+        page_size: int = EXPORT_PAGE_SIZE,
+) -> AsyncIterator[list[RegistrationRow]]:
+    """
+    Pages of registrations with their user profile — one event, or every
+    event (with event titles) if `event_id` is None.
+    """
+    async for registrations in iter_registration_rows(
+            event_id, page_size=page_size, with_user=True, with_event=event_id is None):
+        yield registrations
 
-    user_qr_codes = [r["user_qr_code"] for r in registrations]
+
+def encode_user_cursor(user: dict) -> str:
+    """Opaque cursor for a row of the admin users list."""
+    key = json.dumps([user.get(c) for c in USER_LIST_ORDER], separators=(",", ":"))
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def decode_user_cursor(cursor: str) -> tuple:
     try:
-        users_res = await get_users_by_qr_codes(user_qr_codes,
-                                                select="qr_code_data, name, email, role, participant_type, student_id, university, organization, job_role")
-        users_by_qr = {u["qr_code_data"]: u for u in users_res}
-    except Exception:
-        users_by_qr = {}
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        key = None
+    # Values end up inside a PostgREST filter string, so only plain tokens are accepted
+    if not (isinstance(key, list) and len(key) == len(USER_LIST_ORDER)
+            and all(_CURSOR_VALUE.fullmatch(str(v)) for v in key)):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return tuple(key)
 
-    participants = []
-    for reg in registrations:
-        user = users_by_qr.get(reg["user_qr_code"], {})
-        participants.append({**user, "attended_at": reg["attended_at"], "registered_at": reg["registered_at"]})
 
-    return participants, event
+async def _count_users(search: str) -> tuple[int, bool]:
+    return await _user_count_cache.get_or_load(search, partial(count_users, search))
 
 
 async def get_paginated_users(page: int = 1, limit: int = 15, search: str = "") -> dict:
     cache_key = (page, limit, search.lower().strip())
+    return await _paginated_users_cache.get_or_load(cache_key, partial(_load_paginated_users, page, limit, search))
 
-    if cache_key in _paginated_users_cache:
-        return _paginated_users_cache[cache_key]
 
+async def _load_paginated_users(page: int, limit: int, search: str) -> dict:
     offset = (page - 1) * limit
-    users, total = await get_paginated_users_repo(offset, limit, search)
-
-    result = {
+    hits = search_users(search, offset, limit) if search.strip() else None
+    if hits is not None:
+        # Ranked matches from the in-process index; rows are fetched by key
+        github_ids, total = hits
+        rows = {u["github_id"]: u for u in await get_user_list_rows(github_ids)}
+        users = [rows[g] for g in github_ids if g in rows]
+        estimated = False
+    else:
+        users, total, estimated = await get_paginated_users_repo(offset, limit, search)
+    pages = -(-total // limit) if total > 0 else 1
+    # Cursors follow list order, which ranked search results do not
+    keyset = hits is None
+    # An estimated total may undercount, so a full page always offers a next one
+    has_next = page < pages or (estimated and len(users) == limit)
+
+    return {
         "users": users,
         "total": total,
+        "estimated": estimated,
         "page": page,
         "limit": limit,
-        "pages": -(-total // limit) if total > 0 else 1
+        "pages": max(pages, page) if estimated and users else pages,
+        "next_cursor": encode_user_cursor(users[-1]) if keyset and users and has_next else None,
+        "prev_cursor": encode_user_cursor(users[0]) if keyset and users and page > 1 else None,
     }
 
-    _paginated_users_cache[cache_key] = result
-    return result
+
+async def get_users_by_cursor(after: str = "", before: str = "", limit: int = 15, search: str = "") -> dict:
+    """
+    A page of the admin users list following `after` or preceding `before`.
+    Same shape as get_paginated_users minus the page number, which a cursor
+    cannot know; `at_start` is set when the page is the first one.
+    """
+    cache_key = ("cursor", after, before, limit, search.lower().strip())
+    key = decode_user_cursor(before or after) if (before or after) else None
+    return await _paginated_users_cache.get_or_load(
+        cache_key, partial(_load_users_by_cursor, key, bool(before), limit, search))
+
+
+async def _load_users_by_cursor(key: Optional[tuple], backwards: bool, limit: int, search: str) -> dict:
+    users, more = await get_users_page_after(key, limit, search, backwards=backwards)
+    if backwards and not more:
+        # Walked back to the start of the list — show a full first page
+        users, more = await get_users_page_after(None, limit, search)
+        key, backwards = None, False
+
+    has_next = True if backwards else more
+    has_prev = more if backwards else key is not None
+    total, estimated = await _count_users(search)
+
+    return {
+        "users": users,
+        "total": total,
+        "estimated": estimated,
+        "limit": limit,
+        "pages": -(-total // limit) if total > 0 else 1,
+        "at_start": not has_prev,
+        "next_cursor": encode_user_cursor(users[-1]) if users and has_next else None,
+        "prev_cursor": encode_user_cursor(users[0]) if users and has_prev else None,
+    }
 
 
 def invalidate_users_cache() -> None:
-    _paginated_users_cache.clear()
+    """Drop cached list pages. Totals are unaffected by role changes and are kept."""
+    _paginated_users_cache.invalidate()
 
 
 async def change_user_role(github_id: str, role: str = "admin"):
@@ -135,12 +221,14 @@ async def delete_user_from_db(github_id: str):
             await delete_registrations_for_user(qr_code_data)
 
         await delete_user_by_github_id(github_id)
+        remove_indexed_user(github_id)
+        _user_count_cache.invalidate()
         return None, True
     except Exception as e:
         return str(e), False
 
 
-def generate_pdf(participants, event_title: str = "All Events", per_event: bool = False):
+def generate_pdf(participants: list, event_title: str = "All Events", per_event: bool = False):
     pdf = FPDF()
     pdf.add_page()
 
@@ -174,20 +262,20 @@ def generate_pdf(participants, event_title: str = "All Events", per_event: bool
         fill = False
         for p in participants:
             pdf.set_fill_color(245, 245, 245)
-            name = str(p.get("name", "N/A"))[:28]
-            email = str(p.get("email", "N/A"))[:32]
+            name = str(p.name or "N/A")[:28]
+            email = str(p.email or "N/A")[:32]
 
-            ptype = p.get("participant_type", "")
+            ptype = p.participant_type
             if ptype == "uok_student":
-                affil = f"UoK | {p.get('student_id', '')}"
+                affil = f"UoK | {p.student_id or ''}"
             elif ptype == "other_university":
-                affil = str(p.get("university", ""))[:22]
+                affil = str(p.university or "")[:22]
             elif ptype == "industry":
-                affil = f"{p.get('organization', '')} | {p.get('job_role', '')}"[:22]
+                affil = f"{p.organization or ''} | {p.job_role or ''}"[:22]
             else:
                 affil = "—"
 
-            status = "Present" if p.get("attended_at") else "Absent"
+            status = "Present" if p.attended_at else "Absent"
             s_color = (40, 167, 69) if status == "Present" else (220, 53, 69)
 
             pdf.set_text_color(0, 0, 0)
@@ -216,10 +304,10 @@ def generate_pdf(participants, event_title: str = "All Events", per_event: bool
         fill = False
         for p in participants:
             pdf.set_fill_color(245, 245, 245)
-            name = str(p.get("name", "N/A"))[:30]
-            email = str(p.get("email", "N/A"))[:38]
-            registered = str(p.get("events_registered", 0))
-            attended = str(p.get("events_attended", 0))
+            name = str(p.name or "N/A")[:30]
+            email = str(p.email or "N/A")[:38]
+            registered = str(p.events_registered)
+            attended = str(p.events_attended)
 
             pdf.set_text_color(0, 0, 0)
             pdf.cell(55, h, name, border=1, fill=fill)
@@ -236,3 +324,58 @@ def generate_pdf(participants, event_title: str = "All Events", per_event: bool
 
     pdf_output = pdf.output(dest="S")
     return pdf_output
+
+
+def _latin1(text) -> str:
+    # Core PDF fonts are latin-1 only
+    return str(text).encode("latin-1", "replace").decode("latin-1")
+
+
+def generate_badges_pdf(badges: list[RegistrationRow]) -> bytearray:
+    """
+    Name badges, eight per A4 page, one per registration row (with
+    `event_title` filled in); the QR encodes the same per-registration
+    payload the participant downloads.
+    """
+    pdf = FPDF()
+    pdf.set_auto_page_break(False)
+    w, h, margin_x, margin_y = 95, 68, 7.5, 12.5
+
+    for i, b in enumerate(badges):
+        if i % 8 == 0:
+            pdf.add_page()
+        col, row = i % 2, (i % 8) // 2
+        x, y = margin_x + col * w, margin_y + row * h
+
+        pdf.set_draw_color(75, 46, 131)
+        pdf.rect(x + 2, y + 2, w - 4, h - 4, round_corners=True)
+
+        payload = qr_payload(b.registration_id, b.user_qr_code, b.event_id, b.name or "", b.event_title or "")
+        pdf.image(qrcode.make(payload).get_image(), x=x + w - 46, y=y + 12, w=40, h=40)
+
+        ptype = b.participant_type
+        if ptype == "uok_student":
+            affil = f"University of Kelaniya | {b.student_id or ''}"
+        elif ptype == "other_university":
+            affil = str(b.university or "")
+        elif ptype == "industry":
+            affil = f"{b.organization or ''} | {b.job_role or ''}"
+        else:
+            affil = ""
+
+        pdf.set_xy(x + 6, y + 14)
+        pdf.set_font("Arial", "B", 14)
+        pdf.set_text_color(0, 0, 0)
+        pdf.multi_cell(w - 56, 7, _latin1(b.name or "")[:40], align="L")
+        pdf.set_x(x + 6)
+        pdf.set_font("Arial", "", 9)
+        pdf.set_text_color(100, 100, 100)
+        pdf.multi_cell(w - 56, 5, _latin1(affil)[:60], align="L")
+        pdf.set_xy(x + 6, y + h - 16)
+        pdf.set_font("Arial", "B", 9)
+        pdf.set_text_color(75, 46, 131)
+        pdf.cell(w - 56, 5, _latin1(b.event_title or "")[:34])
+
+    if not badges:
+        pdf.add_page()
+    return pdf.output()
@@ -0,0 +1,181 @@
+"""
+Per-event arrival timeline and affiliation split for the admin dashboard.
+
+Each event's registrations are held as a columnar snapshot — one typed
+array per column — so an analytics request is a handful of C-level passes
+over packed integers rather than a rescan of the registrations table.
+Snapshots refresh incrementally from one high-water mark on registered_at
+and another on attended_at, and are rebuilt from scratch periodically to
+pick up deletions. The refresh queries are inclusive of their watermark,
+so rows already applied come back and are deduped by registration id.
+"""
+import asyncio
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import compress
+from typing import Optional
+
+from cachetools import LRUCache
+
+from repository.registration_repo import get_registrations_for_event_since
+from repository.user_repo import get_users_by_qr_codes
+
+PARTICIPANT_TYPES: tuple[str, ...] = ("uok_student", "other_university", "industry")
+_UNKNOWN_TYPE: int = len(PARTICIPANT_TYPES)
+_TYPE_CODES: dict[str, int] = {t: i for i, t in enumerate(PARTICIPANT_TYPES)}
+
+BUCKET_SECONDS: int = 300  # 5-minute arrival buckets
+_REFRESH_INTERVAL: float = 15  # seconds between incremental refreshes
+_REBUILD_INTERVAL: float = 600  # full rebuild every 10 minutes (catches deletions)
+_USER_LOOKUP_CHUNK: int = 150  # qr codes per in_() lookup, keeps URLs short
+
+_snapshots: LRUCache = LRUCache(maxsize=8)
+
+
+def _epoch(ts: Optional[str]) -> int:
+    if not ts:
+        return 0
+    return int(datetime.fromisoformat(ts).timestamp())
+
+
+def _iso(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+class EventSnapshot:
+    """Columnar registration snapshot for one event. Row i is the same registration in every column."""
+
+    __slots__ = (
+        "event_id", "registered_at", "attended_at", "participant_type",
+        "row_by_qr", "registered_watermark", "attended_watermark", "refreshed_at", "built_at", "lock",
+    )
+
+    def __init__(self, event_id: str):
+        self.event_id = event_id
+        self.registered_at = array("q")  # epoch seconds
+        self.attended_at = array("q")  # epoch seconds, 0 = not attended
+        self.participant_type = array("b")  # index into PARTICIPANT_TYPES
+        self.row_by_qr: dict[str, int] = {}
+        self.registered_watermark: tuple[int, Optional[str]] = (0, None)  # (epoch, ISO timestamp)
+        self.attended_watermark: tuple[int, Optional[str]] = (0, None)
+        self.refreshed_at: float = 0.0
+        self.built_at: float = 0.0
+        self.lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.registered_at)
+
+    @property
+    def watermark(self) -> Optional[str]:
+        """The latest change the snapshot has seen."""
+        return max(self.registered_watermark, self.attended_watermark)[1]
+
+    async def apply(self, rows: list[dict]) -> None:
+        """Merge changed registration rows into the columns."""
+        rows = list({r["id"]: r for r in rows}.values())
+        new_qrs = [r["user_qr_code"] for r in rows if r["user_qr_code"] not in self.row_by_qr]
+        types = await _lookup_participant_types(new_qrs) if new_qrs else {}
+
+        for r in rows:
+            qr = r["user_qr_code"]
+            attended = _epoch(r.get("attended_at"))
+            row = self.row_by_qr.get(qr)
+            if row is None:
+                self.row_by_qr[qr] = len(self.registered_at)
+                self.registered_at.append(_epoch(r.get("registered_at")))
+                self.attended_at.append(attended)
+                self.participant_type.append(_TYPE_CODES.get(types.get(qr), _UNKNOWN_TYPE))
+            else:
+                self.attended_at[row] = attended
+
+            if r.get("registered_at"):
+                self.registered_watermark = max(
+                    self.registered_watermark, (_epoch(r["registered_at"]), r["registered_at"]))
+            if attended:
+                self.attended_watermark = max(self.attended_watermark, (attended, r.get("attended_at")))
+
+    def summarize(self) -> dict:
+        attended = list(filter(None, self.attended_at))
+
+        # Arrival timeline — bucket index is epoch // BUCKET_SECONDS
+        buckets = Counter(map(BUCKET_SECONDS.__rfloordiv__, attended))
+        timeline = []
+        if buckets:
+            first, last = min(buckets), max(buckets)
+            timeline = [
+                {"start": _iso(b * BUCKET_SECONDS), "count": buckets.get(b, 0)}
+                for b in range(first, last + 1)
+            ]
+
+        # Affiliation split — registered vs attended per participant type
+        registered_by_type = Counter(self.participant_type)
+        attended_by_type = Counter(compress(self.participant_type, self.attended_at))
+        labels = PARTICIPANT_TYPES + ("unknown",)
+        affiliation = {
+            labels[code]: {
+                "registered": registered_by_type.get(code, 0),
+                "attended": attended_by_type.get(code, 0),
+            }
+            for code in range(len(labels))
+        }
+
+        return {
+            "event_id": self.event_id,
+            "total_registered": len(self),
+            "total_attended": len(attended),
+            "bucket_seconds": BUCKET_SECONDS,
+            "timeline": timeline,
+            "affiliation": affiliation,
+            "as_of": self.watermark,
+        }
+
+
+async def _lookup_participant_types(qr_codes: list[str]) -> dict[str, Optional[str]]:
+    chunks = [qr_codes[i:i + _USER_LOOKUP_CHUNK] for i in range(0, len(qr_codes), _USER_LOOKUP_CHUNK)]
+    results = await asyncio.gather(*(
+        get_users_by_qr_codes(chunk, select="qr_code_data, participant_type") for chunk in chunks
+    ))
+    return {u["qr_code_data"]: u.get("participant_type") for users in results for u in users}
+
+
+async def _refresh(snapshot: EventSnapshot) -> EventSnapshot:
+    now = time.monotonic()
+    if now - snapshot.built_at >= _REBUILD_INTERVAL:
+        rebuilt = EventSnapshot(snapshot.event_id)
+        await rebuilt.apply(await get_registrations_for_event_since(snapshot.event_id))
+        rebuilt.built_at = rebuilt.refreshed_at = now
+        rebuilt.lock = snapshot.lock
+        return rebuilt
+
+    await snapshot.apply(await get_registrations_for_event_since(
+        snapshot.event_id, snapshot.registered_watermark[1], snapshot.attended_watermark[1]))
+    snapshot.refreshed_at = now
+    return snapshot
+
+
+async def get_event_analytics(event_id: str) -> dict:
+    snapshot = _snapshots.get(event_id)
+    if snapshot is None:
+        snapshot = _snapshots[event_id] = EventSnapshot(event_id)
+
+    if time.monotonic() - snapshot.refreshed_at >= _REFRESH_INTERVAL:
+        async with snapshot.lock:
+            current = _snapshots.get(event_id, snapshot)
+            if time.monotonic() - current.refreshed_at >= _REFRESH_INTERVAL:
+                try:
+                    current = await _refresh(current)
+                except Exception:
+                    pass  # keep serving the last good snapshot
+                _snapshots[event_id] = current
+            snapshot = current
+
+    return snapshot.summarize()
+
+
+def invalidate_event_analytics(event_id: Optional[str] = None) -> None:
+    if event_id is None:
+        _snapshots.clear()
+    else:
+        _snapshots.pop(event_id, None)
@@ -0,0 +1,309 @@
+"""
+Bulk attendee import.
+
+An admin uploads a CSV of pre-registered attendees for one event. Every row
+is validated up front and problems are reported against their line. Users
+are matched on email ignoring case (users.email_lower): existing ones are
+looked up in batches, and the rest are inserted IMPORT_BATCH_SIZE at a time. A user
+created this way has a placeholder github_id until their first GitHub login
+claims the row (see auto_register_user). Registrations are inserted in
+batches that skip users already registered. A capped event admits rows in
+file order through its seat counter (services/capacity.py), reserving a
+seat per row and confirming each batch against the database count, as
+single registrations do.
+
+QR codes are rendered in the export process pool and mailed through
+Mailjet's batch API after the response is sent, so the upload only waits
+for the database. Rendering waits for a free worker rather than being
+turned away like an export, and is retried if a worker dies. What happened
+to each email is kept as an ImportEmails record that the admin polls by id.
+"""
+import asyncio
+import csv
+import io
+import logging
+import os
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+from fastapi import HTTPException
+
+from repository.batch import MAX_BATCH
+from repository.registration_repo import insert_new_registrations, iter_registrations_for_event
+from repository.user_repo import IMPORTED_GITHUB_ID_PREFIX, get_users_by_emails, insert_new_users
+from services.cache import cache
+from services.capacity import confirm_seats, seats_for
+from services.event import get_event_dict
+from services.export import EXPORT_WORKERS, run_in_pool
+from services.mail import MAILJET_API_KEY, MAILJET_API_SECRET, MAILJET_BATCH_SIZE, send_qr_emails
+from services.registration import generate_qr_data_urls, qr_payload
+from services.user_search import index_user
+
+IMPORT_MAX_BYTES: int = int(os.getenv("IMPORT_MAX_BYTES", str(5 * 1024 * 1024)))
+IMPORT_MAX_ROWS: int = int(os.getenv("IMPORT_MAX_ROWS", "10000"))
+IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", "500"))  # rows per insert request
+IMPORT_RENDER_RETRIES: int = 2  # retries of a QR batch whose export worker crashed
+IMPORT_EMAILS_TTL: float = float(os.getenv("IMPORT_EMAILS_TTL", "3600"))  # email outcomes kept 1 hour
+
+IMPORT_COLUMNS: tuple[str, ...] = (
+    "email", "name", "participant_type", "student_id", "university", "study_year", "organization", "job_role",
+)
+_PARTICIPANT_TYPES: tuple[str, ...] = ("uok_student", "other_university", "industry")
+_EMAIL = re.compile(r"[^@\s,;<>]+@[^@\s,;<>]+\.[^@\s,;<>]+")
+
+_log = logging.getLogger("perf")
+
+
+@dataclass
+class ImportEmails:
+    """Delivery of one import's QR emails. Kept in this process only, like export jobs."""
+    queued: int
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    sent: int = 0
+    failed: list[str] = field(default_factory=list)  # addresses that were not sent
+    done: bool = False
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": "done" if self.done else "sending",
+            "queued": self.queued,
+            "sent": self.sent,
+            "failed": self.failed,
+        }
+
+
+_import_emails = cache("import.emails", maxsize=256, ttl=IMPORT_EMAILS_TTL)
+
+
+def track_import_emails(queued: int) -> ImportEmails:
+    emails = ImportEmails(queued)
+    _import_emails[emails.id] = emails
+    return emails
+
+
+def get_import_emails(emails_id: str) -> Optional[ImportEmails]:
+    return _import_emails.get(emails_id)
+
+
+def _chunks(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _error(line: int, email: str, error: str) -> dict:
+    return {"line": line, "email": email, "error": error}
+
+
+def parse_import_csv(data: bytes) -> tuple[list[dict], list[dict]]:
+    """Valid rows (user columns plus their "line") and the errors of the rest."""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="The file must be a UTF-8 encoded CSV.")
+
+    reader = csv.DictReader(io.StringIO(text))
+    reader.fieldnames = [(f or "").strip().lower().replace(" ", "_") for f in reader.fieldnames or []]
+    if "email" not in reader.fieldnames:
+        raise HTTPException(status_code=400, detail="The CSV needs an email column.")
+
+    rows: list[dict] = []
+    errors: list[dict] = []
+    seen: dict[str, int] = {}
+    for record in reader:
+        values = {c: (record.get(c) or "").strip() for c in IMPORT_COLUMNS}
+        if not any(values.values()):
+            continue
+        if len(rows) + len(errors) >= IMPORT_MAX_ROWS:
+            raise HTTPException(status_code=413, detail=f"At most {IMPORT_MAX_ROWS} rows per import.")
+
+        line, email, ptype = reader.line_num, values["email"].lower(), values["participant_type"]
+        if not _EMAIL.fullmatch(email):
+            errors.append(_error(line, values["email"], "Invalid email address."))
+        elif email in seen:
+            errors.append(_error(line, email, f"Same email as line {seen[email]}."))
+        elif ptype and ptype not in _PARTICIPANT_TYPES:
+            errors.append(_error(line, email, f"participant_type must be one of {', '.join(_PARTICIPANT_TYPES)}."))
+        else:
+            seen[email] = line
+            rows.append({
+                **{c: v or None for c, v in values.items()},
+                "email": email,
+                "name": values["name"] or email.split("@")[0],
+                "university": "University of Kelaniya" if ptype == "uok_student" else values["university"] or None,
+                "line": line,
+            })
+    return rows, errors
+
+
+async def _find_users(emails: list[str]) -> dict[str, dict]:
+    """Lowercased email -> user; stored emails keep whatever case they were given in."""
+    pages = await asyncio.gather(*(get_users_by_emails(chunk) for chunk in _chunks(emails, MAX_BATCH)))
+    return {u["email"].lower(): u for page in pages for u in page}
+
+
+async def _upsert_users(rows: list[dict]) -> tuple[dict[str, dict], dict[str, str], int]:
+    """email -> user for every row that has one, email -> error for the rest, and how many were created."""
+    users = await _find_users([r["email"] for r in rows])
+    new = []
+    for r in rows:
+        if r["email"] not in users:
+            qr_code_data = str(uuid.uuid4())
+            new.append({
+                **{c: r[c] for c in IMPORT_COLUMNS},
+                "qr_code_data": qr_code_data,
+                "github_id": f"{IMPORTED_GITHUB_ID_PREFIX}{qr_code_data}",
+                "role": "participant",
+            })
+
+    failed: dict[str, str] = {}
+    created = 0
+    for batch in _chunks(new, IMPORT_BATCH_SIZE):
+        try:
+            inserted = await insert_new_users(batch)
+        except Exception as e:
+            failed.update((u["email"], f"Could not create the user: {e}") for u in batch)
+            continue
+        created += len(inserted)
+        for u in inserted:
+            users[u["email"].lower()] = u
+            index_user(u)
+
+    # Skipped as duplicates: created by a login or another import in the meantime
+    raced = [u["email"] for u in new if u["email"] not in users and u["email"] not in failed]
+    if raced:
+        users.update(await _find_users(raced))
+    return users, failed, created
+
+
+async def import_attendees(event_id: str, data: bytes) -> tuple[dict, list[dict]]:
+    """
+    Import a CSV of attendees into an event. Returns the report and the new
+    registrations (with the user's name and email) for send_import_emails.
+    """
+    event = await get_event_dict(event_id)
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found.")
+
+    rows, errors = parse_import_csv(data)
+    total = len(rows) + len(errors)
+    users, failed, users_created = await _upsert_users(rows)
+    registered = set()
+    async for page in iter_registrations_for_event(event_id, select="user_qr_code"):
+        registered.update(r["user_qr_code"] for r in page)
+
+    pending: list[tuple[dict, dict]] = []
+    already_registered = 0
+    for row in rows:
+        user = users.get(row["email"])
+        if user is None:
+            errors.append(_error(row["line"], row["email"], failed.get(row["email"], "Could not create the user.")))
+        elif user["qr_code_data"] in registered:
+            already_registered += 1
+        else:
+            pending.append((row, user))
+
+    seats = await seats_for(event) if event.get("capacity") else None
+    if seats is not None:
+        reserved = []
+        for row, user in pending:
+            if seats.reserve():
+                reserved.append((row, user))
+            else:
+                errors.append(_error(row["line"], row["email"], "The event is full."))
+        pending = reserved
+
+    new_registrations: list[dict] = []
+    for batch in _chunks(pending, IMPORT_BATCH_SIZE):
+        regs = {str(uuid.uuid4()): (row, user) for row, user in batch}
+        try:
+            inserted = await insert_new_registrations(
+                [{"id": reg_id, "user_qr_code": user["qr_code_data"], "event_id": event_id}
+                 for reg_id, (_, user) in regs.items()])
+        except Exception as e:
+            if seats is not None:
+                for _ in regs:
+                    seats.settle(False)
+            errors.extend(_error(row["line"], row["email"], f"Registration failed: {e}") for row, _ in batch)
+            continue
+        admitted = {str(reg["id"]) for reg in inserted}
+        try:
+            if seats is not None:
+                # Seats sold through other workers since the last count
+                admitted -= await confirm_seats(event_id, [r for r in regs if r in admitted], seats)
+        finally:
+            if seats is not None:
+                for reg_id in regs:
+                    seats.settle(reg_id in admitted)
+        for reg in inserted:
+            row, user = regs[str(reg["id"])]
+            if str(reg["id"]) not in admitted:
+                errors.append(_error(row["line"], row["email"], "The event is full."))
+                continue
+            new_registrations.append({**reg, "name": user.get("name") or "", "email": user["email"]})
+        already_registered += len(batch) - len(inserted)  # registered in the meantime
+
+    report = {
+        "event_id": event_id,
+        "event_title": event.get("title", ""),
+        "rows": total,
+        "registered": len(new_registrations),
+        "already_registered": already_registered,
+        "users_created": users_created,
+        "errors": sorted(errors, key=lambda e: e["line"]),
+    }
+    return report, new_registrations
+
+
+async def _render_qr_batch(event_id: str, event_title: str, batch: list[dict]) -> list[str]:
+    payloads = [qr_payload(str(r["id"]), r["user_qr_code"], event_id, r["name"], event_title) for r in batch]
+    for attempt in range(IMPORT_RENDER_RETRIES + 1):
+        try:
+            return await run_in_pool(generate_qr_data_urls, payloads, timeout=None, shed=False)
+        except HTTPException:  # the worker crashed; the pool has been replaced
+            if attempt == IMPORT_RENDER_RETRIES:
+                raise
+
+
+async def send_import_emails(event_id: str, event_title: str, registrations: list[dict],
+                             client: httpx.AsyncClient, emails: ImportEmails) -> None:
+    """
+    Render the QR codes of imported registrations in the export pool, one
+    Mailjet batch per worker at a time, and mail each group while the next
+    one renders. Progress and the addresses that could not be sent are
+    recorded on `emails`.
+    """
+    if not MAILJET_API_KEY or not MAILJET_API_SECRET:
+        print("MailJet credentials missing. Skipping email.")
+        emails.failed, emails.done = [r["email"] for r in registrations], True
+        return
+
+    async def _send(recipients: list[tuple[str, str, str]]) -> None:
+        failed = await send_qr_emails(recipients, client)
+        emails.sent += len(recipients) - len(failed)
+        emails.failed.extend(failed)
+
+    batches = _chunks(registrations, MAILJET_BATCH_SIZE)
+    sending: Optional[asyncio.Task] = None
+    try:
+        for group in _chunks(batches, max(1, EXPORT_WORKERS)):
+            rendered = await asyncio.gather(
+                *(_render_qr_batch(event_id, event_title, batch) for batch in group), return_exceptions=True)
+            recipients = []
+            for batch, urls in zip(group, rendered):
+                if isinstance(urls, BaseException):
+                    _log.info("IMPORT   | %s | QR rendering failed for %d registrations: %s", event_id, len(batch), urls)
+                    emails.failed.extend(r["email"] for r in batch)
+                else:
+                    recipients.extend((r["email"], r["name"], url) for r, url in zip(batch, urls))
+            if sending is not None:
+                await sending
+            sending = asyncio.create_task(_send(recipients))
+        if sending is not None:
+            await sending
+    finally:
+        emails.done = True
+        _log.info("IMPORT   | %s | sent %d of %d QR emails, %d failed",
+                  event_id, emails.sent, emails.queued, len(emails.failed))
@@ -0,0 +1,387 @@
+"""
+Named in-process caches with a shared invalidation bus.
+
+Each cache is a namespace bounded by a TTL and an LRU size limit. Invalidating
+a namespace (or one key in it) drops the local copy and publishes the
+invalidation, so every worker serving the app drops theirs too. CACHE_BUS
+picks the transport:
+
+  local     in-process only; fine for a single worker (default)
+  unix      datagram sockets in CACHE_BUS_DIR, for workers on one host
+  postgres  LISTEN/NOTIFY on POSTGRES_URL, for workers on several hosts
+            (needs the optional asyncpg package)
+
+Delivery is best-effort: a lost message only means a worker serves its copy
+until the TTL runs out, as it did before the bus existed.
+
+A cache created with `refresh` serves stale-while-revalidate: once an entry
+is older than `refresh` seconds, get_or_load still returns it but starts a
+background reload. The TTL is then the hard bound on staleness, reached only
+if reloads keep failing.
+
+A cache created with `stale_if_error` also remembers the last value loaded
+for each key and serves it, however old, when a load fails. While the
+database is unreachable its callers then get old data at once rather than
+an empty default. Invalidating a key forgets its remembered value.
+"""
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from collections.abc import Awaitable, Callable, Hashable
+from pathlib import Path
+from typing import Optional
+
+from cachetools import TTLCache
+
+CACHE_BUS: str = os.getenv("CACHE_BUS", "local").lower()
+CACHE_BUS_DIR: Path = Path(os.getenv("CACHE_BUS_DIR") or Path(tempfile.gettempdir()) / "fossuok-cache-bus")
+CACHE_BUS_CHANNEL: str = "cache_invalidate"
+
+_ORIGIN: str = uuid.uuid4().hex  # tags our own messages, which postgres echoes back
+_RAISE = object()
+
+
+class Cache(TTLCache):
+    """A TTL + LRU bounded namespace whose invalidations reach every worker."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float, refresh: Optional[float] = None,
+                 stale_if_error: bool = False):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.name = name
+        self.refresh = refresh
+        self.stale_if_error = stale_if_error
+        self._last_good: dict[Hashable, object] = {}
+        self._loaded_at: dict[Hashable, float] = {}
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._generation = 0  # bumped by drop() of everything, so a load that raced it is not stored
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        self.stale_hits = 0  # hits served past `refresh` while a reload runs
+        self.fallbacks = 0  # callers handed `default` because a load failed
+        self.stale_fallbacks = 0  # callers handed the last good value because a load failed
+        self.loads = self.load_errors = 0
+        self.load_seconds = self.max_load_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    def popitem(self):
+        # Called when an insert finds the cache full: an LRU eviction
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        self.expirations += len(expired)
+        return expired
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self._loaded_at[key] = self.timer()
+        if len(self._loaded_at) > 2 * self.maxsize:
+            # Expiry and LRU eviction bypass us, so forget their timestamps in bulk
+            self._loaded_at = {k: t for k, t in self._loaded_at.items() if k in self}
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """Seconds since `key` was stored, or None if it is not cached."""
+        return self.timer() - self._loaded_at[key] if key in self and key in self._loaded_at else None
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable], default=_RAISE):
+        """
+        The cached value for `key`, or the result of `load()`. Concurrent
+        misses share a single call; if it fails they all get `default`, or
+        the exception when no default is given.
+        """
+        try:
+            value = self[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            if self.refresh is not None and self.age(key) >= self.refresh:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._start_load(key, load).add_done_callback(_discard_error)
+            return value
+        task = self._inflight.get(key) or self._start_load(key, load)
+        try:
+            # A caller that goes away must not cancel the load for the others
+            return await asyncio.shield(task)
+        except Exception:
+            if key in self._last_good:
+                self.stale_fallbacks += 1
+                return self._last_good[key]
+            if default is _RAISE:
+                raise
+            self.fallbacks += 1
+            return default
+
+    def _start_load(self, key: Hashable, load: Callable[[], Awaitable]) -> asyncio.Task:
+        # The generation is read now: a drop before the task first runs must still discard its result.
+        # drop(key) instead takes the task out of _inflight, which discards it for that key alone.
+        task = self._inflight[key] = asyncio.create_task(self._load(key, load, self._generation))
+        return task
+
+    async def _load(self, key: Hashable, load: Callable[[], Awaitable], generation: int):
+        started = time.perf_counter()
+        try:
+            value = await load()
+        except Exception as e:
+            self.load_errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.loads += 1
+            self.load_seconds += elapsed
+            self.max_load_seconds = max(self.max_load_seconds, elapsed)
+            current = self._inflight.get(key) is asyncio.current_task()
+            if current:
+                del self._inflight[key]
+        if current and generation == self._generation:
+            self[key] = value
+            if self.stale_if_error:
+                self._last_good.pop(key, None)
+                self._last_good[key] = value
+                if len(self._last_good) > self.maxsize:
+                    del self._last_good[next(iter(self._last_good))]
+        return value
+
+    def stats(self) -> dict:
+        self.expire()
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "refresh": self.refresh,
+            "bytes": _sizeof(list(self.items())),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "loads": self.loads,
+            "load_errors": self.load_errors,
+            "avg_load_ms": self.load_seconds / self.loads * 1000 if self.loads else None,
+            "max_load_ms": self.max_load_seconds * 1000,
+            "fallbacks": self.fallbacks,
+            "stale_fallbacks": self.stale_fallbacks,
+            "last_error": self.last_error,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop `key` (or everything) here and in every other worker."""
+        self.drop(key)
+        if _bus is not None:
+            _bus.publish(_encode(self.name, key))
+
+    def drop(self, key: Optional[Hashable] = None) -> None:
+        """Drop `key` (or everything) in this process only. Loads of other keys still store their results."""
+        if key is None:
+            self._generation += 1
+            self.clear()
+            self._loaded_at.clear()
+            self._inflight.clear()
+            self._last_good.clear()
+        else:
+            self.pop(key, None)
+            self._loaded_at.pop(key, None)
+            self._inflight.pop(key, None)
+            self._last_good.pop(key, None)
+
+
+def _sizeof(obj, seen: Optional[set[int]] = None) -> int:
+    """Rough deep size of cached values: containers, their items and object __dict__s."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_sizeof(k, seen) + _sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_sizeof(v, seen) for v in obj)
+    elif hasattr(obj, "__dict__"):
+        size += _sizeof(vars(obj), seen)
+    return size
+
+
+def _discard_error(task: asyncio.Task) -> None:
+    # A failed background refresh leaves the stale entry in place until its TTL
+    if not task.cancelled():
+        task.exception()
+
+
+_caches: dict[str, Cache] = {}
+
+
+def cache(
+        name: str,
+        maxsize: int = 1,
+        ttl: float = 60,
+        refresh: Optional[float] = None,
+        stale_if_error: bool = False,
+) -> Cache:
+    """Register the namespace `name`. Names are global across the app."""
+    if name in _caches:
+        raise ValueError(f"Cache namespace {name!r} is already registered")
+    _caches[name] = Cache(name, maxsize, ttl, refresh, stale_if_error)
+    return _caches[name]
+
+
+def get_caches() -> dict[str, Cache]:
+    return dict(_caches)
+
+
+def cache_stats() -> list[dict]:
+    """Counters for every registered cache, by name."""
+    return [c.stats() for _, c in sorted(_caches.items())]
+
+
+def _tuples(value):
+    return tuple(map(_tuples, value)) if isinstance(value, list) else value
+
+
+def _encode(name: str, key: Optional[Hashable]) -> bytes:
+    return json.dumps({"o": _ORIGIN, "ns": name, "key": key}).encode()
+
+
+def _receive(data: bytes | str) -> None:
+    try:
+        msg = json.loads(data)
+    except ValueError:
+        return
+    if msg.get("o") == _ORIGIN or msg.get("ns") not in _caches:
+        return
+    # JSON turns tuple keys into lists
+    _caches[msg["ns"]].drop(_tuples(msg.get("key")))
+
+
+class _LocalBus:
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def publish(self, data: bytes) -> None:
+        pass
+
+
+class _UnixBus(_LocalBus):
+    """
+    One datagram socket per worker in CACHE_BUS_DIR; publishing sends to every
+    other socket there. Sockets left behind by dead workers are removed the
+    first time a send to them is refused.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.path = directory / f"{os.getpid()}-{_ORIGIN[:8]}.sock"
+        self._sock: Optional[socket.socket] = None
+
+    async def start(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        self._sock.bind(str(self.path))
+        asyncio.get_running_loop().add_reader(self._sock.fileno(), self._read)
+
+    async def stop(self) -> None:
+        if self._sock is not None:
+            asyncio.get_running_loop().remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+        self.path.unlink(missing_ok=True)
+
+    def _read(self) -> None:
+        while True:
+            try:
+                data = self._sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            _receive(data)
+
+    def publish(self, data: bytes) -> None:
+        if self._sock is None:
+            return
+        for peer in self.directory.glob("*.sock"):
+            if peer == self.path:
+                continue
+            try:
+                self._sock.sendto(data, str(peer))
+            except (ConnectionRefusedError, FileNotFoundError):
+                peer.unlink(missing_ok=True)
+            except OSError:
+                pass  # peer's buffer is full; its copy expires with the TTL
+
+
+class _PostgresBus(_LocalBus):
+    """LISTEN/NOTIFY on a dedicated asyncpg connection."""
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._conn = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._sender: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        import asyncpg  # optional dependency, only needed for CACHE_BUS=postgres
+
+        self._conn = await asyncpg.connect(self.dsn)
+        await self._conn.add_listener(CACHE_BUS_CHANNEL, lambda _c, _pid, _ch, payload: _receive(payload))
+        self._outbox = asyncio.Queue()
+        self._sender = asyncio.create_task(self._send())
+
+    async def stop(self) -> None:
+        if self._sender is not None:
+            self._sender.cancel()
+            await asyncio.gather(self._sender, return_exceptions=True)
+        if self._conn is not None:
+            await self._conn.close()
+
+    async def _send(self) -> None:
+        while True:
+            data = await self._outbox.get()
+            try:
+                await self._conn.execute("SELECT pg_notify($1, $2)", CACHE_BUS_CHANNEL, data.decode())
+            except Exception:
+                pass
+
+    def publish(self, data: bytes) -> None:
+        if self._outbox is not None:
+            self._outbox.put_nowait(data)
+
+
+_bus: Optional[_LocalBus] = None
+
+
+def _make_bus() -> _LocalBus:
+    if CACHE_BUS == "unix":
+        return _UnixBus(CACHE_BUS_DIR)
+    if CACHE_BUS == "postgres":
+        dsn = os.getenv("POSTGRES_URL")
+        if not dsn:
+            raise RuntimeError("CACHE_BUS=postgres needs POSTGRES_URL")
+        return _PostgresBus(dsn)
+    return _LocalBus()
+
+
+async def start_cache_bus() -> None:
+    global _bus
+    bus = _make_bus()
+    await bus.start()
+    _bus = bus
+
+
+async def stop_cache_bus() -> None:
+    global _bus
+    if _bus is not None:
+        await _bus.stop()
+        _bus = None
@@ -0,0 +1,201 @@
+"""
+Seat admission for events with a capacity.
+
+Each worker keeps a seat counter for every capped event it has served. A
+registration reserves a seat before inserting. No await separates the
+check from the increment, so concurrent requests in one worker cannot both
+take the last seat, and once the counter is full the rest are turned away
+without touching the database. Counters are reconciled with a count of
+registrations at most every SEAT_RECONCILE seconds. That picks up seats
+taken through other workers and seats freed by deleted users.
+
+Between reconciles another worker can sell the same seat. So every
+admission is confirmed by counting the event's registrations after the
+insert, and backed out if the count is over capacity. Two racing
+admissions can then both back out and leave a seat free, but they cannot
+both stay. The next reconcile offers that seat again.
+
+Events with `waitlist` set queue the turned-away users first come first
+served. Whenever a reconcile finds free seats, the head of the queue is
+registered in their place. An edit that lifts the cap or switches the
+waitlist off releases the queue (release_waitlist), so nobody is left
+waiting for seats that will no longer be offered.
+"""
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from postgrest.exceptions import APIError
+
+from repository.registration_repo import (
+    count_event_registrations, create_registration, delete_registration, insert_new_registrations,
+)
+from repository.waitlist_repo import delete_waitlist_entries, delete_waitlist_entry, get_waitlist_head
+
+SEAT_RECONCILE: float = float(os.getenv("SEAT_RECONCILE", "10"))
+WAITLIST_RELEASE_BATCH: int = 200  # waitlist entries registered or dropped per round trip
+
+
+def is_duplicate(e: Exception) -> bool:
+    """A unique violation (SQLSTATE 23505), reported by PostgREST or asyncpg."""
+    code = e.code if isinstance(e, APIError) else getattr(e, "sqlstate", None)
+    return code == "23505"
+
+
+@dataclass
+class Seats:
+    capacity: int
+    taken: int = 0  # registrations at the last count, plus admissions since
+    inflight: int = 0  # reserved seats whose insert has not settled yet
+    counted_at: float = 0.0
+    reconciling: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.capacity - self.taken)
+
+    def reserve(self) -> bool:
+        if self.taken >= self.capacity:
+            return False
+        self.taken += 1
+        self.inflight += 1
+        return True
+
+    def settle(self, admitted: bool) -> None:
+        self.inflight -= 1
+        if not admitted:
+            self.taken -= 1
+
+
+_seats: dict[str, Seats] = {}
+
+
+async def seats_for(event: dict) -> Seats:
+    """
+    The seat counter of a capped event. The first call counts registrations;
+    later ones reconcile in the background once the count is stale.
+    """
+    event_id = str(event["id"])
+    seats = _seats.get(event_id)
+    if seats is None:
+        seats = _seats[event_id] = Seats(capacity=event["capacity"])
+    seats.capacity = event["capacity"]  # an edit elsewhere reaches us through the event cache
+    if seats.reconciling is None and time.monotonic() - seats.counted_at > SEAT_RECONCILE:
+        seats.reconciling = asyncio.create_task(_reconcile(event, seats))
+    if not seats.counted_at and seats.reconciling is not None:
+        # Never counted yet: wait for the count rather than admit against zero
+        await asyncio.shield(seats.reconciling)
+    return seats
+
+
+async def _reconcile(event: dict, seats: Seats) -> None:
+    try:
+        count = await count_event_registrations(str(event["id"]))
+        seats.taken = count + seats.inflight
+        seats.counted_at = time.monotonic()
+        if event.get("waitlist") and seats.remaining:
+            await promote_waitlist(event, seats)
+    except Exception:
+        pass  # keep the previous count; the next call tries again
+    finally:
+        seats.reconciling = None
+
+
+async def remaining_seats(events: list[dict]) -> dict[str, int]:
+    """Remaining seats per capped event id, from the counters."""
+    capped = [e for e in events if e.get("capacity")]
+    counters = await asyncio.gather(*(seats_for(e) for e in capped))
+    return {str(e["id"]): s.remaining for e, s in zip(capped, counters)}
+
+
+async def confirm_seat(event_id: str, reg_id: str, seats: Seats) -> bool:
+    """
+    Check an inserted registration against the database count and delete it
+    if the event turned out to be over capacity.
+    """
+    try:
+        count = await count_event_registrations(event_id)
+    except Exception:
+        return True  # the insert went through; the next reconcile corrects the counter
+    if count <= seats.capacity:
+        return True
+    await delete_registration(reg_id)
+    seats.counted_at = 0.0  # our counter was behind; recount on the next request
+    return False
+
+
+async def confirm_seats(event_id: str, reg_ids: list[str], seats: Seats) -> set[str]:
+    """
+    confirm_seat for a batch inserted in `reg_ids` order: if the event is over
+    capacity, the registrations inserted last are deleted. Returns their ids.
+    """
+    try:
+        count = await count_event_registrations(event_id)
+    except Exception:
+        return set()
+    over = reg_ids[max(0, len(reg_ids) - (count - seats.capacity)):] if count > seats.capacity else []
+    await asyncio.gather(*(delete_registration(reg_id) for reg_id in over))
+    if over:
+        seats.counted_at = 0.0
+    return set(over)
+
+
+async def promote_waitlist(event: dict, seats: Seats) -> int:
+    """Register the longest-waiting users into the free seats; returns how many were admitted."""
+    event_id = str(event["id"])
+    admitted = 0
+    for entry in await get_waitlist_head(event_id, seats.remaining):
+        if not seats.reserve():
+            break
+        ok = False
+        try:
+            reg_id = str(uuid.uuid4())
+            await create_registration({"id": reg_id, "user_qr_code": entry["user_qr_code"], "event_id": event_id})
+            ok = await confirm_seat(event_id, reg_id, seats)
+            if not ok:
+                break
+            admitted += 1
+            await delete_waitlist_entry(entry["id"])
+        except Exception as e:
+            if not is_duplicate(e):
+                raise
+            # Registered some other way meanwhile; their place in the queue is no longer needed
+            await delete_waitlist_entry(entry["id"])
+        finally:
+            seats.settle(ok)
+    return admitted
+
+
+async def release_waitlist(event: dict) -> tuple[int, list[dict]]:
+    """
+    Empty the waitlist of an event that no longer queues. Without a cap
+    everyone waiting is registered. A capped event whose waitlist was
+    switched off fills its free seats from the head of the queue and drops
+    the rest. Returns how many were registered and the dropped entries, each
+    with its user under "user" so they can be told.
+    """
+    event_id = str(event["id"])
+    capped = bool(event.get("capacity"))
+    admitted = await promote_waitlist(event, await seats_for(event)) if capped else 0
+    dropped: list[dict] = []
+    while entries := await get_waitlist_head(
+            event_id, WAITLIST_RELEASE_BATCH, select="id, user_qr_code, joined_at, user:users(name, email)"):
+        if capped:
+            dropped += entries
+        else:
+            # Users registered some other way meanwhile are skipped
+            registered = await insert_new_registrations(
+                [{"user_qr_code": e["user_qr_code"], "event_id": event_id} for e in entries])
+            admitted += len(registered)
+        await delete_waitlist_entries([e["id"] for e in entries])
+    return admitted, dropped
+
+
+def forget_seats(event_id: Optional[str] = None) -> None:
+    if event_id is None:
+        _seats.clear()
+    else:
+        _seats.pop(str(event_id), None)
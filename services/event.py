@@ -1,61 +1,77 @@
+import os
+from functools import partial
 from typing import Optional
 
-from cachetools import TTLCache
 from starlette.datastructures import FormData
 
 from repository.event_repo import (
-    get_active_event_dict, get_event_by_id as get_event_by_id_repo,
+    get_active_event_dict, get_event_by_id as get_event_by_id_repo, load_event_by_id,
     get_all_events as get_all_events_repo, create_event, update_event,
     delete_event, deactivate_all_active_events_except
 )
 from repository.user_repo import nullify_registered_event_id
 from schema.event import Event
+from services.analytics import invalidate_event_analytics
+from services.cache import cache
+from services.capacity import forget_seats, release_waitlist, seats_for
 
-_active_event_cache = TTLCache(maxsize=1, ttl=300)  # 5 minutes
-_all_events_cache = TTLCache(maxsize=1, ttl=60)  # 1 minute
+# Event caches refresh in the background; a value older than this is only served
+# when the database cannot be reached (stale_if_error)
+EVENT_CACHE_MAX_STALE: float = float(os.getenv("EVENT_CACHE_MAX_STALE", "900"))  # 15 minutes
+EVENT_CACHE_SIZE: int = int(os.getenv("EVENT_CACHE_SIZE", "256"))
+
+_active_event_cache = cache(
+    "event.active", maxsize=1, ttl=EVENT_CACHE_MAX_STALE, refresh=300, stale_if_error=True  # 5 minutes
+)
+_all_events_cache = cache(
+    "event.all", maxsize=1, ttl=EVENT_CACHE_MAX_STALE, refresh=60, stale_if_error=True  # 1 minute
+)
+_event_by_id_cache = cache(
+    "event.by_id", maxsize=EVENT_CACHE_SIZE, ttl=EVENT_CACHE_MAX_STALE, refresh=300, stale_if_error=True
+)
 
 
 # Import inside function to avoid circular import if needed
 def invalidate_event_cache() -> None:
-    _active_event_cache.clear()
-    _all_events_cache.clear()
+    _active_event_cache.invalidate()
+    _all_events_cache.invalidate()
+    # Activating one event deactivates the rest, so every cached row may be stale
+    _event_by_id_cache.invalidate()
     from services.registration import invalidate_active_events_cache
     invalidate_active_events_cache()
 
 
+async def _load_active_event() -> Optional[Event]:
+    event_dict = await get_active_event_dict()
+    return Event(**event_dict) if event_dict else None
+
+
 async def get_active_event() -> Optional[Event]:
-    if "data" in _active_event_cache:
-        return _active_event_cache["data"]
+    return await _active_event_cache.get_or_load("data", _load_active_event, default=None)
 
-    try:
-        event_dict = await get_active_event_dict()
-        event = Event(**event_dict) if event_dict else None
-    except Exception:
-        return _active_event_cache.get("data")
 
-    _active_event_cache["data"] = event
-    return event
+async def get_event_dict(event_id: str) -> Optional[dict]:
+    """An event's row from the by-id cache, or None if it does not exist or cannot be loaded."""
+    return await _event_by_id_cache.get_or_load(event_id, partial(load_event_by_id, event_id), default=None)
 
 
 async def get_event_by_id(event_id: str) -> Optional[Event]:
-    try:
-        event_dict = await get_event_by_id_repo(event_id)
-        return Event(**event_dict) if event_dict else None
-    except Exception:
-        return None
+    event_dict = await get_event_dict(event_id)
+    return Event(**event_dict) if event_dict else None
 
 
 async def get_all_events():
-    if "data" in _all_events_cache:
-        return _all_events_cache["data"]
+    return await _all_events_cache.get_or_load("data", get_all_events_repo, default=[])
 
-    try:
-        events_list = await get_all_events_repo()
-    except Exception:
-        return _all_events_cache.get("data", [])
 
-    _all_events_cache["data"] = events_list
-    return events_list
+def _parse_capacity(value) -> Optional[int]:
+    """Blank means unlimited."""
+    if not value:
+        return None
+    capacity = int(value)
+    if capacity <= 0:
+        raise ValueError(value)
+    return capacity
 
 
 async def add_event(form: FormData):
@@ -68,10 +84,15 @@ async def add_event(form: FormData):
         "image_url": form.get("image_url") or None,
         "whatsapp_link": form.get("whatsapp_link") or None,
         "is_active": form.get("is_active") == "on",
+        "waitlist": form.get("waitlist") == "on",
     }
 
     if not event_data["title"]:
         return "Title is required", False, 400
+    try:
+        event_data["capacity"] = _parse_capacity(form.get("capacity"))
+    except ValueError:
+        return "Capacity must be a positive whole number", False, 400
 
     try:
         if event_data["is_active"]:
@@ -94,10 +115,15 @@ async def update_event_data(form: FormData, event_id: str):
         "image_url": form.get("image_url") or None,
         "whatsapp_link": form.get("whatsapp_link") or None,
         "is_active": form.get("is_active") == "on",
+        "waitlist": form.get("waitlist") == "on",
     }
 
     if not update_data["title"]:
         return "Title is required", False, 400
+    try:
+        update_data["capacity"] = _parse_capacity(form.get("capacity"))
+    except ValueError:
+        return "Capacity must be a positive whole number", False, 400
 
     try:
         if update_data["is_active"]:
@@ -105,11 +131,27 @@ async def update_event_data(form: FormData, event_id: str):
 
         await update_event(event_id, update_data)
         invalidate_event_cache()
+        forget_seats(event_id)
+        if update_data["capacity"] and update_data["waitlist"]:
+            # Recount now, so seats added by a higher capacity go to the waitlist straight away
+            await seats_for({"id": event_id, **update_data})
         return None, True, 200
     except Exception as e:
         return f"Failed to create event: {str(e)}", False, 500
 
 
+async def release_event_waitlist(event_id: str) -> tuple[int, list[dict]]:
+    """
+    After an edit, release the waitlist of an event that no longer has both a
+    cap and a waitlist, so nobody stays queued for seats that will not be
+    offered. Returns how many were registered and the dropped entries.
+    """
+    event = await get_event_dict(event_id)
+    if event is None or (event.get("capacity") and event.get("waitlist")):
+        return 0, []
+    return await release_waitlist(event)
+
+
 async def toggle_event_status(event_id: str):
     try:
         event_dict = await get_event_by_id_repo(event_id, select="is_active")
@@ -133,6 +175,8 @@ async def delete_event_data(event_id: str):
         await nullify_registered_event_id(event_id)
         await delete_event(event_id)
         invalidate_event_cache()
+        forget_seats(event_id)
+        invalidate_event_analytics(event_id)
         return None, True
     except Exception as e:
         return str(e), False
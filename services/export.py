@@ -0,0 +1,250 @@
+"""
+Attendance export execution.
+
+CSV and NDJSON exports are streamed page by page straight from the
+repositories, so memory stays flat and the first byte goes out before the
+first query returns.
+
+Every export carries an ETag derived from a cheap data-version key (row
+count plus latest registered_at / attended_at, and the participant list
+version for all-event reports), so unchanged reports are answered with 304
+and rendered PDFs are reused until the underlying registrations change.
+
+fpdf2 rendering is CPU-bound, so reports are built in a process pool rather
+than on the event loop. A semaphore caps concurrent renders and a bounded
+wait queue turns excess requests away with 503, so exports can never starve
+QR verification at the door. If the platform cannot fork worker processes
+(e.g. some serverless runtimes) rendering falls back to a worker thread.
+"""
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from operator import attrgetter
+from typing import Optional
+
+from cachetools import LRUCache
+from fastapi import HTTPException
+
+from repository.guard import BackendUnavailable, is_outage
+from repository.registration_repo import get_registrations_version
+from repository.user_repo import get_participants_version
+from services.admin import (
+    generate_badges_pdf, generate_pdf, get_all_participants, get_participants_for_event,
+    iter_all_participants, iter_participants_for_event
+)
+from services.event import get_event_dict
+
+EXPORT_WORKERS: int = int(os.getenv("EXPORT_WORKERS", "2"))
+EXPORT_QUEUE_SIZE: int = int(os.getenv("EXPORT_QUEUE_SIZE", "4"))
+EXPORT_TIMEOUT: float = float(os.getenv("EXPORT_TIMEOUT", "60"))
+STREAM_CHUNK_SIZE: int = 64 * 1024
+
+ALL_EVENTS_COLUMNS: tuple[str, ...] = ("name", "email", "events_registered", "events_attended")
+EVENT_COLUMNS: tuple[str, ...] = (
+    "name", "email", "participant_type", "student_id", "university", "organization", "job_role",
+    "registered_at", "attended_at",
+)
+MEDIA_TYPES: dict[str, str] = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+_pdf_cache: LRUCache = LRUCache(maxsize=16)  # event_id (None = all events) -> (etag, pdf, title)
+_executor: Optional[Executor] = None
+_slots = asyncio.Semaphore(max(1, EXPORT_WORKERS))
+_waiting: int = 0
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        workers = max(1, EXPORT_WORKERS)
+        try:
+            # spawn, not fork: the parent holds a running event loop and open sockets
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        except (OSError, NotImplementedError):
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export")
+    return _executor
+
+
+def shutdown_export_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_render(render, *args, timeout: float = EXPORT_TIMEOUT) -> bytes:
+    """Run a CPU-bound PDF renderer off the event loop, subject to the export concurrency limits."""
+    return bytes(await run_in_pool(render, *args, timeout=timeout))
+
+
+async def run_in_pool(fn, *args, timeout: Optional[float] = EXPORT_TIMEOUT, shed: bool = True):
+    """
+    Run a picklable CPU-bound function in the export pool and return its result.
+
+    Background work that has no request to answer (import QR emails) passes
+    shed=False and timeout=None: it waits for a slot however long the queue
+    is, and does not count towards the queue that turns exports away.
+    """
+    global _waiting
+    if shed and _waiting >= EXPORT_QUEUE_SIZE:
+        raise HTTPException(status_code=503, detail="Too many exports in progress. Try again shortly.")
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+
+    _waiting += shed
+    try:
+        async with asyncio.timeout_at(deadline):
+            await _slots.acquire()
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="Timed out waiting for an export slot.")
+    finally:
+        _waiting -= shed
+
+    try:
+        future = loop.run_in_executor(_get_executor(), fn, *args)
+    except BrokenExecutor:
+        _slots.release()
+        shutdown_export_pool()
+        raise HTTPException(status_code=503, detail="Export worker crashed. Try again.")
+    except Exception:
+        _slots.release()
+        raise
+    # The slot is held until the worker is actually free, even if this request gives up.
+    future.add_done_callback(lambda _: _slots.release())
+
+    try:
+        async with asyncio.timeout_at(deadline):
+            return await asyncio.shield(future)
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="Report generation timed out.")
+    except BrokenExecutor:
+        shutdown_export_pool()  # a worker died; the next export starts a fresh pool
+        raise HTTPException(status_code=503, detail="Export worker crashed. Try again.")
+
+
+async def render_pdf(
+        participants: list,
+        event_title: str = "All Events",
+        per_event: bool = False,
+        timeout: float = EXPORT_TIMEOUT,
+) -> bytes:
+    return await run_render(generate_pdf, participants, event_title, per_event, timeout=timeout)
+
+
+def iter_chunks(data: bytes, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield view[start:start + chunk_size]
+
+
+def encode_csv_rows(rows: list, columns: tuple[str, ...]) -> str:
+    values = attrgetter(*columns)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerows([["" if v is None else v for v in values(r)] for r in rows])
+    return buf.getvalue()
+
+
+def encode_ndjson_rows(rows: list, columns: tuple[str, ...]) -> str:
+    values = attrgetter(*columns)
+    return "".join(
+        json.dumps(dict(zip(columns, values(r))), separators=(",", ":"), default=str) + "\n"
+        for r in rows
+    )
+
+
+async def stream_attendance(fmt: str, event_id: Optional[str] = None) -> AsyncIterator[str]:
+    """Encode attendance rows as they are paged in. `event_id=None` exports all participants."""
+    if event_id is None:
+        columns, pages = ALL_EVENTS_COLUMNS, iter_all_participants()
+    else:
+        columns, pages = EVENT_COLUMNS, iter_participants_for_event(event_id)
+
+    if fmt == "csv":
+        encode = encode_csv_rows
+        yield ",".join(columns) + "\r\n"  # header goes out before the first page is fetched
+    else:
+        encode = encode_ndjson_rows
+
+    async for page in pages:
+        yield encode(page, columns)
+
+
+async def export_etag(fmt: str, event_id: Optional[str] = None) -> Optional[str]:
+    """ETag for an export derived from its data version, or None if the version lookup fails."""
+    try:
+        if event_id is None:
+            version = await asyncio.gather(get_registrations_version(), get_participants_version())
+        else:
+            # Rows carry the attendee's name and email, so a profile edit changes the export too
+            version = await asyncio.gather(
+                get_registrations_version(event_id), get_participants_version(), get_event_dict(event_id)
+            )
+    except Exception:
+        return None
+
+    digest = hashlib.sha1(repr((fmt, event_id, version)).encode()).hexdigest()[:24]
+    return f'"{digest}"'
+
+
+def cache_headers(etag: Optional[str]) -> dict[str, str]:
+    """Make browsers revalidate with If-None-Match instead of reusing a stale download."""
+    return {"ETag": etag, "Cache-Control": "private, no-cache"} if etag else {}
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+async def build_pdf_export(event_id: Optional[str] = None, etag: Optional[str] = None) -> tuple[bytes, str]:
+    """
+    PDF bytes and report title, reusing the cached render while the data
+    version is unchanged. Rows that fail to load raise (BackendUnavailable
+    for an outage, so the client gets a 503) rather than render an empty
+    report, and only a render of fully loaded data is cached.
+    """
+    cached = _pdf_cache.get(event_id)
+    if etag and cached and cached[0] == etag:
+        return cached[1], cached[2]
+
+    event = None
+    try:
+        if event_id is None:
+            participants, title = await get_all_participants(), "All Events"
+        else:
+            participants, event = await get_participants_for_event(event_id)
+            title = event.get("title", "Event") if event else "Event"
+    except BackendUnavailable:
+        raise
+    except Exception as e:
+        if is_outage(e):
+            raise BackendUnavailable("export.rows", str(e) or type(e).__name__) from e
+        raise
+
+    pdf = await render_pdf(participants, event_title=title, per_event=event_id is not None)
+    # A missing event row may be a failed lookup; its render is not kept under the version ETag
+    if etag and (event_id is None or event is not None):
+        _pdf_cache[event_id] = (etag, pdf, title)
+    return pdf, title
+
+
+async def build_badges_export(event_id: str) -> tuple[bytes, str]:
+    """Name badges for one event, rendered within the request where background export jobs are off."""
+    participants, event = await get_participants_for_event(event_id)
+    title = event.get("title", "Event") if event else "Event"
+    for r in participants:
+        r.event_title = title
+    return await run_render(generate_badges_pdf, participants), title
@@ -0,0 +1,200 @@
+"""
+Background export jobs.
+
+An admin submits an export (all events or one event; PDF, CSV or badges) and
+gets a job id back. A fixed pool of worker tasks builds the file into a spool
+directory, reporting progress as pages arrive, and the finished artefact is
+served by id. Generation is decoupled from the HTTP request lifetime, and at
+most EXPORT_JOB_WORKERS heavy exports run at once; the rest wait in a bounded
+queue.
+
+Jobs and their files live in this process only, so polling must reach the
+same long-running worker. Serverless platforms route each request to any
+instance and freeze it between requests, so jobs are off by default there
+(Vercel sets VERCEL) and the admin pages offer direct downloads instead.
+"""
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Literal, Optional
+
+from fastapi import HTTPException
+
+from repository.registration_repo import get_registrations_version
+from repository.user_repo import get_registered_participant_count
+from services.admin import generate_badges_pdf, iter_all_participants, iter_participants_for_event
+from services.event import get_event_dict
+from services.export import (
+    ALL_EVENTS_COLUMNS, EVENT_COLUMNS, encode_csv_rows, render_pdf, run_render
+)
+
+ExportKind = Literal["pdf", "csv", "badges"]
+
+EXPORT_JOBS_ENABLED: bool = os.getenv(
+    "EXPORT_JOBS_ENABLED", "false" if os.getenv("VERCEL") else "true").lower() in ("1", "true", "yes")
+EXPORT_JOB_WORKERS: int = int(os.getenv("EXPORT_JOB_WORKERS", "1"))
+EXPORT_JOB_QUEUE_SIZE: int = int(os.getenv("EXPORT_JOB_QUEUE_SIZE", "8"))
+EXPORT_JOB_TIMEOUT: float = float(os.getenv("EXPORT_JOB_TIMEOUT", "900"))
+EXPORT_JOB_TTL: float = float(os.getenv("EXPORT_JOB_TTL", "3600"))  # finished jobs and files kept 1 hour
+EXPORT_SPOOL_DIR: Path = Path(os.getenv("EXPORT_SPOOL_DIR") or Path(tempfile.gettempdir()) / "fossuok-exports")
+
+_MEDIA_TYPES: dict[str, str] = {"pdf": "application/pdf", "csv": "text/csv; charset=utf-8", "badges": "application/pdf"}
+
+
+@dataclass
+class ExportJob:
+    kind: ExportKind
+    event_id: Optional[str] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: Literal["queued", "running", "done", "failed"] = "queued"
+    progress: int = 0  # rows fetched so far
+    total: Optional[int] = None  # rows expected, when known
+    filename: str = ""
+    path: Optional[Path] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def media_type(self) -> str:
+        return _MEDIA_TYPES[self.kind]
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "event_id": self.event_id,
+            "status": self.status,
+            "progress": self.progress,
+            "total": self.total,
+            "filename": self.filename,
+            "error": self.error,
+            "download_url": f"/admin/exports/{self.id}/download" if self.status == "done" else None,
+        }
+
+
+_jobs: dict[str, ExportJob] = {}
+_queue: Optional[asyncio.Queue] = None
+_workers: list[asyncio.Task] = []
+
+
+def _sweep() -> None:
+    now = time.time()
+    for job_id, job in list(_jobs.items()):
+        if job.finished_at and now - job.finished_at > EXPORT_JOB_TTL:
+            if job.path is not None:
+                job.path.unlink(missing_ok=True)
+            del _jobs[job_id]
+
+
+async def _collect(job: ExportJob, pages) -> list:
+    rows: list = []
+    async for page in pages:
+        rows.extend(page)
+        job.progress = len(rows)
+    return rows
+
+
+async def _build(job: ExportJob) -> None:
+    if job.event_id is None:
+        title = "All Events"
+        if job.kind == "badges":
+            job.total = (await get_registrations_version())[0]
+        else:
+            job.total = await get_registered_participant_count()
+    else:
+        event = await get_event_dict(job.event_id)
+        title = event.get("title", "Event") if event else "Event"
+        job.total = (await get_registrations_version(job.event_id))[0]
+
+    safe_title = title.replace(" ", "_")[:30]
+    suffix = "csv" if job.kind == "csv" else "pdf"
+    job.filename = f"{'badges' if job.kind == 'badges' else 'attendance'}_{safe_title}_{time.strftime('%Y%m%d_%H%M%S')}.{suffix}"
+    job.path = EXPORT_SPOOL_DIR / f"{job.id}.{suffix}"
+
+    if job.kind == "csv":
+        columns = ALL_EVENTS_COLUMNS if job.event_id is None else EVENT_COLUMNS
+        pages = iter_all_participants() if job.event_id is None else iter_participants_for_event(job.event_id)
+        with job.path.open("w", encoding="utf-8", newline="") as f:
+            await asyncio.to_thread(f.write, ",".join(columns) + "\r\n")
+            async for page in pages:
+                await asyncio.to_thread(f.write, encode_csv_rows(page, columns))
+                job.progress += len(page)
+        return
+
+    if job.kind == "pdf":
+        pages = iter_all_participants() if job.event_id is None else iter_participants_for_event(job.event_id)
+        rows = await _collect(job, pages)
+        if job.event_id is None:
+            rows.sort(key=lambda p: p.name or "")
+        data = await render_pdf(rows, event_title=title, per_event=job.event_id is not None, timeout=EXPORT_JOB_TIMEOUT)
+    else:
+        rows = await _collect(job, iter_participants_for_event(job.event_id))
+        for r in rows:
+            # Across all events the title comes embedded with each registration
+            r.event_title = title if job.event_id else r.event_title or "FOSSUoK Event"
+        data = await run_render(generate_badges_pdf, rows, timeout=EXPORT_JOB_TIMEOUT)
+
+    await asyncio.to_thread(job.path.write_bytes, data)
+
+
+async def _worker() -> None:
+    while True:
+        job = await _queue.get()
+        job.status = "running"
+        try:
+            await asyncio.wait_for(_build(job), timeout=EXPORT_JOB_TIMEOUT)
+            job.status = "done"
+        except asyncio.CancelledError:
+            raise
+        except HTTPException as e:
+            job.status, job.error = "failed", e.detail
+        except Exception as e:
+            job.status, job.error = "failed", str(e) or type(e).__name__
+        finally:
+            job.finished_at = time.time()
+            if job.status == "failed" and job.path is not None:
+                job.path.unlink(missing_ok=True)
+            _queue.task_done()
+
+
+def start_export_workers() -> None:
+    global _queue
+    if not EXPORT_JOBS_ENABLED:
+        return
+    EXPORT_SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    _queue = asyncio.Queue(maxsize=EXPORT_JOB_QUEUE_SIZE)
+    _workers.extend(asyncio.create_task(_worker()) for _ in range(max(1, EXPORT_JOB_WORKERS)))
+
+
+async def stop_export_workers() -> None:
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+def submit_export_job(kind: ExportKind, event_id: Optional[str] = None) -> ExportJob:
+    _sweep()
+    if not EXPORT_JOBS_ENABLED:
+        raise HTTPException(status_code=503, detail="Background exports are off on this deployment; use the direct downloads.")
+    if _queue is None:
+        raise HTTPException(status_code=503, detail="Export workers are not running.")
+
+    job = ExportJob(kind=kind, event_id=event_id or None)
+    try:
+        _queue.put_nowait(job)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Export queue is full. Try again shortly.")
+
+    _jobs[job.id] = job
+    return job
+
+
+def get_export_job(job_id: str) -> Optional[ExportJob]:
+    _sweep()
+    return _jobs.get(job_id)
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from typing import Optional
 
@@ -12,6 +13,26 @@ MAILJET_SENDER_EMAIL = os.getenv("MAILJET_SENDER_EMAIL")
 MAILJET_SENDER_NAME = os.getenv("MAILJET_SENDER_NAME", "QR Event")
 
 _MAILJET_URL = "https://api.mailjet.com/v3.1/send"
+MAILJET_BATCH_SIZE: int = 50  # messages per Send API call (Mailjet's limit)
+MAILJET_RETRIES: int = int(os.getenv("MAILJET_RETRIES", "3"))  # retries of a batch after a 429, 5xx or network error
+MAILJET_RETRY_DELAY: float = float(os.getenv("MAILJET_RETRY_DELAY", "2"))  # seconds, doubled on each retry
+
+
+def _qr_message(email: str, name: str, qr_data_url: str) -> dict:
+    return {
+        "From": {
+            "Email": MAILJET_SENDER_EMAIL,
+            "Name": MAILJET_SENDER_NAME,
+        },
+        "To": [{"Email": email, "Name": name}],
+        "Subject": f"Your QR Code for {MAILJET_SENDER_NAME}",
+        "HTMLPart": (
+            f"<h3>Hi {name},</h3>"
+            f"<p>Thank you for registering! Here is your QR code:</p>"
+            f"<img src='{qr_data_url}' alt='QR Code' />"
+            f"<p>Show this at the entrance.</p>"
+        ),
+    }
 
 
 async def send_qr_email(
@@ -31,24 +52,7 @@ async def send_qr_email(
         print("MailJet credentials missing. Skipping email.")
         return
 
-    payload = {
-        "Messages": [
-            {
-                "From": {
-                    "Email": MAILJET_SENDER_EMAIL,
-                    "Name": MAILJET_SENDER_NAME,
-                },
-                "To": [{"Email": email, "Name": name}],
-                "Subject": f"Your QR Code for {MAILJET_SENDER_NAME}",
-                "HTMLPart": (
-                    f"<h3>Hi {name},</h3>"
-                    f"<p>Thank you for registering! Here is your QR code:</p>"
-                    f"<img src='{qr_data_url}' alt='QR Code' />"
-                    f"<p>Show this at the entrance.</p>"
-                ),
-            }
-        ]
-    }
+    payload = {"Messages": [_qr_message(email, name, qr_data_url)]}
 
     if client is not None:
         response = await client.post(
@@ -65,3 +69,80 @@ async def send_qr_email(
                 json=payload,
             )
             response.raise_for_status()
+
+
+def _waitlist_closed_message(email: str, name: str, event_title: str) -> dict:
+    return {
+        "From": {
+            "Email": MAILJET_SENDER_EMAIL,
+            "Name": MAILJET_SENDER_NAME,
+        },
+        "To": [{"Email": email, "Name": name}],
+        "Subject": f"Waitlist closed for {event_title}",
+        "HTMLPart": (
+            f"<h3>Hi {name},</h3>"
+            f"<p>The waitlist for <strong>{event_title}</strong> has been closed before a seat opened up for you, "
+            f"so you are no longer on it.</p>"
+            f"<p>Thank you for your interest, and we hope to see you at a future event.</p>"
+        ),
+    }
+
+
+def _retryable(e: httpx.HTTPError) -> bool:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return isinstance(e, httpx.TransportError)
+
+
+async def _post_batch(batch: list[dict], client: httpx.AsyncClient) -> list[dict]:
+    """One Send API call, retried with backoff while Mailjet is rate limiting or unavailable."""
+    for attempt in range(MAILJET_RETRIES + 1):
+        try:
+            response = await client.post(
+                _MAILJET_URL,
+                auth=(MAILJET_API_KEY, MAILJET_API_SECRET),
+                json={"Messages": batch},
+            )
+            response.raise_for_status()
+            return response.json().get("Messages", [])
+        except httpx.HTTPError as e:
+            if attempt == MAILJET_RETRIES or not _retryable(e):
+                raise
+            await asyncio.sleep(MAILJET_RETRY_DELAY * 2 ** attempt)
+
+
+async def _send_batches(messages: list[dict], client: httpx.AsyncClient) -> list[str]:
+    """
+    Send messages MAILJET_BATCH_SIZE per API call. A call that still fails
+    after its retries skips its batch only; returns the addresses Mailjet
+    did not accept.
+    """
+    if not MAILJET_API_KEY or not MAILJET_API_SECRET:
+        print("MailJet credentials missing. Skipping email.")
+        return [m["To"][0]["Email"] for m in messages]
+
+    failed: list[str] = []
+    for i in range(0, len(messages), MAILJET_BATCH_SIZE):
+        batch = messages[i:i + MAILJET_BATCH_SIZE]
+        try:
+            results = await _post_batch(batch, client)
+        except httpx.HTTPError as e:
+            print(f"MailJet batch of {len(batch)} failed: {e}")
+            failed.extend(m["To"][0]["Email"] for m in batch)
+            continue
+        # Results come back in message order
+        failed.extend(m["To"][0]["Email"] for m, r in zip(batch, results) if r.get("Status") != "success")
+        failed.extend(m["To"][0]["Email"] for m in batch[len(results):])
+    return failed
+
+
+async def send_qr_emails(recipients: list[tuple[str, str, str]], client: httpx.AsyncClient) -> list[str]:
+    """Send QR emails to (email, name, qr_data_url) recipients in batches; returns the addresses not sent."""
+    return await _send_batches([_qr_message(*r) for r in recipients], client)
+
+
+async def send_waitlist_closed_emails(
+        recipients: list[tuple[str, str]], event_title: str, client: httpx.AsyncClient
+) -> list[str]:
+    """Tell (email, name) recipients they were dropped from a closed waitlist; returns the addresses not sent."""
+    return await _send_batches([_waitlist_closed_message(email, name, event_title) for email, name in recipients], client)
@@ -2,42 +2,70 @@ import asyncio
 import base64
 import io
 import json
+import os
+import re
 import uuid
 from datetime import datetime, timezone
+from typing import Optional
 
 import qrcode
-from cachetools import TTLCache
 from fastapi import HTTPException
 
-from repository.event_repo import get_all_active_events as get_active_events_repo, get_event_by_id
+from repository.event_repo import get_all_active_events as get_active_events_repo
+from repository.guard import BackendUnavailable
 from repository.registration_repo import (
     get_user_registrations as get_user_registrations_repo,
-    create_registration, get_registration_by_id, update_registration
+    create_registration, load_registration_by_id, update_registration
+)
+from repository.user_repo import load_user_by_qr_code, update_user_by_qr_code
+from repository.waitlist_repo import (
+    add_to_waitlist, delete_user_waitlist_entry, get_user_waitlist as get_user_waitlist_repo, get_waitlist_position
+)
+from services.cache import cache
+from services.capacity import confirm_seat, is_duplicate, seats_for
+from services.event import EVENT_CACHE_MAX_STALE, get_event_dict
+
+_active_events_cache = cache(
+    "registration.active_events", maxsize=1, ttl=EVENT_CACHE_MAX_STALE, refresh=120, stale_if_error=True  # 2 minutes
 )
-from repository.user_repo import get_user_by_qr_code, update_user_by_qr_code
 
-_active_events_cache = TTLCache(maxsize=1, ttl=120)  # 2 minutes
+IDEMPOTENCY_TTL: float = float(os.getenv("IDEMPOTENCY_TTL", "600"))  # 10 minutes
+IDEMPOTENCY_CACHE_SIZE: int = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "4096"))
+REGISTERED_EVENTS_CACHE_SIZE: int = int(os.getenv("REGISTERED_EVENTS_CACHE_SIZE", "4096"))
+_IDEMPOTENCY_KEY = re.compile(r"[\w.:-]{1,128}")
+
+# (user, event, idempotency key) -> the first request's result
+_idempotent_results = cache("registration.idempotency", maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL)
+# user -> ids of events they are known to be registered for. Only ever short of the truth (registrations
+# made through another worker), never ahead of it, so a hit can skip the insert.
+_registered_events = cache("registration.user_events", maxsize=REGISTERED_EVENTS_CACHE_SIZE, ttl=300)  # 5 minutes
 
 
 def invalidate_active_events_cache() -> None:
-    _active_events_cache.clear()
+    _active_events_cache.invalidate()
 
 
 async def get_user_registrations(user_qr_code: str) -> list[dict]:
-    return await get_user_registrations_repo(user_qr_code)
+    registrations = await get_user_registrations_repo(user_qr_code)
+    _registered_events[user_qr_code] = frozenset(str(r["event_id"]) for r in registrations)
+    return registrations
+
+
+def _remember_registration(user_qr_code: str, event_id: str) -> None:
+    _registered_events[user_qr_code] = _registered_events.get(user_qr_code, frozenset()) | {event_id}
 
 
 async def get_all_active_events() -> list[dict]:
-    if "data" in _active_events_cache:
-        return _active_events_cache["data"]
+    return await _active_events_cache.get_or_load("data", get_active_events_repo, default=[])
 
-    try:
-        result = await get_active_events_repo()
-    except Exception:
-        return _active_events_cache.get("data", [])
 
-    _active_events_cache["data"] = result
-    return result
+async def get_user_waitlist(user_qr_code: str) -> list[dict]:
+    return await get_user_waitlist_repo(user_qr_code)
+
+
+async def leave_waitlist(user_qr_code: str, event_id: str) -> bool:
+    """Take the user off an event's waitlist; False if they were not on it."""
+    return await delete_user_waitlist_entry(event_id, user_qr_code)
 
 
 async def register_for_event(
@@ -45,55 +73,115 @@ async def register_for_event(
         event_id: str,
         user_name: str,
         user_email: str,
+        idempotency_key: Optional[str] = None,
 ) -> dict:
+    """
+    Register a user and build their QR. A user already registered gets
+    {"already_registered": True}. A capped event reserves a seat first:
+    when it is full this raises 409, or, with a waitlist, queues the user
+    and returns {"waitlisted": True, "position", "event_title"}.
+
+    Requests repeating an idempotency key within IDEMPOTENCY_TTL (a double
+    tap, a retry after a timeout) share the first one's result, marked
+    "replayed", instead of registering again.
+    """
+    if not idempotency_key:
+        return await _register(user_qr_code, event_id, user_name)
+    if not _IDEMPOTENCY_KEY.fullmatch(idempotency_key):
+        raise HTTPException(status_code=400, detail="Invalid idempotency key.")
+
+    first = False
+
+    async def _first():
+        nonlocal first
+        first = True
+        return await _register(user_qr_code, event_id, user_name)
+
+    result = await _idempotent_results.get_or_load((user_qr_code, event_id, idempotency_key), _first)
+    return result if first else {**result, "replayed": True}
+
+
+async def _register(user_qr_code: str, event_id: str, user_name: str) -> dict:
+    if event_id in (_registered_events.get(user_qr_code) or ()):
+        return {"already_registered": True}
+
+    event = await get_event_dict(event_id)
+    event_title = event.get("title", "FOSSUoK Event") if event else "FOSSUoK Event"
+    seats = await seats_for(event) if event and event.get("capacity") else None
+    if seats is not None and not seats.reserve():
+        return await _event_full(event, user_qr_code)
+
     reg_id = str(uuid.uuid4())
+    registration, admitted = None, False
+    try:
+        registration = await _insert_registration(reg_id, user_qr_code, event_id)
+        admitted = registration is not None and (seats is None or await confirm_seat(event_id, reg_id, seats))
+    finally:
+        if seats is not None:
+            seats.settle(admitted)
+    if registration is None:
+        _remember_registration(user_qr_code, event_id)
+        return {"already_registered": True}
+    if not admitted:
+        return await _event_full(event, user_qr_code)
+    _remember_registration(user_qr_code, event_id)
+
+    qr_data_url = await asyncio.to_thread(
+        _generate_qr_data_url, qr_payload(reg_id, user_qr_code, event_id, user_name, event_title))
+
+    return {**registration, "qr_data_url": qr_data_url, "event_title": event_title}
 
+
+async def _insert_registration(reg_id: str, user_qr_code: str, event_id: str) -> Optional[dict]:
+    """The new registration, or None if the user is already registered for the event."""
     try:
-        registration = await create_registration({
+        return await create_registration({
             "id": reg_id,
             "user_qr_code": user_qr_code,
             "event_id": event_id
         })
+    except BackendUnavailable:
+        raise
     except Exception as e:
-        msg = str(e).lower()
-        if "duplicate" in msg or "unique" in msg or "23505" in msg:
-            raise HTTPException(status_code=409, detail="Already registered for this event.")
+        if is_duplicate(e):
+            return None
         raise HTTPException(status_code=400, detail=f"Registration failed: {str(e)}")
 
-    try:
-        event = await get_event_by_id(event_id, select="title")
-        event_title = event.get("title", "FOSSUoK Event") if event else "FOSSUoK Event"
-    except Exception:
-        event_title = "FOSSUoK Event"
 
-    qr_payload = json.dumps(
-        {"rid": reg_id, "uid": user_qr_code, "eid": event_id, "name": user_name, "event": event_title},
-        separators=(",", ":"),
-    )
-    qr_data_url = await asyncio.to_thread(_generate_qr_data_url, qr_payload)
+async def _event_full(event: dict, user_qr_code: str) -> dict:
+    if not event.get("waitlist"):
+        raise HTTPException(status_code=409, detail="This event is full.")
 
-    return {**registration, "qr_data_url": qr_data_url, "event_title": event_title}
+    event_id = str(event["id"])
+    if any(str(r["event_id"]) == event_id for r in await get_user_registrations(user_qr_code)):
+        return {"already_registered": True}
+    try:
+        entry = await add_to_waitlist(event_id, user_qr_code)
+    except BackendUnavailable:
+        raise
+    except Exception as e:
+        if is_duplicate(e):
+            raise HTTPException(status_code=409, detail="Already on the waitlist for this event.")
+        raise HTTPException(status_code=400, detail=f"Could not join the waitlist: {str(e)}")
+
+    position = await get_waitlist_position(event_id, entry["joined_at"])
+    return {"waitlisted": True, "position": position, "event_title": event.get("title", "FOSSUoK Event")}
 
 
 async def get_registration_qr_payload(registration_id: str, user_qr_code: str) -> str | None:
     try:
-        reg = await get_registration_by_id(registration_id, select="id, user_qr_code, event_id",
-                                           user_qr_code=user_qr_code)
-        if not reg:
+        reg = await load_registration_by_id(registration_id)
+        if not reg or reg["user_qr_code"] != user_qr_code:
             return None
 
-        event_task = get_event_by_id(reg["event_id"], select="title")
-        user_task = get_user_by_qr_code(user_qr_code, select="name")
-        event, user = await asyncio.gather(event_task, user_task)
+        event, user = await asyncio.gather(get_event_dict(reg["event_id"]), load_user_by_qr_code(user_qr_code))
 
         event_title = event.get("title", "FOSSUoK Event") if event else "FOSSUoK Event"
         user_name = user.get("name", "") if user else ""
 
-        return json.dumps(
-            {"rid": reg["id"], "uid": reg["user_qr_code"], "eid": reg["event_id"],
-             "name": user_name, "event": event_title},
-            separators=(",", ":"),
-        )
+        return qr_payload(reg["id"], reg["user_qr_code"], reg["event_id"], user_name, event_title)
+    except BackendUnavailable:
+        raise
     except Exception:
         return None
 
@@ -107,17 +195,17 @@ async def verify_registration(qr_raw: str) -> dict:
     if "rid" in data:
         reg_id = data["rid"]
         try:
-            reg = await get_registration_by_id(reg_id, select="id, user_qr_code, event_id, attended_at")
+            reg = await load_registration_by_id(reg_id)
+        except BackendUnavailable:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
         if not reg:
             raise HTTPException(status_code=404, detail="Registration not found.")
 
-        user_task = get_user_by_qr_code(reg["user_qr_code"], select="name, email, avatar_url")
-        event_task = get_event_by_id(reg["event_id"], select="id, title")
-
-        user_dict, event_dict = await asyncio.gather(user_task, event_task)
+        user_dict, event_dict = await asyncio.gather(
+            load_user_by_qr_code(reg["user_qr_code"]), get_event_dict(reg["event_id"]))
 
         already_marked = bool(reg.get("attended_at"))
         attended_at = reg.get("attended_at")
@@ -153,7 +241,9 @@ async def verify_registration(qr_raw: str) -> dict:
     # Legacy format
     search_id = data.get("id", qr_raw)
     try:
-        user = await get_user_by_qr_code(search_id, select="qr_code_data, name, email, attended_at")
+        user = await load_user_by_qr_code(search_id)
+    except BackendUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
@@ -188,9 +278,33 @@ async def verify_registration(qr_raw: str) -> dict:
     }
 
 
+def qr_payload(reg_id: str, user_qr_code: str, event_id: str, user_name: str, event_title: str) -> str:
+    """The JSON encoded in a registration's QR code."""
+    return json.dumps(
+        {"rid": reg_id, "uid": user_qr_code, "eid": event_id, "name": user_name, "event": event_title},
+        separators=(",", ":"),
+    )
+
+
 def _generate_qr_data_url(text: str) -> str:
     buf = io.BytesIO()
     qrcode.make(text).save(buf, format="PNG")
     buf.seek(0)
     b64 = base64.b64encode(buf.read()).decode("ascii")
     return f"data:image/png;base64,{b64}"
+
+
+def generate_qr_data_urls(texts: list[str]) -> list[str]:
+    """
+    QR data URLs for a batch, run in the export pool by bulk imports. The
+    mask pattern is fixed: any of the eight scans, and trying them all is
+    most of the cost of a code.
+    """
+    urls = []
+    for text in texts:
+        qr = qrcode.QRCode(mask_pattern=0)
+        qr.add_data(text)
+        buf = io.BytesIO()
+        qr.make_image().save(buf, format="PNG")
+        urls.append(f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode('ascii')}")
+    return urls
@@ -2,26 +2,31 @@ import asyncio
 import base64
 import io
 import json
-import time
+import os
 import uuid
 from datetime import datetime, timezone
+from functools import partial
 
 import qrcode
 from fastapi import HTTPException
 from fastapi.responses import StreamingResponse
 
-from repository.event_repo import get_active_event_dict
 from repository.user_repo import (
-    get_user_by_github_id, update_user_by_github_id, create_user,
-    get_user_by_qr_code, update_user_by_qr_code
+    IMPORTED_GITHUB_ID_PREFIX, get_user_by_github_id, update_user_by_github_id, create_user,
+    get_user_by_qr_code, update_user_by_qr_code, claim_imported_user
 )
+from services.cache import cache
+from services.event import get_active_event
+from services.user_search import index_user, remove_indexed_user, update_indexed_user
 
-_profile_cache: dict[str, tuple[dict | None, float]] = {}
+PROFILE_CACHE_SIZE: int = int(os.getenv("PROFILE_CACHE_SIZE", "4096"))
 _PROFILE_TTL: int = 300  # 5 minutes
+_PROFILE_SELECT = "qr_code_data, participant_type, email, name, avatar_url"
+_profile_cache = cache("user.profiles", maxsize=PROFILE_CACHE_SIZE, ttl=_PROFILE_TTL)
 
 
 def invalidate_user_profile_cache(qr_code_data: str) -> None:
-    _profile_cache.pop(qr_code_data, None)
+    _profile_cache.invalidate(qr_code_data)
 
 
 async def auto_register_user(supabase_user) -> dict:
@@ -52,6 +57,7 @@ async def auto_register_user(supabase_user) -> dict:
 
                 if update_data:
                     await update_user_by_github_id(github_id, update_data)
+                    update_indexed_user(update_data, github_id=github_id)
             except Exception:
                 pass
 
@@ -59,6 +65,18 @@ async def auto_register_user(supabase_user) -> dict:
 
         return {**user_record, **update_data}
 
+    # Pre-registered by a bulk import: the first login takes over that user
+    if email:
+        try:
+            claimed = await claim_imported_user(email, github_id, {"name": name, "avatar_url": avatar_url})
+        except Exception:
+            claimed = None
+        if claimed:
+            remove_indexed_user(f"{IMPORTED_GITHUB_ID_PREFIX}{claimed['qr_code_data']}")
+            index_user(claimed)
+            invalidate_user_profile_cache(claimed["qr_code_data"])
+            return claimed
+
     # Completely new user
     new_qr_id = str(uuid.uuid4())
     new_user_data = {
@@ -74,10 +92,11 @@ async def auto_register_user(supabase_user) -> dict:
         created_user = await create_user(new_user_data)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Registration failed: {str(e)}")
+    index_user(created_user)
 
     # For new users, we fetch the event to generate their first QR code
-    active_event = await get_active_event_dict()
-    event_id = active_event["id"] if active_event else None
+    active_event = await get_active_event()
+    event_id = active_event.id if active_event else None
 
     if event_id:
         try:
@@ -90,7 +109,7 @@ async def auto_register_user(supabase_user) -> dict:
         "id": new_qr_id,
         "name": name,
         "email": email,
-        "event": active_event["title"] if active_event else "FOSSUoK Event",
+        "event": active_event.title if active_event else "FOSSUoK Event",
     }
     qr_data_url = await asyncio.to_thread(
         generate_qr_data_url, json.dumps(qr_payload, separators=(",", ":"))
@@ -163,18 +182,8 @@ def generate_qr_data_url(text: str) -> str:
 
 
 async def get_user_profile(qr_code_data: str) -> dict | None:
-    cached = _profile_cache.get(qr_code_data)
-    if cached is not None and (time.monotonic() - cached[1]) < _PROFILE_TTL:
-        return cached[0]
-
-    try:
-        profile = await get_user_by_qr_code(qr_code_data,
-                                            select="qr_code_data, participant_type, email, name, avatar_url")
-    except Exception:
-        return _profile_cache.get(qr_code_data, (None,))[0]
-
-    _profile_cache[qr_code_data] = (profile, time.monotonic())
-    return profile
+    return await _profile_cache.get_or_load(
+        qr_code_data, partial(get_user_by_qr_code, qr_code_data, select=_PROFILE_SELECT))
 
 
 async def complete_user_profile(qr_code_data: str, profile_data: dict) -> None:
@@ -190,3 +199,4 @@ async def complete_user_profile(qr_code_data: str, profile_data: dict) -> None:
     }
     await update_user_by_qr_code(qr_code_data, update)
     invalidate_user_profile_cache(qr_code_data)
+    update_indexed_user(update, qr_code_data=qr_code_data)
@@ -0,0 +1,267 @@
+"""
+In-process search index for the admin users list.
+
+Name, email, student id and organization are broken into character
+trigrams (substring queries) and word tokens (one- and two-letter prefix
+queries); each posting list is a packed array of document slots. A query
+takes the slots of its rarest trigram, confirms them against the stored
+text and ranks the matches: whole field, field prefix, word prefix, then
+substring, with name ahead of email, student id and organization.
+
+The index is built from a keyset scan at startup, patched in place when a
+user is created, updated or deleted through this process, and rebuilt
+every USER_SEARCH_REBUILD seconds to pick up writes made by other workers
+(and to drop deleted slots). Until the first build completes, search falls
+back to the database.
+"""
+import asyncio
+import heapq
+import os
+import re
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+from collections.abc import Iterator
+from itertools import chain, islice
+from typing import Optional
+
+from repository.user_repo import iter_users
+
+SEARCH_FIELDS: tuple[str, ...] = ("name", "email", "student_id", "organization")
+USER_SEARCH_REBUILD: float = float(os.getenv("USER_SEARCH_REBUILD", "600"))  # 10 minutes
+
+_TOKEN = re.compile(r"[^\W_]+")
+_EMPTY = array("i")
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _at_word_start(text: str, q: str) -> bool:
+    i = text.find(q)
+    while i > 0 and text[i - 1].isalnum():
+        i = text.find(q, i + 1)
+    return i >= 0
+
+
+class UserSearchIndex:
+    """
+    Append-only slots; removing a user blanks its slot and lookups skip it.
+
+    `trigrams` map to slots across all fields. `words` (every word) and
+    `heads` (first word) are kept per field, so the kind and field of a
+    match fall out of set unions instead of re-reading every candidate.
+    """
+
+    __slots__ = ("docs", "blobs", "names", "by_name", "removed", "slot_by_github_id", "slot_by_qr",
+                 "trigrams", "words", "heads", "_vocabulary")
+
+    def __init__(self):
+        self.docs: list[Optional[tuple[str, Optional[str], tuple[str, ...]]]] = []  # (github_id, qr, fields)
+        self.blobs: list[str] = []  # fields joined, "" once removed
+        self.names: list[str] = []
+        self.by_name: list[int] = []  # slots in name order
+        self.removed: set[int] = set()
+        self.slot_by_github_id: dict[str, int] = {}
+        self.slot_by_qr: dict[str, int] = {}
+        self.trigrams: defaultdict[str, array] = defaultdict(lambda: array("i"))
+        self.words = tuple(defaultdict(lambda: array("i")) for _ in SEARCH_FIELDS)
+        self.heads = tuple(defaultdict(lambda: array("i")) for _ in SEARCH_FIELDS)
+        self._vocabulary: Optional[list[str]] = None  # sorted words of all fields, rebuilt when one is new
+
+    def __len__(self) -> int:
+        return len(self.slot_by_github_id)
+
+    def add(self, user: dict) -> None:
+        github_id = str(user["github_id"])
+        self.remove(github_id)
+
+        fields = tuple((user.get(f) or "").lower() for f in SEARCH_FIELDS)
+        slot = len(self.docs)
+        self.docs.append((github_id, user.get("qr_code_data"), fields))
+        self.blobs.append("\n".join(fields))
+        self.names.append(fields[0])
+        insort(self.by_name, slot, key=self.names.__getitem__)
+        self.slot_by_github_id[github_id] = slot
+        if user.get("qr_code_data"):
+            self.slot_by_qr[user["qr_code_data"]] = slot
+
+        for gram in set().union(*map(_trigrams, fields)):
+            self.trigrams[gram].append(slot)
+        for field, text in enumerate(fields):
+            words = _TOKEN.findall(text)
+            if words and text.startswith(words[0]):
+                self.heads[field][words[0]].append(slot)
+            for word in set(words):
+                if word not in self.words[field]:
+                    self._vocabulary = None
+                self.words[field][word].append(slot)
+
+    def update(self, changes: dict, github_id: Optional[str] = None, qr_code_data: Optional[str] = None) -> None:
+        if not any(f in changes for f in SEARCH_FIELDS):
+            return
+        slot = self.slot_by_github_id.get(github_id) if github_id else self.slot_by_qr.get(qr_code_data)
+        if slot is None:
+            return
+        github_id, qr, fields = self.docs[slot]
+        self.add({"github_id": github_id, "qr_code_data": qr, **dict(zip(SEARCH_FIELDS, fields)), **changes})
+
+    def remove(self, github_id: str) -> None:
+        slot = self.slot_by_github_id.pop(github_id, None)
+        if slot is None:
+            return
+        qr = self.docs[slot][1]
+        if qr and self.slot_by_qr.get(qr) == slot:
+            del self.slot_by_qr[qr]
+        self.docs[slot] = None
+        self.blobs[slot] = ""
+        self.removed.add(slot)
+
+    def _word_keys(self, prefix: str) -> list[str]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(set().union(*self.words))
+        keys = self._vocabulary
+        i = j = bisect_left(keys, prefix)
+        while j < len(keys) and keys[j].startswith(prefix):
+            j += 1
+        return keys[i:j]
+
+    def _matches(self, q: str) -> set[int]:
+        """Slots with q anywhere in a field (or, below three characters, at the start of a word)."""
+        if len(q) < 3:
+            keys = self._word_keys(q)
+            return set().union(*(words[k] for words in self.words for k in keys if k in words)) - self.removed
+
+        # Checking the rarest trigram's slots directly is cheaper than intersecting the rest
+        rarest = min((self.trigrams.get(g, _EMPTY) for g in _trigrams(q)), key=len)
+        if len(q) == 3:
+            return set(rarest) - self.removed
+        blobs = self.blobs
+        return {s for s in rarest if q in blobs[s]}
+
+    def _buckets(self, q: str) -> Iterator[set[int]]:
+        """
+        Slot sets for the better match kinds, best first: whole field, field
+        prefix, then word prefix, each split by field. Anything else among
+        the matches is a plain substring hit. Built lazily, since a page is
+        usually filled by the first few.
+        """
+        lead = _TOKEN.match(q)
+        if lead is None:
+            return
+        lead = lead.group()
+        docs, fields = self.docs, range(len(SEARCH_FIELDS))
+
+        if lead == q:
+            keys = self._word_keys(q)
+            for f in fields:
+                yield {s for s in self.heads[f].get(q, _EMPTY) if docs[s] and docs[s][2][f] == q}
+            for f in fields:
+                yield set().union(*(self.heads[f][k] for k in keys if k in self.heads[f]))
+            for f in fields:
+                yield set().union(*(self.words[f][k] for k in keys if k in self.words[f]))
+            return
+
+        # Several words: the first must be whole, and the rest is checked against the text
+        heads = [{s for s in self.heads[f].get(lead, _EMPTY) if docs[s] and docs[s][2][f].startswith(q)}
+                 for f in fields]
+        for f in fields:
+            yield {s for s in heads[f] if docs[s][2][f] == q}
+        yield from heads
+        for f in fields:
+            yield {s for s in self.words[f].get(lead, _EMPTY) if docs[s] and _at_word_start(docs[s][2][f], q)}
+
+    def _first_by_name(self, slots: set[int], n: int) -> list[int]:
+        if len(slots) * 4 < len(self.by_name):
+            return heapq.nsmallest(n, slots, key=self.names.__getitem__)
+        # Dense bucket: walking the name order finds n members quickly
+        return list(islice(filter(slots.__contains__, self.by_name), n))
+
+    def search(self, q: str, offset: int = 0, limit: int = 15) -> tuple[list[str], int]:
+        """github_ids of one page of ranked matches, plus the total match count."""
+        q = " ".join(q.lower().split())
+        if not q:
+            return [], 0
+
+        matches = self._matches(q)
+        # A slot ranks by the first bucket it appears in; within a bucket, by name
+        page, seen, skip = [], set(), offset
+        for bucket in chain(self._buckets(q), [matches]):
+            bucket = (bucket & matches) - seen
+            seen |= bucket
+            if skip >= len(bucket):
+                skip -= len(bucket)
+                continue
+            page.extend(self._first_by_name(bucket, skip + limit - len(page))[skip:])
+            skip = 0
+            if len(page) >= limit:
+                break
+
+        return [self.docs[slot][0] for slot in page], len(matches)
+
+
+_index: Optional[UserSearchIndex] = None
+_journal: Optional[list[tuple]] = None  # writes seen while a rebuild is scanning
+_task: Optional[asyncio.Task] = None
+
+
+def _apply(op: str, *args) -> None:
+    if _index is not None:
+        getattr(_index, op)(*args)
+    if _journal is not None:
+        _journal.append((op, args))
+
+
+def index_user(user: dict) -> None:
+    _apply("add", user)
+
+
+def update_indexed_user(changes: dict, github_id: Optional[str] = None, qr_code_data: Optional[str] = None) -> None:
+    _apply("update", changes, github_id, qr_code_data)
+
+
+def remove_indexed_user(github_id: str) -> None:
+    _apply("remove", github_id)
+
+
+def search_users(q: str, offset: int = 0, limit: int = 15) -> Optional[tuple[list[str], int]]:
+    """Ranked matches from the index, or None while it is still being built."""
+    if _index is None:
+        return None
+    return _index.search(q, offset, limit)
+
+
+async def build_user_search_index() -> None:
+    global _index, _journal
+    _journal = []
+    try:
+        index = UserSearchIndex()
+        async for page in iter_users(select="github_id, qr_code_data, " + ", ".join(SEARCH_FIELDS)):
+            for user in page:
+                index.add(user)
+        for op, args in _journal:
+            getattr(index, op)(*args)
+        _index = index
+    finally:
+        _journal = None
+
+
+async def _maintain() -> None:
+    while True:
+        try:
+            await build_user_search_index()
+        except Exception:
+            pass  # keep serving the previous index (or the DB fallback)
+        await asyncio.sleep(USER_SEARCH_REBUILD)
+
+
+def start_user_search_index() -> None:
+    global _task
+    _task = asyncio.create_task(_maintain())
+
+
+async def stop_user_search_index() -> None:
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
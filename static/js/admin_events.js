@@ -78,6 +78,19 @@
                 '<div class="ef-label"><i class="bi bi-image"></i> Cover Image URL</div>' +
                 '<input id="swalImage" class="ef-input" placeholder="https://..." value="' + (vals.image_url || '').replace(/"/g, '&quot;') + '">' +
             '</div>' +
+            '<div class="ef-row">' +
+                '<div class="ef-group ef-half">' +
+                    '<div class="ef-label"><i class="bi bi-people"></i> Capacity</div>' +
+                    '<input id="swalCapacity" class="ef-input" type="number" min="1" step="1" placeholder="Unlimited" value="' + (vals.capacity || '') + '">' +
+                '</div>' +
+                '<label class="ef-group ef-half ef-toggle">' +
+                    '<input id="swalWaitlist" type="checkbox"' + (vals.waitlist ? ' checked' : '') + '>' +
+                    '<div>' +
+                        '<div class="ef-toggle-label">Waitlist</div>' +
+                        '<div class="ef-toggle-hint">Queue sign-ups once full</div>' +
+                    '</div>' +
+                '</label>' +
+            '</div>' +
             '<div class="ef-group">' +
                 '<div class="ef-label"><i class="bi bi-whatsapp"></i> WhatsApp Group Link</div>' +
                 '<input id="swalWhatsapp" class="ef-input" placeholder="https://chat.whatsapp.com/..." value="' + (vals.whatsapp_link || '').replace(/"/g, '&quot;') + '">' +
@@ -96,6 +109,11 @@
     function getFormValues() {
         var title = document.getElementById('swalTitle').value.trim();
         if (!title) { Swal.showValidationMessage('Title is required'); return false; }
+        var capacity = document.getElementById('swalCapacity').value.trim();
+        if (capacity && !/^[1-9][0-9]*$/.test(capacity)) {
+            Swal.showValidationMessage('Capacity must be a positive whole number');
+            return false;
+        }
         return {
             title: title,
             description: document.getElementById('swalDesc').value.trim(),
@@ -104,7 +122,9 @@
             end_time: document.getElementById('swalEnd').value,
             image_url: document.getElementById('swalImage').value.trim(),
             whatsapp_link: document.getElementById('swalWhatsapp').value.trim(),
-            is_active: document.getElementById('swalActive').checked
+            is_active: document.getElementById('swalActive').checked,
+            capacity: capacity,
+            waitlist: document.getElementById('swalWaitlist').checked
         };
     }
 
@@ -132,6 +152,8 @@
                 document.getElementById('formImageUrl').value = d.image_url;
                 document.getElementById('formWhatsappLink').value = d.whatsapp_link;
                 document.getElementById('formIsActive').value = d.is_active ? 'on' : '';
+                document.getElementById('formCapacity').value = d.capacity;
+                document.getElementById('formWaitlist').value = d.waitlist ? 'on' : '';
                 document.getElementById('createEventForm').submit();
             }
         });
@@ -149,7 +171,9 @@
                 end_time: btn.dataset.eventEnd,
                 image_url: btn.dataset.eventImage,
                 whatsapp_link: btn.dataset.eventWhatsapp,
-                is_active: btn.dataset.eventActive === 'true'
+                is_active: btn.dataset.eventActive === 'true',
+                capacity: btn.dataset.eventCapacity,
+                waitlist: btn.dataset.eventWaitlist === 'true'
             };
 
             Swal.fire({
@@ -176,6 +200,8 @@
                     document.getElementById('editImageUrl').value = d.image_url;
                     document.getElementById('editWhatsappLink').value = d.whatsapp_link;
                     document.getElementById('editIsActive').value = d.is_active ? 'on' : '';
+                    document.getElementById('editCapacity').value = d.capacity;
+                    document.getElementById('editWaitlist').value = d.waitlist ? 'on' : '';
                     form.submit();
                 }
             });
@@ -246,6 +272,14 @@
             event_deleted: { title: 'Event Deleted',        text: 'The event has been removed.' }
         };
         var msg = messages[success] || { title: 'Done!', text: '' };
+        if (params.has('promoted')) {
+            // The edit lifted the cap or closed the waitlist, which released everyone waiting
+            msg = {
+                title: msg.title,
+                text: params.get('promoted') + ' registered from the waitlist, '
+                    + params.get('dropped') + ' removed and notified by email.'
+            };
+        }
 
         Swal.fire({
             toast: true,
@@ -46,10 +46,119 @@
         });
     }
 
-    document.querySelectorAll('[data-action]').forEach(function (btn) {
-        btn.addEventListener('click', function () { handleAction(btn); });
+    // Delegated, so rows swapped in by the live table keep working
+    document.addEventListener('click', function (e) {
+        const btn = e.target.closest('[data-action]');
+        if (btn) handleAction(btn);
     });
 
+    /* ── Live Search & Paging: swap rows in place ── */
+    const tbody      = document.getElementById('usersTableBody');
+    const pagination = document.getElementById('usersPagination');
+    const searchForm = document.querySelector('.search-wrap');
+    const searchBox  = document.getElementById('userSearch');
+    let inflight = null;
+    let debounce = null;
+
+    /* Same markup as templates/partials/admin_users_rows.html */
+    function esc(value) {
+        return String(value == null ? '' : value).replace(/[&<>"']/g, function (c) {
+            return { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c];
+        });
+    }
+
+    function actionButton(u, action, icon, label) {
+        return '<button type="button" class="btn-' + action + '" data-action="' + action + '"' +
+            ' data-name="' + esc(u.name) + '" data-url="/admin/users/' + encodeURIComponent(u.github_id) + '/' + action + '">' +
+            '<i class="bi bi-' + icon + ' me-1"></i>' + label + '</button>';
+    }
+
+    function renderRow(u) {
+        let actions = '';
+        if (u.participant_type) {
+            actions += '<button type="button" class="btn-info-affiliation" data-name="' + esc(u.name) + '"' +
+                ' data-type="' + esc(u.participant_type) + '" data-student-id="' + esc(u.student_id) + '"' +
+                ' data-university="' + esc(u.university) + '" data-study-year="' + esc(u.study_year) + '"' +
+                ' data-organization="' + esc(u.organization) + '" data-job-role="' + esc(u.job_role) + '"' +
+                ' data-bs-toggle="modal" data-bs-target="#affiliationModal"><i class="bi bi-person-badge"></i></button>';
+        }
+        if (u.role !== 'admin') actions += actionButton(u, 'promote', 'arrow-up-circle', 'Promote');
+        else if (!u.self) actions += actionButton(u, 'demote', 'arrow-down-circle', 'Demote');
+        if (!u.self) actions += actionButton(u, 'delete', 'trash', 'Delete');
+
+        const role = u.role === 'admin'
+            ? '<span class="badge-admin"><i class="bi bi-shield-check me-1"></i>Admin</span>'
+            : '<span class="badge-participant"><i class="bi bi-person me-1"></i>Participant</span>';
+
+        return '<tr class="user-row">' +
+            '<td><img src="' + esc(u.avatar_url || 'https://github.com/identicons/default.png') + '" alt="' + esc(u.name) + '" class="user-avatar"></td>' +
+            '<td class="fw-medium user-name">' + esc(u.name) + '</td>' +
+            '<td class="text-muted user-email hide-xs">' + esc(u.email || '—') + '</td>' +
+            '<td>' + role + '</td>' +
+            '<td class="text-muted small hide-xs">' + esc(u.joined || '—') + '</td>' +
+            '<td class="text-end users-action-cell"><div class="d-flex justify-content-end gap-2">' + actions + '</div></td>' +
+            '</tr>';
+    }
+
+    function renderRows(users, search) {
+        if (!users.length) {
+            return '<tr><td colspan="6" class="text-center text-muted py-4">No users match "' + esc(search) + '"</td></tr>';
+        }
+        return users.map(renderRow).join('');
+    }
+
+    function loadUsers(query, push) {
+        if (inflight) inflight.abort();  // a newer search or page supersedes this one
+        const controller = inflight = new AbortController();
+
+        fetch('/admin/users/fragment' + (query ? '?' + query : ''), { signal: controller.signal })
+            .then(r => r.ok ? r.json() : Promise.reject(r.status))
+            .then(function (data) {
+                tbody.innerHTML = renderRows(data.users, data.search);
+                pagination.innerHTML = data.pagination;
+                document.getElementById('userCount').textContent = (data.estimated ? 'about ' : '') + data.total;
+
+                const url = '/admin/users' + (query ? '?' + query : '');
+                if (push) window.history.pushState(null, '', url);
+                else window.history.replaceState(null, '', url);
+            })
+            .catch(function (err) {
+                if (err && err.name === 'AbortError') return;
+                window.location.href = '/admin/users' + (query ? '?' + query : '');  // fall back to a full page load
+            })
+            .finally(function () {
+                if (inflight === controller) inflight = null;
+            });
+    }
+
+    if (tbody && pagination) {
+        searchBox.addEventListener('input', function () {
+            clearTimeout(debounce);
+            debounce = setTimeout(function () {
+                loadUsers('search=' + encodeURIComponent(searchBox.value.trim()), false);
+            }, 250);
+        });
+
+        searchForm.addEventListener('submit', function (e) {
+            e.preventDefault();
+            clearTimeout(debounce);
+            loadUsers('search=' + encodeURIComponent(searchBox.value.trim()), false);
+        });
+
+        pagination.addEventListener('click', function (e) {
+            const link = e.target.closest('a[href^="?"]');
+            if (!link) return;
+            e.preventDefault();
+            loadUsers(link.getAttribute('href').slice(1), true);
+        });
+
+        window.addEventListener('popstate', function () {
+            const params = new URLSearchParams(window.location.search);
+            searchBox.value = params.get('search') || '';
+            loadUsers(params.toString(), false);
+        });
+    }
+
     /* ── Success Toast via SweetAlert2 ── */
     const params  = new URLSearchParams(window.location.search);
     const success = params.get('success');
@@ -0,0 +1,66 @@
+(function () {
+    /* ── Arrival timeline & affiliation split ── */
+    const panel = document.getElementById('analyticsPanel');
+    if (!panel) return;
+
+    const eventId  = panel.dataset.eventId;
+    const timeline = document.getElementById('arrivalTimeline');
+    const split    = document.getElementById('affiliationSplit');
+    const asOf     = document.getElementById('analyticsAsOf');
+
+    const labels = {
+        uok_student:      '🎓 UoK Student',
+        other_university: '🏫 Other University',
+        industry:         '💼 Industry',
+        unknown:          'Not specified',
+    };
+
+    function renderTimeline(buckets) {
+        if (!buckets.length) {
+            timeline.innerHTML = '<span class="text-muted small">No check-ins yet</span>';
+            return;
+        }
+        const peak = Math.max(...buckets.map(b => b.count), 1);
+        timeline.innerHTML = buckets.map(function (b) {
+            const time = new Date(b.start).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+            const pct  = Math.round(b.count / peak * 100);
+            return `<div class="arrival-bar" title="${time} — ${b.count} check-ins">
+                <div class="arrival-bar-fill" style="height:${pct}%"></div>
+                <span class="arrival-bar-label">${time}</span>
+            </div>`;
+        }).join('');
+    }
+
+    function renderSplit(affiliation) {
+        split.innerHTML = Object.keys(labels).map(function (type) {
+            const row = affiliation[type] || { registered: 0, attended: 0 };
+            if (type === 'unknown' && !row.registered) return '';
+            const pct = row.registered ? Math.round(row.attended / row.registered * 100) : 0;
+            return `<div class="affil-split-row">
+                <div class="d-flex justify-content-between small">
+                    <span class="fw-medium">${labels[type]}</span>
+                    <span class="text-muted">${row.attended} / ${row.registered}</span>
+                </div>
+                <div class="progress mt-1" style="height: 6px;">
+                    <div class="progress-bar bg-primary" role="progressbar" style="width: ${pct}%"></div>
+                </div>
+            </div>`;
+        }).join('');
+    }
+
+    function load() {
+        fetch('/admin/analytics/' + encodeURIComponent(eventId))
+            .then(r => r.ok ? r.json() : Promise.reject(r.status))
+            .then(function (data) {
+                renderTimeline(data.timeline);
+                renderSplit(data.affiliation);
+                asOf.textContent = data.total_attended + ' of ' + data.total_registered + ' checked in';
+            })
+            .catch(function () {
+                timeline.innerHTML = '<span class="text-muted small">Analytics unavailable</span>';
+            });
+    }
+
+    load();
+    setInterval(load, 30000);
+})();
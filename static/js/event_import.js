@@ -0,0 +1,116 @@
+(function () {
+    /* ── Bulk attendee import: upload a CSV, show the per-row report ── */
+    function escapeHtml(s) {
+        const div = document.createElement('div');
+        div.textContent = s == null ? '' : String(s);
+        return div.innerHTML;
+    }
+
+    function emailsHtml(emails) {
+        let html = '<strong>' + emails.sent + '</strong> of ' + emails.queued + ' QR emails sent' +
+            (emails.status === 'done' ? '' : '…');
+        if (emails.failed.length) {
+            html += ', <strong>' + emails.failed.length + '</strong> failed:' +
+                '<div class="small text-danger" style="max-height:120px;overflow:auto;">' +
+                emails.failed.map(escapeHtml).join('<br>') + '</div>';
+        }
+        return html;
+    }
+
+    /* Follow the emails sent after the response until they are done or the dialog closes */
+    function pollEmails(id) {
+        setTimeout(function () {
+            const el = document.getElementById('importEmails');
+            if (!el) return;
+            fetch('/admin/imports/emails/' + id)
+                .then(r => r.ok ? r.json() : Promise.reject())
+                .then(function (emails) {
+                    el.innerHTML = emailsHtml(emails);
+                    if (emails.status !== 'done') pollEmails(id);
+                })
+                .catch(function () {});  // another worker took the request, or it expired
+        }, 2000);
+    }
+
+    function reportHtml(report) {
+        let html = '<ul class="list-unstyled mb-2">' +
+            '<li><strong>' + report.registered + '</strong> registered' +
+            (report.users_created ? ' (' + report.users_created + ' new users)' : '') + '</li>' +
+            '<li><strong>' + report.already_registered + '</strong> already registered</li>' +
+            '<li><strong>' + report.errors.length + '</strong> of ' + report.rows + ' rows failed</li>' +
+            (report.emails ? '<li id="importEmails">' + emailsHtml(report.emails) + '</li>' : '') +
+            '</ul>';
+        if (report.errors.length) {
+            html += '<div style="max-height:240px;overflow:auto;"><table class="table table-sm small mb-0">' +
+                '<thead><tr><th>Line</th><th>Email</th><th>Error</th></tr></thead><tbody>';
+            report.errors.forEach(function (e) {
+                html += '<tr><td>' + e.line + '</td><td>' + escapeHtml(e.email) + '</td><td>' +
+                    escapeHtml(e.error) + '</td></tr>';
+            });
+            html += '</tbody></table></div>';
+        }
+        return html;
+    }
+
+    function upload(eventId, file, sendEmails) {
+        const body = new FormData();
+        body.append('file', file);
+        body.append('send_emails', sendEmails ? 'true' : 'false');
+
+        Swal.fire({
+            title: 'Importing attendees…',
+            allowOutsideClick: false,
+            showConfirmButton: false,
+            didOpen: function () { Swal.showLoading(); },
+            customClass: { popup: 'rounded-4' }
+        });
+
+        fetch('/admin/events/' + eventId + '/import', { method: 'POST', body: body })
+            .then(r => r.json().then(data => r.ok ? data : Promise.reject(data.detail)))
+            .then(function (report) {
+                Swal.fire({
+                    icon: report.errors.length ? 'warning' : 'success',
+                    title: 'Import finished',
+                    html: reportHtml(report),
+                    width: '640px',
+                    customClass: { popup: 'rounded-4', htmlContainer: 'text-start' }
+                }).then(function () { window.location.reload(); });
+                if (report.emails) pollEmails(report.emails.id);
+            })
+            .catch(function (detail) {
+                Swal.fire({ icon: 'error', title: 'Import failed', text: detail || 'Please try again.' });
+            });
+    }
+
+    document.querySelectorAll('.btn-import').forEach(function (btn) {
+        btn.addEventListener('click', function () {
+            Swal.fire({
+                title: 'Import Attendees',
+                html: '<p class="small text-muted mb-2">Register everyone in a CSV for <strong>' +
+                      escapeHtml(btn.dataset.eventTitle) + '</strong>. Columns: <code>email</code> (required), ' +
+                      '<code>name</code>, <code>participant_type</code>, <code>student_id</code>, ' +
+                      '<code>university</code>, <code>study_year</code>, <code>organization</code>, ' +
+                      '<code>job_role</code>.</p>' +
+                      '<input type="file" id="swalImportFile" class="form-control mb-2" accept=".csv,text/csv">' +
+                      '<div class="form-check"><input type="checkbox" id="swalImportEmails" class="form-check-input" checked>' +
+                      '<label class="form-check-label" for="swalImportEmails">Email each new registration its QR code</label></div>',
+                showCancelButton: true,
+                confirmButtonText: '<i class="bi bi-upload me-1"></i>Import',
+                confirmButtonColor: '#a855f7',
+                cancelButtonColor: '#64748b',
+                reverseButtons: true,
+                customClass: { popup: 'rounded-4', htmlContainer: 'text-start' },
+                preConfirm: function () {
+                    const file = document.getElementById('swalImportFile').files[0];
+                    if (!file) {
+                        Swal.showValidationMessage('Choose a CSV file');
+                        return false;
+                    }
+                    return { file: file, sendEmails: document.getElementById('swalImportEmails').checked };
+                }
+            }).then(function (result) {
+                if (result.isConfirmed) upload(btn.dataset.eventId, result.value.file, result.value.sendEmails);
+            });
+        });
+    });
+})();
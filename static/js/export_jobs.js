@@ -0,0 +1,65 @@
+(function () {
+    /* ── Background export jobs: queue, poll progress, download ── */
+    const labels = { pdf: 'PDF report', csv: 'CSV export', badges: 'Name badges' };
+
+    function progressText(job) {
+        if (job.status === 'queued') return 'Waiting for a free export worker…';
+        if (!job.total) return job.progress + ' rows processed';
+        const pct = Math.min(100, Math.round(job.progress / job.total * 100));
+        return job.progress + ' of ' + job.total + ' rows (' + pct + '%)';
+    }
+
+    function poll(jobId) {
+        fetch('/admin/exports/' + jobId)
+            .then(r => r.ok ? r.json() : Promise.reject(r.status))
+            .then(function (job) {
+                if (job.status === 'done') {
+                    Swal.fire({
+                        icon: 'success',
+                        title: 'Export ready',
+                        html: '<a class="btn btn-primary" href="' + job.download_url + '">' +
+                              '<i class="bi bi-download me-1"></i>Download ' + job.filename + '</a>',
+                        showConfirmButton: false,
+                        showCloseButton: true,
+                        customClass: { popup: 'rounded-4' }
+                    });
+                } else if (job.status === 'failed') {
+                    Swal.fire({ icon: 'error', title: 'Export failed', text: job.error || 'Unknown error' });
+                } else {
+                    const el = document.getElementById('exportJobProgress');
+                    if (el) el.textContent = progressText(job);
+                    setTimeout(function () { poll(jobId); }, 1500);
+                }
+            })
+            .catch(function () {
+                Swal.fire({ icon: 'error', title: 'Export lost', text: 'The export job could not be found.' });
+            });
+    }
+
+    function submit(btn) {
+        const body = new FormData();
+        body.append('kind', btn.dataset.kind);
+        body.append('event_id', btn.dataset.eventId || '');
+
+        fetch('/admin/exports', { method: 'POST', body: body })
+            .then(r => r.json().then(data => r.ok ? data : Promise.reject(data.detail)))
+            .then(function (job) {
+                Swal.fire({
+                    title: 'Preparing ' + (labels[job.kind] || 'export'),
+                    html: '<span id="exportJobProgress" class="text-muted small">' + progressText(job) + '</span>',
+                    allowOutsideClick: false,
+                    showConfirmButton: false,
+                    didOpen: function () { Swal.showLoading(); },
+                    customClass: { popup: 'rounded-4' }
+                });
+                poll(job.id);
+            })
+            .catch(function (detail) {
+                Swal.fire({ icon: 'error', title: 'Could not start export', text: detail || 'Please try again.' });
+            });
+    }
+
+    document.querySelectorAll('.btn-export-job').forEach(function (btn) {
+        btn.addEventListener('click', function (e) { e.preventDefault(); submit(btn); });
+    });
+})();
@@ -12,5 +12,41 @@
             timer: 4500,
             timerProgressBar: true,
         });
+    } else if (p.has('already_registered')) {
+        window.history.replaceState({}, '', window.location.pathname);
+        Swal.fire({
+            toast: true,
+            position: 'top-end',
+            icon: 'info',
+            title: 'Already registered',
+            text: 'You are already registered for this event. Your QR code is below.',
+            showConfirmButton: false,
+            timer: 4500,
+            timerProgressBar: true,
+        });
+    } else if (p.has('waitlisted')) {
+        window.history.replaceState({}, '', window.location.pathname);
+        Swal.fire({
+            toast: true,
+            position: 'top-end',
+            icon: 'info',
+            title: 'Event is full',
+            text: 'You are #' + p.get('waitlisted') + ' on the waitlist. We will register you if a seat opens up.',
+            showConfirmButton: false,
+            timer: 6000,
+            timerProgressBar: true,
+        });
+    } else if (p.has('left_waitlist')) {
+        window.history.replaceState({}, '', window.location.pathname);
+        Swal.fire({
+            toast: true,
+            position: 'top-end',
+            icon: 'success',
+            title: 'Left the waitlist',
+            text: 'You are no longer waiting for a seat at this event.',
+            showConfirmButton: false,
+            timer: 4500,
+            timerProgressBar: true,
+        });
     }
 })();
@@ -170,6 +170,8 @@
                 } else {
                     showMessage('<div class="display-3 text-danger mb-3"><i class="bi bi-x-circle-fill"></i></div><h4 class="fw-bold">Invalid QR</h4><p class="text-muted">This code is not recognized.</p>', true);
                 }
+            } else if (res.status === 503) {
+                showMessage('<div class="alert alert-warning">Database unavailable. Scan again in a moment.</div>', true);
             } else {
                 showMessage('<div class="alert alert-warning">Verify API error: ' + res.status + '</div>', true);
             }
@@ -0,0 +1,34 @@
+import os
+
+# config.supabase refuses to import without credentials; the tests never reach Supabase
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_SECRET", "test-service-role")
+os.environ.setdefault("SUPABASE_ANON_PUBLIC", "test-anon")
+
+import pytest
+
+from config.supabase import supabase_admin
+from fakedb import FakeDB
+from repository.guard import _breakers
+from services.cache import get_caches
+from services.capacity import forget_seats
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state():
+    """Empty caches, seat counters and closed breakers for every test."""
+    for c in get_caches().values():
+        c.drop()
+    forget_seats()
+    for b in _breakers.values():
+        b.__init__(b.name)
+    yield
+
+
+@pytest.fixture
+def db(monkeypatch) -> FakeDB:
+    """Point the repository layer at an in-memory database."""
+    fake = FakeDB()
+    monkeypatch.setattr(supabase_admin, "client", object())
+    monkeypatch.setattr(supabase_admin, "table", fake.table)
+    return fake
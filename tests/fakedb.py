@@ -0,0 +1,267 @@
+"""
+In-memory stand-in for the slice of the PostgREST query builder the
+repository layer uses, so services can be tested without a Supabase project.
+
+Tables are lists of dicts. UNIQUE holds the unique keys the README asks for;
+an insert that breaks one raises APIError 23505, or is skipped by
+upsert(ignore_duplicates=True), as PostgREST does. GENERATED columns are
+recomputed before every query. Embedded selects such as
+"user:users(name, email)" follow the foreign keys in FKS; "table.col"
+filters apply to the embedded rows, and "!inner" drops rows with none.
+"""
+import asyncio
+import datetime
+import re
+import uuid
+from collections.abc import Callable
+from types import SimpleNamespace
+
+from postgrest.exceptions import APIError
+
+UNIQUE: dict[str, tuple[str, ...]] = {
+    "registrations": ("user_qr_code", "event_id"),
+    "waitlist": ("event_id", "user_qr_code"),
+    "users": ("email_lower",),
+}
+GENERATED: dict[str, dict[str, Callable[[dict], object]]] = {
+    "users": {"email_lower": lambda r: r["email"].lower() if r.get("email") else None},
+}
+# (from table, embedded table) -> (local column, remote column, to many)
+FKS: dict[tuple[str, str], tuple[str, str, bool]] = {
+    ("registrations", "users"): ("user_qr_code", "qr_code_data", False),
+    ("registrations", "events"): ("event_id", "id", False),
+    ("users", "registrations"): ("qr_code_data", "user_qr_code", True),
+    ("waitlist", "events"): ("event_id", "id", False),
+    ("waitlist", "users"): ("user_qr_code", "qr_code_data", False),
+}
+MAX_ROWS: int = 1000  # PostgREST's max-rows
+_DEFAULT_TIMESTAMPS: tuple[str, ...] = ("registered_at", "joined_at", "created_at")
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value)
+
+
+def _split_top(s: str) -> list[str]:
+    """Split on commas outside parentheses and quotes."""
+    out, depth, cur, quoted = [], 0, "", False
+    for ch in s:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            out.append(cur)
+            cur = ""
+        else:
+            cur += ch
+    out.append(cur)
+    return out
+
+
+def _match(col: str, op: str, val):
+    if op == "eq":
+        return lambda r: _text(r.get(col)) == _text(val)
+    if op == "neq":
+        return lambda r: _text(r.get(col)) != _text(val)
+    if op in ("gt", "gte", "lt", "lte"):
+        compare = {"gt": str.__gt__, "gte": str.__ge__, "lt": str.__lt__, "lte": str.__le__}[op]
+        return lambda r: r.get(col) is not None and compare(_text(r.get(col)), _text(val))
+    if op in ("like", "ilike"):
+        pattern = re.escape(val).replace("%", ".*")
+        flags = re.I if op == "ilike" else 0
+        return lambda r: re.fullmatch(pattern, _text(r.get(col)), flags) is not None
+    raise ValueError(f"unsupported operator {op}")
+
+
+def _condition(expr: str):
+    """One term of an or_() filter: col.op.value, or a nested and(...)/or(...)."""
+    expr = expr.strip()
+    if expr.startswith(("and(", "or(")):
+        combine = all if expr.startswith("and(") else any
+        parts = [_condition(p) for p in _split_top(expr[expr.index("(") + 1:-1])]
+        return lambda r: combine(p(r) for p in parts)
+    col, op, val = expr.split(".", 2)
+    return _match(col, op, val[1:-1] if val.startswith('"') else val)
+
+
+class Query:
+    def __init__(self, db: "FakeDB", table: str):
+        self.db, self.table = db, table
+        self.filters, self.orders = [], []
+        self.embed_filters: dict[str, list] = {}  # embedded table or alias -> filters on its rows
+        self.mode, self.payload, self.ignore_duplicates = "select", None, False
+        self.columns, self.count = "*", None
+        self._limit = self._range = None
+        self._single = self._negate = False
+
+    def select(self, columns: str = "*", count=None):
+        self.columns, self.count = columns, count
+        return self
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def _where(self, col: str, predicate_on: Callable):
+        """Filter on `col`; "table.col" filters the rows embedded from that table instead."""
+        embedded, _, col = col.rpartition(".")
+        predicate = predicate_on(col)
+        negate, self._negate = self._negate, False
+        if negate:
+            predicate = (lambda p: lambda r: not p(r))(predicate)
+        (self.embed_filters.setdefault(embedded, []) if embedded else self.filters).append(predicate)
+        return self
+
+    def eq(self, col, val): return self._where(col, lambda c: _match(c, "eq", val))
+    def neq(self, col, val): return self._where(col, lambda c: _match(c, "neq", val))
+    def gt(self, col, val): return self._where(col, lambda c: _match(c, "gt", val))
+    def gte(self, col, val): return self._where(col, lambda c: _match(c, "gte", val))
+    def lt(self, col, val): return self._where(col, lambda c: _match(c, "lt", val))
+    def lte(self, col, val): return self._where(col, lambda c: _match(c, "lte", val))
+    def like(self, col, val): return self._where(col, lambda c: _match(c, "like", val))
+    def ilike(self, col, val): return self._where(col, lambda c: _match(c, "ilike", val))
+
+    def is_(self, col, val):
+        return self._where(col, lambda c: lambda r: r.get(c) is None)
+
+    def in_(self, col, values):
+        values = {_text(v) for v in values}
+        return self._where(col, lambda c: lambda r: _text(r.get(c)) in values)
+
+    def or_(self, expr):
+        parts = [_condition(p) for p in _split_top(expr)]
+        return self._where("", lambda _: lambda r: any(p(r) for p in parts))
+
+    def order(self, col, desc=False):
+        self.orders.append((col, desc))
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def insert(self, payload, **_):
+        self.mode, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, ignore_duplicates=False, **_):
+        self.mode, self.payload, self.ignore_duplicates = "insert", payload, ignore_duplicates
+        return self
+
+    def update(self, payload):
+        self.mode, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.mode = "delete"
+        return self
+
+    def _embeds(self) -> list[tuple[str, str, bool, list[str]]]:
+        """(name, table, inner, columns) of each embedded select such as "user:users!inner(name)"."""
+        embeds = []
+        for col in map(str.strip, _split_top(self.columns)):
+            if "(" in col:
+                head, inner = col[:-1].split("(", 1)
+                alias, _, table = head.rpartition(":")
+                table, _, hint = table.partition("!")
+                embeds.append((alias or table, table, hint == "inner", [c.strip() for c in inner.split(",")]))
+        return embeds
+
+    def _related(self, row: dict, name: str, table: str) -> list[dict]:
+        local, remote, _ = FKS[(self.table, table)]
+        filters = self.embed_filters.get(name, [])
+        return [r for r in self.db.tables[table]
+                if _text(r.get(remote)) == _text(row.get(local)) and all(f(r) for f in filters)]
+
+    def _project(self, row: dict) -> dict:
+        if self.columns.strip() == "*":
+            return dict(row)
+        out = {col: row.get(col) for col in map(str.strip, _split_top(self.columns)) if "(" not in col}
+        for name, table, _, columns in self._embeds():
+            related = [{c: r.get(c) for c in columns} for r in self._related(row, name, table)]
+            out[name] = related if FKS[(self.table, table)][2] else (related[0] if related else None)
+        return out
+
+    def _insert(self) -> list[dict]:
+        rows = self.db.tables[self.table]
+        key = UNIQUE.get(self.table)
+        taken = {tuple(_text(r.get(c)) for c in key) for r in rows} if key else set()
+        inserted = []
+        for new in (self.payload if isinstance(self.payload, list) else [self.payload]):
+            new = dict(new)
+            new.setdefault("id", str(uuid.uuid4()))
+            new.update((col, f(new)) for col, f in GENERATED.get(self.table, {}).items())
+            for col in _DEFAULT_TIMESTAMPS:
+                new.setdefault(col, datetime.datetime.now(datetime.timezone.utc).isoformat())
+            if key:
+                values = tuple(_text(new.get(c)) for c in key)
+                if values in taken:
+                    if self.ignore_duplicates:
+                        continue
+                    raise APIError({"code": "23505", "message": "duplicate key value violates unique constraint"})
+                taken.add(values)
+            rows.append(new)
+            inserted.append(dict(new))
+        return inserted
+
+    async def execute(self):
+        await asyncio.sleep(0)
+        self.db.calls.append((self.table, self.mode))
+        if self.table in self.db.failing:
+            raise self.db.failing[self.table]
+        for row in self.db.tables[self.table]:
+            row.update((col, f(row)) for col, f in GENERATED.get(self.table, {}).items())
+        if self.mode == "insert":
+            return SimpleNamespace(data=self._insert(), count=None)
+
+        rows = self.db.tables[self.table]
+        hit = [r for r in rows if all(f(r) for f in self.filters)]
+        if self.mode == "update":
+            for r in hit:
+                r.update(self.payload)
+            return SimpleNamespace(data=[dict(r) for r in hit], count=None)
+        if self.mode == "delete":
+            self.db.tables[self.table] = [r for r in rows if r not in hit]
+            return SimpleNamespace(data=hit, count=None)
+
+        for name, table, inner, _ in self._embeds():
+            if inner:
+                hit = [r for r in hit if self._related(r, name, table)]
+        for col, desc in reversed(self.orders):
+            hit.sort(key=lambda r: (r.get(col) is None, _text(r.get(col))), reverse=desc)
+        total = len(hit)
+        if self._range:
+            hit = hit[self._range[0]:self._range[1] + 1]
+        if self._limit is not None:
+            hit = hit[:self._limit]
+        data = [self._project(r) for r in hit[:MAX_ROWS]]
+        if self._single:
+            if len(data) != 1:
+                raise APIError({"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned"})
+            data = data[0]
+        return SimpleNamespace(data=data, count=total if self.count else None)
+
+
+class FakeDB:
+    def __init__(self):
+        self.tables: dict[str, list[dict]] = {"users": [], "registrations": [], "events": [], "waitlist": []}
+        self.calls: list[tuple[str, str]] = []  # (table, mode) of every executed query
+        self.failing: dict[str, Exception] = {}  # table -> error raised by its queries
+
+    def table(self, name: str) -> Query:
+        return Query(self, name)
+
+    def calls_to(self, table: str, mode: str = "select") -> int:
+        return self.calls.count((table, mode))
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.v1.auth import get_current_user
+from main import app
+
+
+@pytest.fixture
+def client(db):
+    db.tables["users"] = [
+        {"id": f"{i:03d}", "github_id": str(i), "qr_code_data": f"qr-{i}", "name": f"User {i:03d}",
+         "email": f"user{i}@example.org", "role": "participant", "created_at": "2026-03-01T09:00:00+00:00",
+         "avatar_url": None, "participant_type": "industry" if i % 2 else None, "organization": "WSO2" if i % 2 else None}
+        for i in range(40)
+    ]
+    db.tables["users"][0].update(role="admin", email="admin@example.org")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(role="admin", email="admin@example.org")
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_fragment_sends_rows_as_compact_data(client):
+    data = client.get("/admin/users/fragment", params={"page": 1}).json()
+    assert data["total"] == 40 and data["pages"] == 3
+    assert len(data["users"]) == 15
+    assert "<tr" not in str(data["users"])
+
+    me, affiliated, plain = data["users"][:3]
+    assert me == {"github_id": "0", "name": "User 000", "email": "admin@example.org", "role": "admin",
+                  "joined": "2026-03-01", "self": True}
+    assert "participant_type" not in plain and "avatar_url" not in plain
+    assert affiliated["participant_type"] == "industry" and affiliated["organization"] == "WSO2"
+    assert 'href="?' in data["pagination"]
+
+
+def test_fragment_with_no_matches(client):
+    data = client.get("/admin/users/fragment", params={"search": "nobody"}).json()
+    assert data["users"] == [] and data["search"] == "nobody" and data["total"] == 0
+
+
+def test_fragment_is_admin_only(client):
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(role="participant", email="p@example.org")
+    assert client.get("/admin/users/fragment").status_code == 403
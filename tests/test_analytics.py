@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from postgrest.exceptions import APIError
+
+from services import analytics
+from services.analytics import get_event_analytics, invalidate_event_analytics
+
+T1, T2, T3 = "2026-03-01T09:00:00+00:00", "2026-03-01T09:05:00+00:00", "2026-03-01T09:10:00+00:00"
+
+
+@pytest.fixture(autouse=True)
+def _every_request_refreshes(monkeypatch):
+    monkeypatch.setattr(analytics, "_REFRESH_INTERVAL", 0)
+    invalidate_event_analytics()
+
+
+def _register(db, qr: str, registered_at: str, participant_type: str = "industry") -> dict:
+    db.tables["users"].append({"qr_code_data": qr, "participant_type": participant_type})
+    reg = {"id": f"reg-{qr}", "user_qr_code": qr, "event_id": "e1", "registered_at": registered_at, "attended_at": None}
+    db.tables["registrations"].append(reg)
+    return reg
+
+
+def test_registration_sharing_the_watermark_timestamp_is_counted(db):
+    async def main():
+        _register(db, "a", T1)
+        assert (await get_event_analytics("e1"))["total_registered"] == 1
+        _register(db, "b", T1)
+        summary = await get_event_analytics("e1")
+        assert summary["total_registered"] == 2
+        assert summary["affiliation"]["industry"]["registered"] == 2
+
+    asyncio.run(main())
+
+
+def test_check_in_earlier_than_the_latest_registration_is_counted(db):
+    async def main():
+        a = _register(db, "a", T1)
+        _register(db, "b", T3)
+        await get_event_analytics("e1")
+        a["attended_at"] = T2
+        summary = await get_event_analytics("e1")
+        assert summary["total_attended"] == 1
+        assert summary["as_of"] == T3
+
+    asyncio.run(main())
+
+
+def test_failed_user_lookup_is_retried_not_labelled_unknown(db):
+    async def main():
+        _register(db, "a", T1)
+        await get_event_analytics("e1")
+        _register(db, "b", T2, "uok_student")
+        db.failing["users"] = APIError({"code": "42501", "message": "permission denied"})
+        assert (await get_event_analytics("e1"))["total_registered"] == 1  # last good snapshot
+        del db.failing["users"]
+        summary = await get_event_analytics("e1")
+        assert summary["total_registered"] == 2
+        assert summary["affiliation"]["uok_student"]["registered"] == 1
+        assert summary["affiliation"]["unknown"]["registered"] == 0
+
+    asyncio.run(main())
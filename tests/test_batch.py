@@ -0,0 +1,95 @@
+import asyncio
+
+import httpx
+import pytest
+
+from repository import batch
+from repository.batch import BatchLoader
+
+IDS = [f"00000000-0000-4000-8000-{i:012x}" for i in range(5)]
+
+
+def _loader(rows: list[dict], **kwargs) -> tuple[BatchLoader, list[list]]:
+    fetched = []
+
+    async def fetch(keys: list) -> list[dict]:
+        fetched.append(keys)
+        return [r for r in rows if r["id"] in keys]
+
+    return BatchLoader(fetch, "id", **kwargs), fetched
+
+
+def test_concurrent_loads_share_one_fetch():
+    rows = [{"id": i, "n": n} for n, i in enumerate(IDS[:3])]
+    loader, fetched = _loader(rows)
+
+    async def main():
+        return await asyncio.gather(*(loader.load(i) for i in (IDS[0], IDS[1], IDS[0], IDS[2], IDS[4])))
+
+    assert asyncio.run(main()) == [rows[0], rows[1], rows[0], rows[2], None]
+    assert fetched == [[IDS[0], IDS[1], IDS[2], IDS[4]]]
+    assert (loader.batches, loader.keys) == (1, 4)
+
+
+def test_keys_match_case_insensitively():
+    row = {"id": "0000000a-000b-400c-800d-00000000000e"}
+
+    async def fetch(keys: list) -> list[dict]:
+        return [row]  # Postgres returns the uuid in its own (lower) case
+
+    loader = BatchLoader(fetch, "id")
+    assert asyncio.run(loader.load(row["id"].upper())) == row
+
+
+def test_large_batches_are_split(monkeypatch):
+    monkeypatch.setattr(batch, "MAX_BATCH", 2)
+    loader, fetched = _loader([{"id": i} for i in IDS])
+
+    async def main():
+        return await asyncio.gather(*(loader.load(i) for i in IDS))
+
+    assert asyncio.run(main()) == [{"id": i} for i in IDS]
+    assert fetched == [IDS[0:2], IDS[2:4], IDS[4:]]
+
+
+def test_invalid_keys_resolve_to_none_without_a_query():
+    loader, fetched = _loader([{"id": IDS[0]}])
+
+    async def main():
+        return await asyncio.gather(loader.load("not-a-uuid"), loader.load(None), loader.load(IDS[0]))
+
+    assert asyncio.run(main()) == [None, None, {"id": IDS[0]}]
+    assert fetched == [[IDS[0]]]
+
+    numeric, fetched = _loader([{"id": 7}], valid=lambda k: isinstance(k, int))
+    assert asyncio.run(numeric.load(7)) == {"id": 7}
+    assert asyncio.run(numeric.load(IDS[0])) is None and fetched == [[7]]
+
+
+def test_a_failed_fetch_raises_in_every_caller_of_the_batch():
+    async def fetch(keys: list) -> list[dict]:
+        raise httpx.ConnectError("connection refused")
+
+    loader = BatchLoader(fetch, "id")
+
+    async def main():
+        return await asyncio.gather(*(loader.load(i) for i in IDS[:3]), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, httpx.ConnectError) for r in results)
+    assert len({id(r) for r in results}) == 1 and loader.batches == 1
+
+
+def test_a_cancelled_caller_leaves_the_others_their_row():
+    loader, _ = _loader([{"id": IDS[0]}])
+
+    async def main():
+        first = asyncio.create_task(loader.load(IDS[0]))
+        second = asyncio.create_task(loader.load(IDS[0]))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == {"id": IDS[0]}
@@ -0,0 +1,131 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from api.v1.auth import get_current_user
+from main import app
+from repository.user_repo import claim_imported_user
+from services import bulk_import, export, mail
+from services.bulk_import import import_attendees
+from services.capacity import seats_for
+
+EVENT = "00000000-0000-4000-8000-0000000000e1"
+
+
+@pytest.fixture
+def event(db):
+    db.tables["events"] = [{"id": EVENT, "title": "Conf", "is_active": True, "capacity": None, "waitlist": False}]
+    db.tables["users"] = [
+        {"qr_code_data": "qr-ada", "github_id": "1", "name": "Ada", "email": "Ada.Lovelace@Example.org"},
+    ]
+    return db.tables["events"][0]
+
+
+def _csv(*emails: str) -> bytes:
+    return ("email,name\n" + "".join(f"{e},{e.split('@')[0]}\n" for e in emails)).encode()
+
+
+def test_emails_match_existing_users_in_any_case(db, event):
+    report, registrations = asyncio.run(import_attendees(EVENT, _csv("ada.lovelace@example.org", "Grace@Example.org")))
+
+    assert report["users_created"] == 1 and report["registered"] == 2 and report["errors"] == []
+    assert [u["email"] for u in db.tables["users"]] == ["Ada.Lovelace@Example.org", "grace@example.org"]
+    assert {r["user_qr_code"] for r in db.tables["registrations"]} == {"qr-ada", db.tables["users"][1]["qr_code_data"]}
+    assert registrations[0]["email"] == "Ada.Lovelace@Example.org"
+
+    report, _ = asyncio.run(import_attendees(EVENT, _csv("GRACE@example.org")))
+    assert report["users_created"] == 0 and report["already_registered"] == 1
+
+
+def test_first_login_claims_an_imported_user_in_any_case(db, event):
+    asyncio.run(import_attendees(EVENT, _csv("grace@example.org")))
+    claimed = asyncio.run(claim_imported_user("Grace@Example.org", "42", {"name": "Grace Hopper"}))
+    assert claimed["github_id"] == "42" and claimed["name"] == "Grace Hopper"
+    assert len(db.tables["users"]) == 2
+
+
+def _full(report) -> list[str]:
+    return [e["email"] for e in report["errors"] if e["error"] == "The event is full."]
+
+
+def test_capped_import_admits_through_the_seat_counter(db, event):
+    event["capacity"] = 3
+    db.tables["registrations"] = [{"id": "r0", "user_qr_code": "qr-ada", "event_id": EVENT}]
+
+    report, _ = asyncio.run(import_attendees(EVENT, _csv(*(f"u{i}@example.org" for i in range(4)))))
+    assert report["registered"] == 2 and _full(report) == ["u2@example.org", "u3@example.org"]
+    seats = asyncio.run(seats_for(event))
+    assert (seats.taken, seats.inflight, seats.remaining) == (3, 0, 0)
+
+
+def test_capped_import_backs_out_seats_sold_by_another_worker(db, event):
+    event["capacity"] = 3
+    db.tables["registrations"] = [{"id": "r0", "user_qr_code": "qr-ada", "event_id": EVENT}]
+
+    async def main():
+        await seats_for(event)  # counted: 1 taken
+        # Two more registered through another worker since that count
+        db.tables["registrations"] += [{"id": f"x{i}", "user_qr_code": f"qr-x{i}", "event_id": EVENT} for i in range(2)]
+        return await import_attendees(EVENT, _csv("u0@example.org", "u1@example.org", "u2@example.org"))
+
+    report, registrations = asyncio.run(main())
+    assert registrations == [] and _full(report) == ["u0@example.org", "u1@example.org", "u2@example.org"]
+    assert len(db.tables["registrations"]) == 3
+
+
+@pytest.fixture
+def mailjet(monkeypatch):
+    """Mailjet credentials, no retry delay, and QR rendering on threads instead of worker processes."""
+    for module in (mail, bulk_import):
+        monkeypatch.setattr(module, "MAILJET_API_KEY", "key")
+        monkeypatch.setattr(module, "MAILJET_API_SECRET", "secret")
+    monkeypatch.setattr(mail, "MAILJET_RETRY_DELAY", 0)
+    monkeypatch.setattr(export, "_executor", ThreadPoolExecutor(max_workers=2))
+    yield
+    export.shutdown_export_pool()
+
+
+def test_import_emails_wait_out_a_full_export_queue_and_report_failures(monkeypatch, mailjet):
+    monkeypatch.setattr(export, "_waiting", export.EXPORT_QUEUE_SIZE)  # exports are being turned away
+    posts = []
+
+    def mailjet_api(request: httpx.Request) -> httpx.Response:
+        posts.append(request)
+        if len(posts) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"Messages": [{"Status": "success"}, {"Status": "error"}, {"Status": "success"}]})
+
+    registrations = [{"id": f"r{i}", "user_qr_code": f"qr-{i}", "name": f"User {i}", "email": f"user{i}@example.org"}
+                     for i in range(3)]
+    emails = bulk_import.track_import_emails(len(registrations))
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(mailjet_api)) as client:
+            await bulk_import.send_import_emails(EVENT, "Conf", registrations, client, emails)
+
+    asyncio.run(main())
+    assert len(posts) == 2  # the 503 was retried
+    assert bulk_import.get_import_emails(emails.id).to_dict() == {
+        "id": emails.id, "status": "done", "queued": 3, "sent": 2, "failed": ["user1@example.org"]}
+
+
+def test_import_report_links_to_the_email_outcome(db, event, monkeypatch):
+    monkeypatch.setattr(bulk_import, "MAILJET_API_KEY", None)  # nothing can be sent
+    monkeypatch.setattr(app.state, "http_client", None, raising=False)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(role="admin", email="admin@example.org")
+    try:
+        client = TestClient(app)
+        report = client.post(f"/admin/events/{EVENT}/import",
+                             files={"file": ("a.csv", _csv("grace@example.org"), "text/csv")}).json()
+        status = client.get(f"/admin/imports/emails/{report['emails']['id']}").json()
+        missing = client.get("/admin/imports/emails/nope")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert report["emails_queued"] == 1 and report["emails"]["status"] == "sending"
+    assert status["status"] == "done" and status["sent"] == 0 and status["failed"] == ["grace@example.org"]
+    assert missing.status_code == 404
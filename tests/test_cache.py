@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from services.cache import Cache
+
+
+class Loader:
+    """Counts calls and holds each one until released."""
+
+    def __init__(self, value="loaded", error: Exception | None = None):
+        self.value, self.error = value, error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def test_concurrent_misses_share_one_load():
+    async def main():
+        c = Cache("t", maxsize=4, ttl=60)
+        load = Loader()
+        waiters = [asyncio.create_task(c.get_or_load("k", load)) for _ in range(500)]
+        await asyncio.sleep(0)
+        load.release.set()
+        assert await asyncio.gather(*waiters) == ["loaded"] * 500
+        assert load.calls == 1
+        assert (c.misses, c.loads, c["k"]) == (500, 1, "loaded")
+        assert await c.get_or_load("k", load) == "loaded" and c.hits == 1
+
+    asyncio.run(main())
+
+
+def test_load_error_reaches_every_waiter():
+    async def main():
+        c = Cache("t", maxsize=4, ttl=60)
+        load = Loader(error=RuntimeError("db down"))
+        waiters = [asyncio.create_task(c.get_or_load("k", load)) for _ in range(50)]
+        await asyncio.sleep(0)
+        load.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) and str(r) == "db down" for r in results)
+        assert load.calls == 1 and c.load_errors == 1
+        assert "k" not in c and not c._inflight  # the next call retries
+
+        # With a default, the waiters get it instead
+        load = Loader(error=RuntimeError("db down"))
+        waiters = [asyncio.create_task(c.get_or_load("k", load, default=[])) for _ in range(50)]
+        await asyncio.sleep(0)
+        load.release.set()
+        assert await asyncio.gather(*waiters) == [[]] * 50
+        assert load.calls == 1 and c.fallbacks == 50
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("key", ["k", None])
+def test_drop_during_a_load_keeps_its_result_out_of_the_cache(key):
+    async def main():
+        c = Cache("t", maxsize=4, ttl=60)
+        stale = Loader("stale")
+        waiter = asyncio.create_task(c.get_or_load("k", stale))
+        await asyncio.sleep(0)
+        c.drop(key)
+
+        # A caller after the drop does not join the superseded load
+        fresh = Loader("fresh")
+        late = asyncio.create_task(c.get_or_load("k", fresh))
+        await asyncio.sleep(0)
+        stale.release.set()
+        assert await waiter == "stale"  # its own caller still gets an answer
+        assert "k" not in c
+        fresh.release.set()
+        assert await late == "fresh"
+        assert c["k"] == "fresh" and (stale.calls, fresh.calls) == (1, 1)
+
+    asyncio.run(main())
+
+
+def test_dropping_one_key_keeps_loads_of_the_others():
+    async def main():
+        c = Cache("t", maxsize=4, ttl=60)
+        load = Loader("a")
+        waiter = asyncio.create_task(c.get_or_load("a", load))
+        await asyncio.sleep(0)
+        c.drop("b")
+        load.release.set()
+        assert await waiter == "a" and c["a"] == "a"
+
+    asyncio.run(main())
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_load():
+    async def main():
+        c = Cache("t", maxsize=4, ttl=60)
+        load = Loader()
+        first = asyncio.create_task(c.get_or_load("k", load))
+        second = asyncio.create_task(c.get_or_load("k", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        load.release.set()
+        assert await second == "loaded" and c["k"] == "loaded"
+
+    asyncio.run(main())
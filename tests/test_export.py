@@ -0,0 +1,110 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from api.v1 import admin as admin_routes
+from api.v1.auth import get_current_user
+from main import app
+from schema.rows import RegistrationRow
+from services import admin, export, export_jobs
+from services.export import etag_matches, export_etag
+from services.registration import qr_payload
+
+
+def _seed(db) -> dict:
+    db.tables["events"].append({"id": "e1", "title": "Meetup", "is_active": True})
+    user = {"qr_code_data": "q1", "name": "Ada", "email": "ada@example.org", "role": "participant",
+            "updated_at": "2026-03-01T09:00:00+00:00"}
+    db.tables["users"].append(user)
+    db.tables["registrations"].append({"id": "r1", "user_qr_code": "q1", "event_id": "e1",
+                                       "registered_at": "2026-03-01T09:00:00+00:00", "attended_at": None})
+    return user
+
+
+def test_event_etag_changes_when_a_participant_is_edited(db):
+    user = _seed(db)
+    before = asyncio.run(export_etag("csv", "e1"))
+    assert before and asyncio.run(export_etag("csv", "e1")) == before
+
+    user.update(name="Ada Lovelace", updated_at="2026-03-01T10:00:00+00:00")
+    after = asyncio.run(export_etag("csv", "e1"))
+    assert after != before
+    assert not etag_matches(before, after)
+
+
+def test_event_etag_changes_on_check_in(db):
+    _seed(db)
+    before = asyncio.run(export_etag("pdf", "e1"))
+    db.tables["registrations"][0]["attended_at"] = "2026-03-01T10:00:00+00:00"
+    assert asyncio.run(export_etag("pdf", "e1")) != before
+
+
+def test_badge_qr_encodes_the_registration_payload(monkeypatch):
+    encoded = []
+    real_make = admin.qrcode.make
+    monkeypatch.setattr(admin.qrcode, "make", lambda data: encoded.append(data) or real_make(data))
+    badge = RegistrationRow.from_record({"id": "r1", "user_qr_code": "q1", "event_id": "e1",
+                                         "user": {"name": "Ada"}, "event": {"title": "Meetup"}})
+
+    assert admin.generate_badges_pdf([badge])
+    assert encoded == [qr_payload("r1", "q1", "e1", "Ada", "Meetup")]
+
+
+@pytest.fixture
+def admin_client(monkeypatch):
+    monkeypatch.setattr(export, "_executor", ThreadPoolExecutor(max_workers=1))
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(role="admin", email="admin@example.org")
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    export.shutdown_export_pool()
+    export._pdf_cache.clear()
+
+
+def test_pdf_export_fails_rather_than_caching_an_empty_report(db, admin_client, monkeypatch):
+    _seed(db)
+
+    async def unreachable():
+        raise httpx.ConnectError("connection reset")
+
+    # The version query succeeds, the row query does not
+    loader = export.get_all_participants
+    monkeypatch.setattr(export, "get_all_participants", unreachable)
+    res = admin_client.get("/admin/export-attendance")
+    assert res.status_code == 503 and "retry-after" in res.headers
+    assert export._pdf_cache.get(None) is None
+
+    monkeypatch.setattr(export, "get_all_participants", loader)
+    res = admin_client.get("/admin/export-attendance")
+    assert res.status_code == 200 and res.content.startswith(b"%PDF")
+    assert export._pdf_cache[None][0] == res.headers["etag"].removeprefix("W/")
+    assert admin_client.get("/admin/export-attendance", headers={"If-None-Match": res.headers["etag"]}).status_code == 304
+
+
+def test_pdf_of_an_event_that_failed_to_load_is_not_cached(db, monkeypatch):
+    monkeypatch.setattr(export, "_executor", ThreadPoolExecutor(max_workers=1))
+
+    async def no_event(event_id):
+        return [], None
+
+    monkeypatch.setattr(export, "get_participants_for_event", no_event)
+    pdf, title = asyncio.run(export.build_pdf_export("e1", etag='"v1"'))
+    assert pdf.startswith(b"%PDF") and title == "Event"
+    assert export._pdf_cache.get("e1") is None
+    export.shutdown_export_pool()
+
+
+def test_without_background_jobs_badges_download_directly(db, admin_client, monkeypatch):
+    _seed(db)
+    monkeypatch.setattr(export_jobs, "EXPORT_JOBS_ENABLED", False)
+    monkeypatch.setattr(admin_routes, "EXPORT_JOBS_ENABLED", False)
+
+    res = admin_client.post("/admin/exports", data={"kind": "badges", "event_id": "e1"})
+    assert res.status_code == 503 and "direct downloads" in res.json()["detail"]
+
+    res = admin_client.get("/admin/export-badges/e1")
+    assert res.status_code == 200 and res.content.startswith(b"%PDF")
+    assert res.headers["content-disposition"].startswith("attachment; filename=badges_")
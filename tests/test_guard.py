@@ -0,0 +1,157 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from postgrest.exceptions import APIError
+
+from api.v1.auth import get_current_user
+from main import app
+from repository import guard
+from repository.guard import BackendUnavailable, _breakers, guarded
+from repository.registration_repo import count_event_registrations, get_attended_count
+
+EVENTS = ("00000000-0000-4000-8000-0000000000e1", "00000000-0000-4000-8000-0000000000e2")
+
+
+def test_attended_count_is_one_query_on_its_own_breaker(db):
+    db.tables["users"] = [{"qr_code_data": f"qr-{i}", "name": f"User {i}"} for i in range(4)]
+    db.tables["registrations"] = [
+        {"id": "r0", "user_qr_code": "qr-0", "event_id": EVENTS[0], "attended_at": "2026-03-01T09:00:00+00:00"},
+        {"id": "r1", "user_qr_code": "qr-0", "event_id": EVENTS[1], "attended_at": "2026-03-02T09:00:00+00:00"},
+        {"id": "r2", "user_qr_code": "qr-1", "event_id": EVENTS[0], "attended_at": "2026-03-01T09:05:00+00:00"},
+        {"id": "r3", "user_qr_code": "qr-2", "event_id": EVENTS[0], "attended_at": None},
+    ]
+    _breakers["registrations.count"]._open(time.monotonic())  # seat admission counts are failing fast
+
+    assert asyncio.run(get_attended_count()) == 2
+    assert db.calls == [("users", "select")]
+    with pytest.raises(BackendUnavailable):
+        asyncio.run(count_event_registrations(EVENTS[0]))
+
+
+@pytest.fixture
+def clock(monkeypatch) -> list[float]:
+    """A breaker clock the test moves by hand, and breakers that open after two failed calls."""
+    now = [1000.0]
+    monkeypatch.setattr(guard, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(guard, "DB_BREAKER_MIN_CALLS", 2)
+    monkeypatch.setattr(guard, "DB_BREAKER_COOLDOWN", 15)
+    return now
+
+
+def _flaky(operation: str, **kwargs):
+    """A guarded call that fails with an outage while `outage[0]` is set, and records every run."""
+    outage, ran = [True], []
+
+    @guarded(operation, **kwargs)
+    async def call(wait: asyncio.Event | None = None):
+        ran.append(1)
+        if wait is not None:
+            await wait.wait()
+        if outage[0]:
+            raise httpx.ConnectError("connection refused")
+        return "ok"
+
+    return call, outage, ran
+
+
+def test_breaker_opens_fails_fast_and_closes_after_a_trial(clock):
+    call, outage, ran = _flaky("test.breaker")
+    breaker = _breakers["test.breaker"]
+
+    for _ in range(2):
+        with pytest.raises(BackendUnavailable):
+            asyncio.run(call())
+    assert breaker.state == "open"
+
+    with pytest.raises(BackendUnavailable) as e:
+        asyncio.run(call())
+    assert "circuit open" in str(e.value) and e.value.retry_after == 15 and len(ran) == 2
+
+    clock[0] += 15
+    outage[0] = False
+
+    async def trial():
+        wait = asyncio.Event()
+        task = asyncio.create_task(call(wait))
+        await asyncio.sleep(0)
+        assert breaker.state == "half_open"
+        with pytest.raises(BackendUnavailable):
+            await call()  # only one trial at a time
+        wait.set()
+        return await task
+
+    assert asyncio.run(trial()) == "ok"
+    assert breaker.state == "closed" and breaker.stats()["opens"] == 1
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    call, _, _ = _flaky("test.reopen")
+    breaker = _breakers["test.reopen"]
+    for _ in range(2):
+        with pytest.raises(BackendUnavailable):
+            asyncio.run(call())
+
+    clock[0] += 15
+    with pytest.raises(BackendUnavailable):
+        asyncio.run(call())
+    assert breaker.state == "open" and breaker.retry_after() == 15 and breaker.opens == 2
+
+
+def test_cancelled_trial_releases_the_breaker(clock):
+    call, outage, ran = _flaky("test.cancel")
+    breaker = _breakers["test.cancel"]
+    breaker._open(clock[0])
+    clock[0] += 15
+    outage[0] = False
+
+    async def cancelled_trial():
+        task = asyncio.create_task(call(asyncio.Event()))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_trial())
+    assert breaker.state == "half_open" and breaker.calls == 0
+    assert asyncio.run(call()) == "ok"  # the next call gets to be the trial
+    assert breaker.state == "closed" and len(ran) == 2
+
+
+def test_default_replaces_other_errors_but_not_outages():
+    @guarded("test.lookup", default=None)
+    async def lookup(error: Exception):
+        raise error
+
+    assert asyncio.run(lookup(APIError({"code": "22P02", "message": "invalid input syntax for type uuid"}))) is None
+    with pytest.raises(BackendUnavailable):
+        asyncio.run(lookup(httpx.ReadTimeout("timed out")))
+    stats = _breakers["test.lookup"].stats()
+    assert (stats["calls"], stats["failures"]) == (2, 1)
+
+
+def test_missed_deadline_is_an_outage():
+    @guarded("test.deadline", deadline=0.01)
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(BackendUnavailable) as e:
+        asyncio.run(slow())
+    assert "no answer within 0.01s" in str(e.value)
+
+
+def test_backend_unavailable_is_a_503_with_retry_after(db):
+    db.tables["events"] = [{"id": EVENTS[0], "title": "Conf", "is_active": True, "capacity": None, "waitlist": False}]
+    db.failing["registrations"] = httpx.ConnectError("connection refused")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(
+        user_id="qr-0", name="User 0", email="user0@example.org", role="participant")
+    try:
+        res = TestClient(app).post(f"/user/events/{EVENTS[0]}/register", follow_redirects=False)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert res.status_code == 503 and res.headers["retry-after"] == "1"
+    assert "temporarily unavailable" in res.json()["detail"]
@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+import pytest
+
+from config.supabase import supabase_admin
+from repository import registration_repo
+from services import admin
+
+
+@pytest.fixture
+def second_page_fails(db, monkeypatch):
+    """Registrations in pages of two, where the second page cannot be read."""
+    db.tables["users"] = [{"id": f"u{i}", "qr_code_data": f"qr-{i}", "name": f"User {i}"} for i in range(5)]
+    db.tables["registrations"] = [
+        {"id": f"r{i}", "user_qr_code": f"qr-{i}", "event_id": "e1", "registered_at": f"2026-03-01T09:00:0{i}+00:00"}
+        for i in range(5)
+    ]
+    pages = 0
+
+    def table(name):
+        nonlocal pages
+        query = db.table(name)
+        if name == "registrations":
+            pages += 1
+            if pages == 2:
+                async def fail():
+                    raise httpx.ConnectError("connection reset")
+                query.execute = fail
+        return query
+
+    monkeypatch.setattr(supabase_admin, "table", table)
+
+
+def test_all_pages_are_collected(db):
+    db.tables["registrations"] = [{"id": f"r{i:04d}", "user_qr_code": f"qr-{i}"} for i in range(2500)]
+    rows = asyncio.run(registration_repo.get_all_registrations())
+    assert len(rows) == 2500  # past PostgREST's max-rows
+
+
+@pytest.mark.parametrize("pages", [
+    lambda: registration_repo.iter_all_registrations(page_size=2),
+    lambda: registration_repo.iter_registrations_for_event("e1", page_size=2),
+])
+def test_a_failed_page_is_not_mistaken_for_the_end(second_page_fails, pages):
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(registration_repo.collect_pages(pages()))
+
+
+def test_participant_reports_fail_instead_of_coming_back_empty(second_page_fails, monkeypatch):
+    async def fewer_pages(*args, page_size=2, **kwargs):
+        async for page in registration_repo.iter_all_registrations(*args, page_size=page_size, **kwargs):
+            yield page
+
+    monkeypatch.setattr(admin, "iter_all_registrations", fewer_pages)
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(admin.get_all_participants())
@@ -0,0 +1,57 @@
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from config.postgres import _json_value, columns, param
+
+
+@pytest.mark.parametrize("select", ["*", "id", "qr_code_data, name, email", "a,b ,  c", " id, attended_at "])
+def test_columns_accepts_plain_column_lists(select):
+    assert columns(select) == select.strip()
+
+
+@pytest.mark.parametrize("select", [
+    "", "id,", ", id", "id name", "user:users(name)", "event:events(title)", "count(*)", "id; DROP TABLE users",
+    "name::text", "users.name", "*, id", '"name"',
+])
+def test_columns_rejects_anything_else(select):
+    with pytest.raises(ValueError, match="Unsupported select"):
+        columns(select)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2026-03-01T09:45:00+05:30", datetime(2026, 3, 1, 4, 15, tzinfo=timezone.utc)),
+    ("2026-03-01T09:45:00.25+00:00", datetime(2026, 3, 1, 9, 45, 0, 250000, tzinfo=timezone.utc)),
+    ("2026-03-01T09:45:00Z", datetime(2026, 3, 1, 9, 45, tzinfo=timezone.utc)),
+])
+def test_param_turns_iso_timestamps_into_datetimes(value, expected):
+    coerced = param("attended_at", value)
+    assert isinstance(coerced, datetime) and coerced == expected and coerced.tzinfo is not None
+
+
+def test_param_leaves_other_values_alone():
+    now = datetime.now(timezone.utc)
+    assert param("registered_at", now) is now
+    assert param("attended_at", None) is None
+    assert param("name", "2026-03-01T09:45:00+00:00") == "2026-03-01T09:45:00+00:00"
+    assert param("event_id", "e1") == "e1"
+    with pytest.raises(ValueError):
+        param("attended_at", "yesterday")
+
+
+@pytest.mark.parametrize("value, expected", [
+    (uuid.UUID(int=1), "00000000-0000-0000-0000-000000000001"),
+    (datetime(2026, 3, 1, 9, 0, tzinfo=timezone.utc), "2026-03-01T09:00:00+00:00"),
+    (datetime(2026, 3, 1, 9, 0, 0, 500000, tzinfo=timezone.utc), "2026-03-01T09:00:00.5+00:00"),
+    (datetime(2026, 3, 1, 9, 0, 0, 140320, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+     "2026-03-01T09:00:00.14032+05:30"),
+    (datetime(2026, 3, 1, 9, 0, 0, 1), "2026-03-01T09:00:00.000001"),
+    (date(2026, 3, 1), "2026-03-01"),
+    (Decimal("2.50"), 2.5),
+    ("text", "text"),
+    (None, None),
+])
+def test_json_value_matches_postgrest_json(value, expected):
+    assert _json_value(value) == expected
@@ -0,0 +1,221 @@
+"""
+Every repository function with an asyncpg path must return what its
+PostgREST path returns.
+
+Needs a Postgres to run against: set TEST_POSTGRES_URL (any database you can
+create a schema in; the suite works in a throwaway schema and drops it).
+The PostgREST side runs over tests/fakedb.py loaded with the same rows as
+Postgres renders them to JSON, which is what PostgREST serves, so the two
+paths see identical data.
+"""
+import asyncio
+import json
+import os
+import uuid
+
+import pytest
+
+asyncpg = pytest.importorskip("asyncpg")
+
+from config.postgres import postgres  # noqa: E402
+from repository import event_repo, registration_repo, user_repo  # noqa: E402
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL", "")
+pytestmark = pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+SCHEMA = """
+CREATE TABLE events (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    title text, description text, location text,
+    start_time timestamptz, end_time timestamptz,
+    image_url text, whatsapp_link text,
+    is_active boolean NOT NULL DEFAULT false,
+    capacity integer, waitlist boolean NOT NULL DEFAULT false,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE users (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    github_id text UNIQUE, qr_code_data text UNIQUE NOT NULL,
+    name text, email text, email_lower text GENERATED ALWAYS AS (lower(email)) STORED UNIQUE, avatar_url text,
+    role text NOT NULL DEFAULT 'participant',
+    registered_event_id uuid, attended_at timestamptz,
+    participant_type text, student_id text, university text, study_year integer,
+    organization text, job_role text,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE registrations (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_qr_code text NOT NULL REFERENCES users (qr_code_data) ON DELETE CASCADE,
+    event_id uuid REFERENCES events (id) ON DELETE SET NULL,
+    registered_at timestamptz NOT NULL DEFAULT now(),
+    attended_at timestamptz,
+    UNIQUE (user_qr_code, event_id)
+);
+"""
+
+# Fractions with trailing zeros and none at all: PostgreSQL's JSON drops the zeros, isoformat() keeps them
+SEED = """
+INSERT INTO events (id, title, location, start_time, is_active, capacity, created_at) VALUES
+    ('00000000-0000-4000-8000-0000000000e1', 'Conf', 'Hall A', '2026-03-01 09:00:00+00', true, 120,
+     '2026-01-01 08:00:00.12+00'),
+    ('00000000-0000-4000-8000-0000000000e2', 'Meetup', NULL, NULL, false, NULL, '2026-01-02 08:00:00+00');
+INSERT INTO users (qr_code_data, github_id, name, email, role, participant_type, study_year, attended_at, created_at)
+SELECT 'qr-' || i, i::text, 'User ' || i, 'user' || i || '@example.org',
+       CASE WHEN i = 0 THEN 'admin' ELSE 'participant' END,
+       (ARRAY['uok_student', 'other_university', 'industry'])[i % 3 + 1], CASE WHEN i % 3 = 1 THEN 2 END,
+       CASE WHEN i % 4 = 0 THEN timestamptz '2026-03-01 10:00:00.5+00' + i * interval '1 second' END,
+       timestamptz '2026-01-01 00:00:00+00' + i * interval '1.000123 second'
+FROM generate_series(0, 29) AS i;
+INSERT INTO registrations (user_qr_code, event_id, registered_at, attended_at)
+SELECT 'qr-' || i, '00000000-0000-4000-8000-0000000000e1',
+       timestamptz '2026-02-01 12:00:00+00' + i * interval '0.1 second',
+       CASE WHEN i % 2 = 0 THEN timestamptz '2026-03-01 09:30:00+00' + i * interval '1 minute' END
+FROM generate_series(0, 19) AS i;
+INSERT INTO registrations (user_qr_code, event_id, registered_at, attended_at)
+SELECT 'qr-' || i, '00000000-0000-4000-8000-0000000000e2', '2026-02-02 12:00:00+00', '2026-03-02 09:00:00+00'
+FROM generate_series(0, 4) AS i;
+"""
+EVENT, OTHER_EVENT = "00000000-0000-4000-8000-0000000000e1", "00000000-0000-4000-8000-0000000000e2"
+
+
+@pytest.fixture
+def backends(db, monkeypatch):
+    """Yields run(fn, *args) -> (asyncpg result, PostgREST result)."""
+    schema = f"parity_{uuid.uuid4().hex[:12]}"
+    loop = asyncio.new_event_loop()
+
+    async def setup():
+        conn = await asyncpg.connect(TEST_POSTGRES_URL)
+        try:
+            await conn.execute(f"CREATE SCHEMA {schema}; SET search_path TO {schema}; SET TimeZone TO 'UTC';"
+                               + SCHEMA + SEED)
+        finally:
+            await conn.close()
+        return await asyncpg.create_pool(
+            TEST_POSTGRES_URL, min_size=1, max_size=2,
+            server_settings={"search_path": schema, "TimeZone": "UTC"},
+        )
+
+    pool = loop.run_until_complete(setup())
+
+    async def mirror():
+        """Load the fake with each table as PostgreSQL renders it to JSON."""
+        async with pool.acquire() as conn:
+            for table in ("events", "users", "registrations"):
+                db.tables[table] = json.loads(await conn.fetchval(f"SELECT coalesce(json_agg(t), '[]') FROM {table} t"))
+
+    def run(fn, *args, **kwargs):
+        async def both():
+            await mirror()
+            monkeypatch.setattr(postgres, "pool", pool)
+            direct = await fn(*args, **kwargs)
+            monkeypatch.setattr(postgres, "pool", None)
+            return direct, await fn(*args, **kwargs)
+
+        return loop.run_until_complete(both())
+
+    run.pool = pool
+    run.loop = loop
+    yield run
+
+    async def teardown():
+        await pool.close()
+        conn = await asyncpg.connect(TEST_POSTGRES_URL)
+        try:
+            await conn.execute(f"DROP SCHEMA {schema} CASCADE")
+        finally:
+            await conn.close()
+
+    monkeypatch.setattr(postgres, "pool", None)
+    loop.run_until_complete(teardown())
+    loop.close()
+
+
+def _by_id(rows: list[dict], key: str = "id") -> list[dict]:
+    return sorted(rows, key=lambda r: r[key])
+
+
+@pytest.mark.parametrize("qr", ["qr-0", "qr-3", "qr-25"])
+def test_get_user_registrations(backends, qr):
+    direct, rest = backends(registration_repo.get_user_registrations, qr)
+    assert direct == rest
+
+
+def test_fetch_registrations_by_ids(backends):
+    ids = [r["id"] for r in backends(registration_repo.get_user_registrations, "qr-2")[1]] + [str(uuid.uuid4())]
+    direct, rest = backends(registration_repo._fetch_registrations_by_ids, ids)
+    assert len(direct) == 2 and _by_id(direct) == _by_id(rest)
+
+
+@pytest.mark.parametrize("event_id", [EVENT, OTHER_EVENT, str(uuid.uuid4())])
+def test_count_event_registrations(backends, event_id):
+    direct, rest = backends(registration_repo.count_event_registrations, event_id)
+    assert direct == rest
+
+
+def test_get_attended_count(backends):
+    direct, rest = backends(registration_repo.get_attended_count)
+    assert direct == rest == 12
+
+
+@pytest.mark.parametrize("select", ["*", "qr_code_data, name, email, attended_at", "created_at, study_year"])
+@pytest.mark.parametrize("qr", ["qr-4", "qr-7", "missing"])
+def test_get_user_by_qr_code(backends, qr, select):
+    direct, rest = backends(user_repo.get_user_by_qr_code, qr, select=select)
+    assert direct == rest
+
+
+def test_get_users_by_qr_codes(backends):
+    qrs = ["qr-1", "qr-8", "qr-12", "missing"]
+    direct, rest = backends(user_repo.get_users_by_qr_codes, qrs, select="qr_code_data, participant_type, created_at")
+    assert len(direct) == 3 and _by_id(direct, "qr_code_data") == _by_id(rest, "qr_code_data")
+
+
+def test_fetch_users_by_qr_codes(backends):
+    direct, rest = backends(user_repo._fetch_users_by_qr_codes, ["qr-0", "qr-4", "qr-9"])
+    assert _by_id(direct, "qr_code_data") == _by_id(rest, "qr_code_data")
+
+
+def test_get_registered_participant_count(backends):
+    direct, rest = backends(user_repo.get_registered_participant_count)
+    assert direct == rest == 29
+
+
+def test_get_active_event_dict(backends):
+    direct, rest = backends(event_repo.get_active_event_dict)
+    assert direct == rest and direct["capacity"] == 120
+
+
+def test_fetch_events_by_ids(backends):
+    direct, rest = backends(event_repo._fetch_events_by_ids, [EVENT, OTHER_EVENT, str(uuid.uuid4())])
+    assert len(direct) == 2 and _by_id(direct) == _by_id(rest)
+
+
+def _row_json(backends, table: str, row_id: str):
+    async def fetch():
+        async with backends.pool.acquire() as conn:
+            row = await conn.fetchval(f"SELECT row_to_json(t) FROM {table} t WHERE id = $1", row_id)
+            return json.loads(row) if row is not None else None
+
+    return backends.loop.run_until_complete(fetch())
+
+
+def test_create_registration_returns_the_row_postgrest_would(backends, monkeypatch):
+    monkeypatch.setattr(postgres, "pool", backends.pool)
+    reg_id = str(uuid.uuid4())
+    created = backends.loop.run_until_complete(registration_repo.create_registration(
+        {"id": reg_id, "user_qr_code": "qr-25", "event_id": EVENT, "registered_at": "2026-02-03T10:00:00.250+00:00"}))
+    assert created == _row_json(backends, "registrations", reg_id)
+    assert created["registered_at"] == "2026-02-03T10:00:00.25+00:00"
+
+
+def test_update_and_delete_registration(backends, monkeypatch):
+    reg_id = backends(registration_repo.get_user_registrations, "qr-1")[0][0]["id"]
+    monkeypatch.setattr(postgres, "pool", backends.pool)
+    backends.loop.run_until_complete(
+        registration_repo.update_registration(reg_id, {"attended_at": "2026-03-01T09:45:00+05:30"}))
+    assert _row_json(backends, "registrations", reg_id)["attended_at"] == "2026-03-01T04:15:00+00:00"
+
+    backends.loop.run_until_complete(registration_repo.delete_registration(reg_id))
+    assert _row_json(backends, "registrations", reg_id) is None
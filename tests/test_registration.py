@@ -0,0 +1,109 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from api.v1 import users as user_routes
+from api.v1.auth import get_current_user
+from main import app
+from services import registration
+from services.capacity import forget_seats
+from services.registration import register_for_event
+
+EVENTS = ("00000000-0000-4000-8000-0000000000e1", "00000000-0000-4000-8000-0000000000e2")
+
+
+@pytest.fixture
+def events(db):
+    db.tables["events"] = [
+        {"id": e, "title": f"Conf {i}", "is_active": True, "capacity": None, "waitlist": False}
+        for i, e in enumerate(EVENTS)
+    ]
+    db.tables["users"] = [{"qr_code_data": f"qr-{i}", "name": f"User {i}", "email": f"user{i}@example.org"}
+                          for i in range(2)]
+    return db.tables["events"]
+
+
+def _inserts(db) -> int:
+    return db.calls_to("registrations", "insert")
+
+
+def test_replayed_key_registers_and_emails_once(db, events, monkeypatch):
+    sent = []
+
+    async def send(email, name, qr_data_url, client):
+        sent.append(email)
+
+    monkeypatch.setattr(user_routes, "send_qr_email", send)
+    monkeypatch.setattr(app.state, "http_client", None, raising=False)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(
+        user_id="qr-0", name="User 0", email="user0@example.org", role="participant")
+    try:
+        client = TestClient(app)
+        first, second = (client.post(f"/user/events/{EVENTS[0]}/register", headers={"Idempotency-Key": "tap-1"},
+                                     follow_redirects=False) for _ in range(2))
+    finally:
+        app.dependency_overrides.clear()
+
+    assert first.headers["location"] == second.headers["location"] == "/user/events?registered=1"
+    assert _inserts(db) == 1 and len(db.tables["registrations"]) == 1
+    assert sent == ["user0@example.org"]
+
+
+def test_replay_returns_the_first_result(db, events):
+    async def main():
+        return (await register_for_event("qr-0", EVENTS[0], "User 0", "user0@example.org", "tap-1"),
+                await register_for_event("qr-0", EVENTS[0], "User 0", "user0@example.org", "tap-1"))
+
+    first, second = asyncio.run(main())
+    assert "replayed" not in first and second == {**first, "replayed": True}
+    assert _inserts(db) == 1
+
+
+def test_same_key_for_another_event_is_not_replayed(db, events):
+    async def main():
+        return (await register_for_event("qr-0", EVENTS[0], "User 0", "user0@example.org", "tap-1"),
+                await register_for_event("qr-0", EVENTS[1], "User 0", "user0@example.org", "tap-1"))
+
+    first, second = asyncio.run(main())
+    assert "replayed" not in second and second["event_id"] == EVENTS[1] != first["event_id"]
+    assert _inserts(db) == 2
+
+
+def test_a_full_event_is_not_cached_under_the_key(db, events):
+    events[0]["capacity"] = 1
+    db.tables["registrations"] = [{"id": "r1", "user_qr_code": "qr-1", "event_id": EVENTS[0]}]
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(register_for_event("qr-0", EVENTS[0], "User 0", "user0@example.org", "tap-1"))
+    assert e.value.status_code == 409
+
+    # The seat frees up; retrying with the same key registers rather than replaying the 409
+    db.tables["registrations"].clear()
+    forget_seats()
+    result = asyncio.run(register_for_event("qr-0", EVENTS[0], "User 0", "user0@example.org", "tap-1"))
+    assert "replayed" not in result and result["user_qr_code"] == "qr-0"
+
+
+def test_unique_violation_means_already_registered(db, events, monkeypatch):
+    # Registered through another worker, so this one's user-events cache does not know yet
+    db.tables["registrations"] = [{"id": "r0", "user_qr_code": "qr-0", "event_id": EVENTS[0]}]
+    codes = []
+
+    def is_duplicate(e):
+        codes.append(e.code)
+        return real(e)
+
+    real = registration.is_duplicate
+    monkeypatch.setattr(registration, "is_duplicate", is_duplicate)
+    result = asyncio.run(register_for_event("qr-0", EVENTS[0], "User 0", "user0@example.org", "tap-1"))
+    assert result == {"already_registered": True} and codes == ["23505"]
+    assert len(db.tables["registrations"]) == 1
+
+
+def test_invalid_key_is_rejected(db, events):
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(register_for_event("qr-0", EVENTS[0], "User 0", "user0@example.org", "not a key"))
+    assert e.value.status_code == 400
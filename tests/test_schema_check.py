@@ -0,0 +1,31 @@
+import asyncio
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from repository.schema_check import SchemaMismatch, check_schema
+
+
+def test_passes_on_a_migrated_database(db):
+    asyncio.run(check_schema())
+    assert db.calls_to("events") == db.calls_to("waitlist") == 1
+
+
+def test_missing_columns_and_table_fail_startup(db):
+    db.failing["events"] = APIError({"code": "42703", "message": "column events.capacity does not exist"})
+    db.failing["waitlist"] = APIError({"code": "PGRST205", "message": "Could not find the table 'public.waitlist'"})
+    with pytest.raises(SchemaMismatch) as e:
+        asyncio.run(check_schema())
+    assert "events.capacity" in str(e.value) and "public.waitlist" in str(e.value)
+
+
+def test_unreachable_database_skips_the_check(db):
+    db.failing["events"] = httpx.ConnectError("All connection attempts failed")
+    asyncio.run(check_schema())
+
+
+def test_other_errors_are_not_hidden(db):
+    db.failing["waitlist"] = APIError({"code": "42501", "message": "permission denied for table waitlist"})
+    with pytest.raises(APIError):
+        asyncio.run(check_schema())
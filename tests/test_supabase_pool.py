@@ -0,0 +1,44 @@
+import asyncio
+
+import httpx
+
+from config.supabase import SUPABASE_POOL_SIZE, _AsyncAdmin
+
+
+async def _http_server() -> asyncio.Server:
+    """A local HTTP/1.1 server answering every request with an empty 200 and keeping the connection open."""
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def test_pool_stats_reads_the_httpcore_pool():
+    # pool_stats relies on httpx/httpcore internals; this fails loudly when an upgrade moves them
+    async def main():
+        server = await _http_server()
+        port = server.sockets[0].getsockname()[1]
+        admin = _AsyncAdmin(http=httpx.AsyncClient(http2=False))
+        try:
+            assert admin.pool_stats()["connections"] == 0
+            await admin.http.get(f"http://127.0.0.1:{port}/")
+            return admin.pool_stats()
+        finally:
+            await admin.http.aclose()
+            server.close()
+
+    assert asyncio.run(main()) == {
+        "max_connections": SUPABASE_POOL_SIZE, "connections": 1, "active": 0, "idle": 1, "http2": 0,
+        "requests": 0, "utilisation": 0.0,
+    }
+
+
+def test_pool_stats_are_empty_without_a_pool():
+    assert _AsyncAdmin().pool_stats() == {}
+    mocked = _AsyncAdmin(http=httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(200))))
+    assert mocked.pool_stats() == {}
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+import services.user_search as user_search
+from services.user_search import UserSearchIndex
+
+
+def _user(github_id: str, name: str, email: str = "", **fields) -> dict:
+    return {"github_id": github_id, "qr_code_data": f"qr-{github_id}", "name": name, "email": email, **fields}
+
+
+@pytest.fixture
+def index() -> UserSearchIndex:
+    index = UserSearchIndex()
+    for user in (
+            _user("substring", "Maria Dasilva"),
+            _user("word", "Nimal Silva"),
+            _user("prefix", "Silvana Perera"),
+            _user("whole", "Silva"),
+            _user("email", "Kasun Perera", "silva@example.org"),
+            _user("org", "Amara Bandara", organization="Silva Labs"),
+            _user("other", "Dilini Fernando", "dilini@example.org"),
+    ):
+        index.add(user)
+    return index
+
+
+def test_ranks_whole_field_then_prefix_then_word_then_substring(index):
+    ids, total = index.search("silva")
+    assert total == 6
+    # Whole name, name prefix, email prefix, organization prefix, name word, substring
+    assert ids == ["whole", "prefix", "email", "org", "word", "substring"]
+
+
+def test_ties_are_ordered_by_name_and_pages_follow_the_ranking(index):
+    ids, _ = index.search("perera")
+    assert ids == ["email", "prefix"]  # both name words: Kasun before Silvana
+    first, _ = index.search("silva", 0, 2)
+    second, _ = index.search("silva", 2, 2)
+    assert first + second == index.search("silva", 0, 4)[0]
+
+
+def test_short_queries_match_word_prefixes_only(index):
+    assert set(index.search("si")[0]) == {"word", "prefix", "whole", "email", "org"}
+    assert index.search("il") == ([], 0)  # "dasilva" and "dilini" contain it, but not at a word start
+
+
+def test_remove_and_update(index):
+    index.remove("whole")
+    assert "whole" not in index.search("silva")[0]
+    assert len(index) == 6
+
+    index.update({"name": "Nimal Jayasinghe"}, github_id="word")
+    assert "word" not in index.search("silva")[0]
+    assert index.search("jayasinghe")[0] == ["word"]
+
+    index.update({"organization": "Virtusa"}, qr_code_data="qr-org")
+    assert index.search("virtusa")[0] == ["org"]
+    assert index.search("bandara")[0] == ["org"]  # untouched fields are kept
+
+    index.update({"role": "admin"}, github_id="other")  # not a search field: no-op
+    assert index.search("dilini")[0] == ["other"]
+
+    index.add(_user("whole", "Silva"))
+    assert index.search("silva")[0][0] == "whole"
+
+
+def test_writes_during_a_rebuild_are_replayed(db, monkeypatch):
+    db.tables["users"] = [
+        {"id": f"{i:04d}", **_user(str(i), f"User {i:04d}", f"user{i}@example.org")} for i in range(30)
+    ]
+    scan = user_search.iter_users
+
+    async def slow_scan(select: str):
+        async for page in scan(select, page_size=10):
+            yield page
+            # Writes landing while the build is still scanning
+            if page[0]["github_id"] == "0":
+                user_search.index_user(_user("late", "Late Arrival"))
+                user_search.remove_indexed_user("25")
+                user_search.update_indexed_user({"name": "Renamed Person"}, github_id="5")
+
+    monkeypatch.setattr(user_search, "iter_users", slow_scan)
+    monkeypatch.setattr(user_search, "_index", None)
+    asyncio.run(user_search.build_user_search_index())
+
+    assert user_search.search_users("late arrival")[0] == ["late"]
+    assert user_search.search_users("user 0025") == ([], 0)
+    assert user_search.search_users("renamed")[0] == ["5"]
+    assert user_search.search_users("user 0005") == ([], 0)
+    assert len(user_search._index) == 30
+    assert user_search._journal is None
@@ -0,0 +1,87 @@
+import asyncio
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.v1 import admin as admin_routes
+from api.v1.auth import get_current_user
+from main import app
+from services.event import release_event_waitlist
+from services.registration import leave_waitlist
+
+EVENT = "00000000-0000-4000-8000-0000000000e1"
+
+
+@pytest.fixture
+def event(db):
+    """A full event (capacity 2) with three users waiting, qr-2 first."""
+    db.tables["events"] = [{"id": EVENT, "title": "Conf", "is_active": True, "capacity": 2, "waitlist": True}]
+    db.tables["users"] = [
+        {"qr_code_data": f"qr-{i}", "name": f"User {i}", "email": f"user{i}@example.org"} for i in range(5)
+    ]
+    db.tables["registrations"] = [{"id": f"r{i}", "user_qr_code": f"qr-{i}", "event_id": EVENT} for i in range(2)]
+    db.tables["waitlist"] = [
+        {"id": f"w{i}", "event_id": EVENT, "user_qr_code": f"qr-{i}", "joined_at": f"2026-03-01T09:00:0{i}+00:00"}
+        for i in range(2, 5)
+    ]
+    return db.tables["events"][0]
+
+
+def _registered(db) -> set[str]:
+    return {r["user_qr_code"] for r in db.tables["registrations"] if r["event_id"] == EVENT}
+
+
+def test_lifting_the_cap_registers_everyone_waiting(db, event):
+    event["capacity"] = None
+    db.tables["registrations"].append({"id": "r4", "user_qr_code": "qr-4", "event_id": EVENT})  # registered meanwhile
+
+    promoted, dropped = asyncio.run(release_event_waitlist(EVENT))
+    assert (promoted, dropped) == (2, [])
+    assert _registered(db) == {f"qr-{i}" for i in range(5)}
+    assert db.tables["waitlist"] == []
+
+
+def test_switching_the_waitlist_off_fills_free_seats_and_drops_the_rest(db, event):
+    event.update(capacity=3, waitlist=False)
+
+    promoted, dropped = asyncio.run(release_event_waitlist(EVENT))
+    assert promoted == 1 and "qr-2" in _registered(db) and len(_registered(db)) == 3
+    assert [(e["user_qr_code"], e["user"]["email"]) for e in dropped] == [
+        ("qr-3", "user3@example.org"), ("qr-4", "user4@example.org")]
+    assert db.tables["waitlist"] == []
+
+
+def test_a_capped_event_with_a_waitlist_keeps_it(db, event):
+    event["capacity"] = 3
+    assert asyncio.run(release_event_waitlist(EVENT)) == (0, [])
+    assert len(db.tables["waitlist"]) == 3
+
+
+def test_leave_waitlist(db, event):
+    assert asyncio.run(leave_waitlist("qr-3", EVENT)) is True
+    assert [w["user_qr_code"] for w in db.tables["waitlist"]] == ["qr-2", "qr-4"]
+    assert asyncio.run(leave_waitlist("qr-3", EVENT)) is False
+
+
+def test_edit_that_closes_the_waitlist_emails_the_dropped(db, event, monkeypatch):
+    sent = []
+
+    async def send(recipients, event_title, client):
+        sent.append((recipients, event_title))
+
+    monkeypatch.setattr(admin_routes, "send_waitlist_closed_emails", send)
+    monkeypatch.setattr(app.state, "http_client", None, raising=False)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(role="admin", email="admin@example.org")
+    try:
+        res = TestClient(app).post(f"/admin/events/{EVENT}/edit", data={"title": "Conf", "capacity": "2"},
+                                   follow_redirects=False)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert res.status_code == 303
+    assert parse_qs(urlsplit(res.headers["location"]).query) == {
+        "success": ["updated"], "promoted": ["0"], "dropped": ["3"]}
+    assert sent == [([(f"user{i}@example.org", f"User {i}") for i in range(2, 5)], "Conf")]
+    assert db.tables["waitlist"] == []